@@ -0,0 +1,195 @@
+"""Persistent dedup/cooldown state for Telegram promotion alerts.
+
+Alerts are keyed by product and price band (log-scale buckets of
+``ALERT_PRICE_BAND_PCT``). A new alert for a product is suppressed while
+it is inside ``ALERT_COOLDOWN_HOURS`` of its last alert, unless the price
+dropped at least ``ALERT_MIN_IMPROVEMENT_PCT`` below the last alerted price
+and landed in a band that has not alerted in the cooldown. A product
+flipping between two prices, or the same SKU seen by overlapping searches,
+therefore alerts once.
+
+State lives in the shared database so every scraper node sees it. An
+in-process cache answers the "suppress" case; before saying yes the store
+re-reads the product's rows, so alerts sent by other processes count.
+
+Promotion checks are deferred on the write's connection (``defer``) and
+run by whoever owns the transaction after it commits (``take`` + ``run``),
+so a message is never sent for a write that rolls back, and ``record``
+never waits on the caller's open transaction. A later check with the same
+key replaces an earlier one, so a batch evaluates each product once, at its
+final price.
+"""
+import math
+import os
+import threading
+import weakref
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Table, Column, Integer, Numeric, DateTime, MetaData, select
+from sqlalchemy.exc import IntegrityError
+
+ALERT_COOLDOWN_HOURS = float(os.getenv('ALERT_COOLDOWN_HOURS', '12'))
+ALERT_MIN_IMPROVEMENT_PCT = float(os.getenv('ALERT_MIN_IMPROVEMENT_PCT', '3'))
+ALERT_PRICE_BAND_PCT = float(os.getenv('ALERT_PRICE_BAND_PCT', '2'))
+
+metadata = MetaData()
+
+alert_state = Table("alert_state", metadata,
+    Column("product_id", Integer, primary_key=True),
+    Column("price_band", Integer, primary_key=True),
+    Column("last_alert_price", Numeric, nullable=False),
+    Column("last_alert_at", DateTime, nullable=False),
+    Column("alert_count", Integer, nullable=False, default=1),
+)
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def price_band(price, band_pct=ALERT_PRICE_BAND_PCT):
+    """Log-scale bucket: prices within ~band_pct of each other share a band"""
+    return int(math.floor(math.log(max(price, 0.01)) / math.log1p(band_pct / 100)))
+
+class AlertStateStore:
+    """Decides whether a promotion alert may be sent and records sent alerts"""
+
+    def __init__(self, engine, cooldown_hours=ALERT_COOLDOWN_HOURS,
+                 min_improvement_pct=ALERT_MIN_IMPROVEMENT_PCT):
+        self.engine = engine
+        self.cooldown = timedelta(hours=cooldown_hours)
+        self.min_improvement_pct = min_improvement_pct
+        self._cache = {}  # product_id -> [(band, price, alerted_at)]
+        self._lock = threading.Lock()
+        metadata.create_all(engine, tables=[alert_state], checkfirst=True)
+
+    def _load(self, product_id, now):
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                select(
+                    alert_state.c.price_band,
+                    alert_state.c.last_alert_price,
+                    alert_state.c.last_alert_at,
+                ).where(
+                    alert_state.c.product_id == product_id,
+                    alert_state.c.last_alert_at >= now - self.cooldown,
+                )
+            ).fetchall()
+        cached = [(row.price_band, float(row.last_alert_price), row.last_alert_at) for row in rows]
+        with self._lock:
+            self._cache[product_id] = cached
+        return cached
+
+    def _recent_alerts(self, product_id, now, refresh=False):
+        with self._lock:
+            cached = self._cache.get(product_id)
+        if cached is None or refresh:
+            cached = self._load(product_id, now)
+        return [alert for alert in cached if alert[2] >= now - self.cooldown]
+
+    def _allows(self, recent, price):
+        if not recent:
+            return True
+
+        band = price_band(price)
+        if any(alert_band == band for alert_band, _, _ in recent):
+            return False
+
+        lowest_alerted = min(alert_price for _, alert_price, _ in recent)
+        improvement_pct = (lowest_alerted - price) / lowest_alerted * 100
+        return improvement_pct >= self.min_improvement_pct
+
+    def should_alert(self, product_id, price, now=None):
+        """False when an alert for this product/price would repeat one inside the cooldown"""
+        now = now or _utcnow()
+        if not self._allows(self._recent_alerts(product_id, now), price):
+            return False
+        # O cache só tem o que este processo viu: confirma no banco antes de liberar
+        return self._allows(self._recent_alerts(product_id, now, refresh=True), price)
+
+    def record(self, product_id, price, now=None):
+        """Remember a sent alert"""
+        now = now or _utcnow()
+        band = price_band(price)
+
+        values = {
+            "product_id": product_id,
+            "price_band": band,
+            "last_alert_price": price,
+            "last_alert_at": now,
+            "alert_count": 1,
+        }
+        repeat = {
+            "last_alert_price": price,
+            "last_alert_at": now,
+            "alert_count": alert_state.c.alert_count + 1,
+        }
+
+        insert = _insert_for(self.engine.dialect.name)
+        if insert is not None:
+            # Dois processos podem alertar o mesmo produto/faixa ao mesmo tempo
+            with self.engine.begin() as conn:
+                conn.execute(insert(alert_state).values(**values).on_conflict_do_update(
+                    index_elements=[alert_state.c.product_id, alert_state.c.price_band],
+                    set_=repeat,
+                ))
+        else:
+            self._record_generic(product_id, band, values, repeat)
+
+        with self._lock:
+            alerts = [alert for alert in self._cache.get(product_id, []) if alert[0] != band]
+            alerts.append((band, float(price), now))
+            self._cache[product_id] = alerts
+
+    def _record_generic(self, product_id, band, values, repeat):
+        update = (
+            alert_state.update()
+            .where(alert_state.c.product_id == product_id, alert_state.c.price_band == band)
+            .values(**repeat)
+        )
+        with self.engine.begin() as conn:
+            if conn.execute(update).rowcount:
+                return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(alert_state.insert().values(**values))
+        except IntegrityError:
+            # Outro processo inseriu entre o update e o insert: soma ao dele
+            with self.engine.begin() as conn:
+                conn.execute(update)
+
+def _insert_for(dialect_name):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(engine):
+    """Shared store per engine (creates the table on first use)"""
+    with _stores_lock:
+        store = _stores.get(id(engine))
+        if store is None:
+            store = _stores[id(engine)] = AlertStateStore(engine)
+        return store
+
+# Checagens de promoção por conexão, rodadas só depois do commit
+_pending = weakref.WeakKeyDictionary()
+
+def defer(conn, key, check, *args):
+    """Queue ``check(*args)`` on a connection, to run after its transaction commits.
+
+    A check queued later with the same key replaces this one.
+    """
+    _pending.setdefault(conn, {})[key] = (check, args)
+
+def take(conn):
+    """Checks queued on a connection (call inside the transaction, run after it)"""
+    return list(_pending.pop(conn, {}).values())
+
+def run(checks):
+    for check, args in checks:
+        check(*args)
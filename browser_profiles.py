@@ -0,0 +1,164 @@
+"""Persistent per-site Chrome profiles, so drivers start with a warm HTTP disk cache.
+
+With ``BROWSER_PROFILE_DIR`` set, ``create_driver`` leases a profile slot
+(``<dir>/<site>/slot-N``) instead of starting from a blank temporary
+profile. Kabum's and Pichau's JS bundles, CSS and fonts then come from the
+slot's disk cache and V8 code cache on repeat loads. A slot is held with an
+exclusive OS lock on its lock file for the driver's lifetime (``flock``, or
+``msvcrt.locking`` on Windows), so two concurrent drivers never open the same
+``user-data-dir``. A second driver for the same site takes the next free
+slot. The OS drops the lock when the process dies, so a crash never leaks a
+slot.
+
+Each slot is pruned when it is leased: once it passes
+``BROWSER_PROFILE_MAX_MB``, the oldest cache files are deleted until it is
+back under 80% of the limit. Chrome's own ``--disk-cache-size`` caps it
+between prunes. ``BROWSER_PROFILE_SITES`` limits which sites use a profile
+(default: all).
+"""
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+PROFILE_DIR = os.getenv('BROWSER_PROFILE_DIR', '')
+PROFILE_SITES = {site.strip().lower() for site in os.getenv('BROWSER_PROFILE_SITES', '').split(",") if site.strip()}
+PROFILE_MAX_MB = int(os.getenv('BROWSER_PROFILE_MAX_MB', '500'))
+MAX_SLOTS = int(os.getenv('BROWSER_PROFILE_SLOTS', '8'))
+
+# Diretórios que podem ser apagados sem perder nada além de cache
+CACHE_DIRS = ("cache", os.path.join("profile", "Default", "Code Cache"), os.path.join("profile", "Default", "GPUCache"))
+
+# Deixados pelo Chrome quando o processo morre sem fechar (watchdog, OOM)
+SINGLETON_FILES = ("SingletonLock", "SingletonCookie", "SingletonSocket")
+
+def enabled_for(website):
+    """True when drivers for this site should use a persistent profile"""
+    return bool(PROFILE_DIR) and bool(website) and (not PROFILE_SITES or website in PROFILE_SITES)
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+def prune(slot_dir, max_mb=PROFILE_MAX_MB):
+    """Delete the oldest cache files of a slot when it is over max_mb; returns bytes freed"""
+    limit = max_mb * 1024 * 1024
+    size = _dir_size(slot_dir)
+    if size <= limit:
+        return 0
+
+    files = []
+    for cache_dir in CACHE_DIRS:
+        for root, _, names in os.walk(os.path.join(slot_dir, cache_dir)):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_atime, stat.st_size, path))
+
+    freed = 0
+    target = size - int(limit * 0.8)
+    for _, file_size, path in sorted(files):
+        if freed >= target:
+            break
+        try:
+            os.remove(path)
+            freed += file_size
+        except OSError:
+            continue
+
+    print(f"🧹 Perfil {slot_dir}: {freed / 1e6:.0f} MB de cache removidos")
+    return freed
+
+class ProfileLease:
+    """Exclusive hold on one profile slot until release()"""
+
+    def __init__(self, website, slot, slot_dir, lock_file):
+        self.website = website
+        self.slot = slot
+        self.slot_dir = slot_dir
+        self.user_data_dir = os.path.join(slot_dir, "profile")
+        self.cache_dir = os.path.join(slot_dir, "cache")
+        self._lock_file = lock_file
+
+    def chrome_arguments(self):
+        return [
+            f"--user-data-dir={self.user_data_dir}",
+            f"--disk-cache-dir={self.cache_dir}",
+            f"--disk-cache-size={PROFILE_MAX_MB * 1024 * 1024 // 2}",
+        ]
+
+    def release(self):
+        if self._lock_file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        self._lock_file.close()
+        self._lock_file = None
+
+def _try_lock(lock_path):
+    """Open and exclusively lock a slot's lock file; None when another driver holds it"""
+    lock_file = open(lock_path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            # Windows: lock de 1 byte no handle aberto, solto pelo SO se o processo morrer
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def acquire(website):
+    """Lease a free profile slot for a site, or None (disabled or every slot busy)"""
+    if not enabled_for(website):
+        return None
+
+    site_dir = os.path.join(PROFILE_DIR, website)
+    os.makedirs(site_dir, exist_ok=True)
+
+    for slot in range(MAX_SLOTS):
+        slot_dir = os.path.join(site_dir, f"slot-{slot}")
+        lock_file = _try_lock(os.path.join(site_dir, f"slot-{slot}.lock"))
+        if lock_file is None:
+            continue
+
+        os.makedirs(os.path.join(slot_dir, "profile"), exist_ok=True)
+        for name in SINGLETON_FILES:
+            path = os.path.join(slot_dir, "profile", name)
+            if os.path.lexists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        prune(slot_dir)
+        return ProfileLease(website, slot, slot_dir, lock_file)
+
+    print(f"⚠️ Todos os {MAX_SLOTS} perfis de {website} em uso, usando perfil temporário")
+    return None
+
+def release(driver):
+    """Release the profile lease attached to a driver by create_driver, if any"""
+    lease = getattr(driver, "profile_lease", None)
+    if lease is not None:
+        lease.release()
+        driver.profile_lease = None
@@ -0,0 +1,138 @@
+"""Ordered outbox of new products and price changes, for incremental readers.
+
+``store_observation`` appends one row to ``change_outbox`` for every new
+product and every price change, in the same transaction as the write
+itself. A check that finds the same price appends nothing. Rows are queued
+on the connection (``append``) and written together by whoever owns the
+transaction (``flush``), as its last statement before the commit.
+
+``seq`` only grows, so a reader keeps the last ``seq`` it saw and asks for
+"changes since N" (``read_changes_since`` here, ``/api/changes?since=N`` in
+the frontend) instead of re-reading ``products`` and ``prices``.
+
+Sequence values are assigned at insert time, but transactions commit in
+their own order. On PostgreSQL, ``flush`` therefore takes a transaction-level
+advisory lock just before the insert. Outbox rows then become visible in
+``seq`` order, and a reader never skips a row committed late. Since the
+flush is the last thing a transaction does, even a 500-row spool batch holds
+the lock only from that one insert to the commit, never while it writes
+prices or sends alerts. SQLite serializes writers anyway::
+
+    python change_outbox.py since 0 --limit 20
+    python change_outbox.py prune --keep-days 30
+"""
+import argparse
+import os
+import weakref
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (Table, Column, Integer, BigInteger, String, Numeric, DateTime, MetaData, Index,
+                        select, text)
+
+brasilia = ZoneInfo("America/Sao_Paulo")
+
+# Chave do pg_advisory_xact_lock que ordena os commits do outbox
+OUTBOX_LOCK_KEY = 4_804_801
+
+metadata = MetaData()
+
+change_outbox = Table("change_outbox", metadata,
+    # BIGSERIAL no Postgres; no SQLite só INTEGER PRIMARY KEY é autoincremento
+    Column("seq", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("kind", String, nullable=False),
+    Column("product_id", Integer, nullable=False),
+    Column("website", String, nullable=False),
+    Column("name", String),
+    Column("category", String),
+    Column("product_link", String),
+    Column("price", Numeric, nullable=False),
+    Column("previous_price", Numeric),
+    Column("changed_at", DateTime, nullable=False),
+    Index("change_outbox_product_seq", "product_id", "seq"),
+)
+
+_ready_engines = set()
+
+def ensure_schema(engine):
+    """Create change_outbox once per engine"""
+    if id(engine) not in _ready_engines:
+        metadata.create_all(engine, tables=[change_outbox], checkfirst=True)
+        _ready_engines.add(id(engine))
+
+# Linhas por conexão, gravadas de uma vez no fim da transação
+_pending = weakref.WeakKeyDictionary()
+
+def append(conn, kind, product_id, website, name, category, product_link, price, previous_price, changed_at):
+    """Queue one change on the caller's connection; ``flush`` writes it"""
+    _pending.setdefault(conn, []).append({
+        "kind": kind,
+        "product_id": product_id,
+        "website": website,
+        "name": name,
+        "category": category,
+        "product_link": product_link,
+        "price": price,
+        "previous_price": previous_price,
+        "changed_at": changed_at,
+    })
+
+def take(conn):
+    """Changes queued on a connection, removed from it"""
+    return _pending.pop(conn, [])
+
+def flush(conn):
+    """Write the changes queued on a connection; call last, right before the commit"""
+    rows = take(conn)
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": OUTBOX_LOCK_KEY})
+    conn.execute(change_outbox.insert(), rows)
+
+def read_changes_since(engine, cursor=0, limit=500, website=None):
+    """Changes with seq > cursor, oldest first; returns (rows as dicts, next cursor)"""
+    query = select(change_outbox).where(change_outbox.c.seq > cursor)
+    if website:
+        query = query.where(change_outbox.c.website == website)
+    query = query.order_by(change_outbox.c.seq).limit(limit)
+
+    with engine.connect() as conn:
+        rows = [dict(row._mapping) for row in conn.execute(query)]
+    return rows, (rows[-1]["seq"] if rows else cursor)
+
+def prune(engine, keep_days=30):
+    """Delete outbox rows older than keep_days; returns how many were removed"""
+    # changed_at é gravado como o current_time do save (horário de Brasília)
+    cutoff = datetime.now(brasilia).replace(tzinfo=None) - timedelta(days=keep_days)
+    with engine.begin() as conn:
+        return conn.execute(change_outbox.delete().where(change_outbox.c.changed_at < cutoff)).rowcount
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Outbox de mudanças de preço")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    since_parser = subparsers.add_parser("since")
+    since_parser.add_argument("cursor", type=int)
+    since_parser.add_argument("--limit", type=int, default=100)
+    since_parser.add_argument("--website")
+
+    prune_parser = subparsers.add_parser("prune")
+    prune_parser.add_argument("--keep-days", type=int, default=30)
+
+    args = parser.parse_args()
+    load_dotenv()
+    engine = create_engine(os.getenv('DATABASE_URL'), echo=False)
+    ensure_schema(engine)
+
+    if args.command == "since":
+        rows, cursor = read_changes_since(engine, args.cursor, args.limit, args.website)
+        for row in rows:
+            previous = f" (antes {float(row['previous_price']):.2f})" if row["previous_price"] is not None else ""
+            print(f"{row['seq']}: {row['kind']} {row['website']} #{row['product_id']} {float(row['price']):.2f}{previous}")
+        print(f"cursor: {cursor}")
+    else:
+        print(f"🧹 {prune(engine, args.keep_days)} linhas removidas do outbox")
@@ -0,0 +1,154 @@
+"""ChromeDriver path resolution, done once and cached on disk.
+
+On Windows ``webdriver_manager`` used to run (and sometimes wipe ``~/.wdm``
+and download again) for every driver created. Now the resolved path is
+memoised in-process and written to a small JSON cache together with the
+installed Chrome version; the cache is reused as long as the executable
+still exists and Chrome has not been updated.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+is_windows = sys.platform.startswith('win')
+
+LINUX_CHROMEDRIVER_PATH = "/usr/local/bin/chromedriver"
+CACHE_FILE = os.getenv(
+    'CHROMEDRIVER_CACHE_FILE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'scraperdb', 'chromedriver.json'),
+)
+
+_VERSION_PATTERN = re.compile(r"(\d+\.\d+\.\d+\.\d+)")
+
+_resolved_path = None
+_resolve_lock = threading.Lock()
+
+def get_chrome_version():
+    """Installed Chrome version string, or None if it cannot be determined"""
+    if is_windows:
+        commands = [
+            ['reg', 'query', r'HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon', '/v', 'version'],
+            ['reg', 'query', r'HKEY_LOCAL_MACHINE\Software\Google\Chrome\BLBeacon', '/v', 'version'],
+        ]
+    else:
+        commands = [
+            ['google-chrome', '--version'],
+            ['chromium', '--version'],
+            ['chromium-browser', '--version'],
+        ]
+
+    for cmd in commands:
+        try:
+            output = subprocess.run(cmd, capture_output=True, text=True, timeout=5).stdout
+        except Exception:
+            continue
+        match = _VERSION_PATTERN.search(output or "")
+        if match:
+            return match.group(1)
+    return None
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_cache(driver_path, chrome_version):
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_path = f"{CACHE_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"driver_path": driver_path, "chrome_version": chrome_version}, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar cache do ChromeDriver: {e}")
+
+def _find_executable(driver_dir, exact=False):
+    for file in os.listdir(driver_dir):
+        if exact:
+            if file == 'chromedriver.exe':
+                return os.path.join(driver_dir, file)
+        elif file.endswith('.exe') and 'chromedriver' in file.lower():
+            exe_path = os.path.join(driver_dir, file)
+            if os.path.exists(exe_path):
+                return exe_path
+    return None
+
+def _install_with_webdriver_manager():
+    """Resolve ChromeDriver through webdriver-manager, clearing its cache once if needed"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    try:
+        # First attempt: use webdriver-manager
+        print("🔄 Baixando/verificando ChromeDriver...")
+        driver_path = ChromeDriverManager().install()
+
+        # Validate the path is an executable
+        if os.path.exists(driver_path) and driver_path.endswith('.exe'):
+            print(f"✅ ChromeDriver encontrado: {driver_path}")
+            return driver_path
+
+        # If path doesn't end with .exe, search for the actual executable
+        print("⚠️ Procurando executável do ChromeDriver...")
+        exe_path = _find_executable(os.path.dirname(driver_path))
+        if exe_path:
+            print(f"✅ ChromeDriver executável encontrado: {exe_path}")
+            return exe_path
+
+        # If still no valid path, clear cache and try again
+        print("🔄 ChromeDriver inválido, limpando cache...")
+        cache_dir = os.path.expanduser('~/.wdm')
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+            print("✅ Cache limpo")
+
+        # Retry after cache clear
+        print("🔄 Reinstalando ChromeDriver...")
+        driver_path = ChromeDriverManager().install()
+
+        if driver_path.endswith('.exe'):
+            print(f"✅ ChromeDriver reinstalado: {driver_path}")
+            return driver_path
+
+        # Last attempt: find any chromedriver.exe in the directory
+        exe_path = _find_executable(os.path.dirname(driver_path), exact=True)
+        if exe_path:
+            print(f"✅ ChromeDriver encontrado: {exe_path}")
+            return exe_path
+
+        raise Exception("ChromeDriver executável não encontrado")
+
+    except Exception as e:
+        raise Exception(f"Falha ao configurar ChromeDriver: {e}. Verifique se o Chrome está instalado.")
+
+def get_chromedriver_path():
+    """ChromeDriver path, resolved at most once per process and per Chrome version"""
+    global _resolved_path
+
+    if not is_windows:
+        return LINUX_CHROMEDRIVER_PATH
+
+    if _resolved_path:
+        return _resolved_path
+
+    with _resolve_lock:
+        if _resolved_path:
+            return _resolved_path
+
+        chrome_version = get_chrome_version()
+        cache = _load_cache()
+        cached_path = cache.get("driver_path")
+        if (cached_path and os.path.exists(cached_path)
+                and chrome_version and cache.get("chrome_version") == chrome_version):
+            _resolved_path = cached_path
+            return _resolved_path
+
+        driver_path = _install_with_webdriver_manager()
+        _save_cache(driver_path, chrome_version)
+        _resolved_path = driver_path
+        return _resolved_path
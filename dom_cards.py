@@ -0,0 +1,216 @@
+"""Product cards read inside the browser with ``execute_script``.
+
+Before this, the DOM path serialized the whole document with
+``driver.page_source``, sent it over the WebDriver wire and parsed it again
+with BeautifulSoup, only to read three fields per card. Here one script
+runs in the page with the same per-site selectors and returns a compact list
+of ``{"name", "price_text", "href"}``. Texts are read like BeautifulSoup's
+``get_text(strip=True)`` (each text node trimmed, joined with no separator)
+and hrefs resolved to absolute URLs.
+
+Each card the script returns is marked with ``data-scraper-seen``, so
+calling it again returns only cards that appeared since the last call. With
+``scroll=True``, ``extract_cards`` scrolls to the bottom after each
+collection and repeats until a round brings no new cards, leaves no card
+waiting to hydrate and the page stops growing, or ``DOM_SCROLL_ROUNDS`` is
+reached. This covers lazy-loaded grids (``DOM_SCROLL_SITES``, default
+``pichau``). While scrolling, a card is only taken (and marked) once both
+its name and price have rendered; a last pass takes the cards that never got
+a price, as the page_source path does.
+
+``SCRAPER_DOM_EXTRACT=soup`` switches back to page_source + BeautifulSoup.
+When the script finds no cards, the scrapers fall back to that path anyway.
+To compare both paths on one live page::
+
+    python dom_cards.py bench terabyte "https://www.terabyteshop.com.br/busca?str=rtx+4060" --repeat 10
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+
+EXTRACT_MODE = os.getenv('SCRAPER_DOM_EXTRACT', 'js').strip().lower()
+SCROLL_SITES = {site.strip().lower() for site in os.getenv('DOM_SCROLL_SITES', 'pichau').split(",") if site.strip()}
+SCROLL_ROUNDS = int(os.getenv('DOM_SCROLL_ROUNDS', '6'))
+SCROLL_SETTLE_SECONDS = float(os.getenv('DOM_SCROLL_SETTLE_SECONDS', '0.6'))
+
+# Mesmos seletores dos extratores BeautifulSoup de cada scraper
+SITE_SPECS = {
+    "kabum": {
+        "cards": ["article.productCard", "div.productCard", "[data-product-id]", ".product", ".produto", ".item"],
+        "name": [".nameCard", "h2", "h3", ".name", ".title", "[data-product-name]"],
+        "href": ["a.productLink", "a", "[href*='produto']"],
+        "price": ['[data-testid="price-value"]', ".priceCard", ".price", "[data-price]", ".value", ".current-price"],
+        "price_needs_number": True,
+    },
+    "terabyte": {
+        "cards": [".product-item"],
+        "name": ["h2"],
+        "href": ["a.product-item__image"],
+        "price": [".product-item__new-price span"],
+        "price_needs_number": False,
+    },
+    "pichau": {
+        "cards": ["[data-cy='list-product']"],
+        "name": ["h2"],
+        "href": [],  # o próprio card é o <a>
+        "price": ["div.mui-12athy2-price_vista, .price, [data-testid='price']"],
+        "price_needs_number": False,
+    },
+}
+
+CARDS_JS = """
+var spec = arguments[0], limit = arguments[1], scroll = arguments[2], needPrice = arguments[3];
+var MARK = 'data-scraper-seen';
+var SKIP = {SCRIPT: 1, STYLE: 1, TEMPLATE: 1};
+function clean(el) {
+    // Igual ao get_text(strip=True): cada nó de texto aparado, sem separador
+    if (!el) return '';
+    var walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT), node, text = '';
+    while ((node = walker.nextNode())) {
+        if (node.parentNode && SKIP[node.parentNode.nodeName]) continue;
+        text += node.nodeValue.trim();
+    }
+    return text;
+}
+function first(root, selectors, test) {
+    for (var i = 0; i < selectors.length; i++) {
+        var el = root.querySelector(selectors[i]);
+        if (el && (!test || test(el))) return el;
+    }
+    return null;
+}
+var cards = [];
+for (var i = 0; i < spec.cards.length && !cards.length; i++) {
+    cards = document.querySelectorAll(spec.cards[i]);
+}
+var out = [], pending = 0;
+for (var j = 0; j < cards.length && (limit === null || out.length < limit); j++) {
+    var card = cards[j];
+    if (card.hasAttribute(MARK)) continue;
+    var name = clean(first(card, spec.name, function (el) { return clean(el) !== ''; }));
+    var price = first(card, spec.price, spec.price_needs_number ? function (el) { return /\\d/.test(clean(el)); } : null);
+    // Card ainda sem hidratar: fica sem marca para a próxima rodada
+    if (!name || (needPrice && !price)) { pending++; continue; }
+    card.setAttribute(MARK, '1');
+    var link = spec.href.length ? first(card, spec.href, function (el) { return !!el.getAttribute('href'); }) : card;
+    out.push({name: name, price_text: price ? clean(price) : null, href: link && link.href ? link.href : null});
+}
+var height = document.body ? document.body.scrollHeight : 0;
+if (scroll) window.scrollTo(0, height);
+return {cards: out, pending: pending, height: height};
+"""
+
+CLEAR_MARKS_JS = (
+    "document.querySelectorAll('[data-scraper-seen]')"
+    ".forEach(function (el) { el.removeAttribute('data-scraper-seen'); });"
+)
+
+def enabled():
+    """True when the DOM path should read cards with execute_script"""
+    return EXTRACT_MODE != "soup"
+
+def extract_cards(driver, website, scroll=None, limit=None, rounds=SCROLL_ROUNDS, settle=SCROLL_SETTLE_SECONDS):
+    """Read the site's product cards in the page; returns [{"name", "price_text", "href"}]"""
+    spec = SITE_SPECS[website]
+    scroll = website in SCROLL_SITES if scroll is None else scroll
+
+    collected = []
+    last_height = None
+    idle_rounds = 0
+    for _ in range(max(1, rounds if scroll else 1)):
+        remaining = None if limit is None else limit - len(collected)
+        if remaining is not None and remaining <= 0:
+            break
+
+        result = driver.execute_script(CARDS_JS, spec, remaining, scroll, scroll) or {}
+        new_cards = result.get("cards") or []
+        collected.extend(new_cards)
+
+        if not scroll:
+            break
+        # Fim do lazy-load: rodada sem cards novos nem pendentes e página que parou de crescer
+        if not new_cards and not result.get("pending") and result.get("height") == last_height:
+            idle_rounds += 1
+            if idle_rounds >= 2:
+                break
+        else:
+            idle_rounds = 0
+        last_height = result.get("height")
+        time.sleep(settle)
+
+    if scroll:
+        # Cards que nunca mostraram preço entram como no caminho page_source
+        remaining = None if limit is None else limit - len(collected)
+        if remaining is None or remaining > 0:
+            result = driver.execute_script(CARDS_JS, spec, remaining, False, False) or {}
+            collected.extend(result.get("cards") or [])
+
+    return collected
+
+def match_cards(cards, wordlist):
+    """Keyword-match extracted cards; returns (found, [(name, href, price_text, matched_keywords)])"""
+    products_found = 0
+    matched_cards = []
+    for card in cards:
+        name = card["name"].lower()
+        matched_keywords = [words for words in wordlist if all(p.lower() in name for p in words)]
+        if not matched_keywords:
+            continue
+        products_found += 1
+        matched_cards.append((name, card.get("href"), card.get("price_text"), matched_keywords))
+    return products_found, matched_cards
+
+def bench(website, url, repeat=10):
+    """Time page_source + BeautifulSoup against execute_script on the same loaded page"""
+    import page_archive
+
+    scraper = importlib.import_module(page_archive.SITE_MODULES[website])
+    soup_extract = {
+        "kabum": getattr(scraper, "extract_kabum_cards", None),
+        "terabyte": getattr(scraper, "extract_terabyte_page", None),
+        "pichau": getattr(scraper, "extract_pichau_cards", None),
+    }[website]
+
+    # Wordlist que casa qualquer nome: as duas rotas processam todos os cards
+    wordlist = [[""]]
+    timings = {"soup": [], "js": []}
+    with scraper.managed_driver(website) as driver:
+        driver.get(url)
+        time.sleep(3)
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page_source = driver.page_source
+            soup_found = (soup_extract(page_source, wordlist) or (0, []))[0]
+            timings["soup"].append(time.perf_counter() - started)
+            soup_bytes = len(page_source.encode("utf-8"))
+            del page_source
+
+            driver.execute_script(CLEAR_MARKS_JS)
+            started = time.perf_counter()
+            # Mesma rota dos scrapers, com o parse de preços (sem scroll: a página já carregou)
+            js_found = (scraper.extract_dom_cards(driver, website, wordlist, scroll=False) or (0, []))[0]
+            timings["js"].append(time.perf_counter() - started)
+
+        driver.execute_script(CLEAR_MARKS_JS)
+        js_bytes = len(json.dumps(extract_cards(driver, website, scroll=False)).encode("utf-8"))
+
+    for name, transferred, found in (("soup", soup_bytes, soup_found), ("js", js_bytes, js_found)):
+        times = sorted(timings[name])
+        print(f"{name:<5} mediana {times[len(times) // 2] * 1000:8.1f} ms   "
+              f"transferido {transferred / 1024:9.1f} KB   cards {found}")
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extração de cards no navegador")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = subparsers.add_parser("bench")
+    bench_parser.add_argument("website", choices=sorted(SITE_SPECS))
+    bench_parser.add_argument("url")
+    bench_parser.add_argument("--repeat", type=int, default=10)
+
+    args = parser.parse_args()
+    bench(args.website, args.url, args.repeat)
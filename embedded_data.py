@@ -0,0 +1,167 @@
+"""Product listings read from the JSON that Next.js storefronts embed in the page.
+
+Kabum and Pichau ship their search results inside ``<script id="__NEXT_DATA__">``
+(Kabum as a JSON string under ``pageProps.data``, Pichau as Apollo cache
+entries). That payload is in the server-rendered HTML, so it can be read as
+soon as the document is parsed, long before the cards are rendered, and it
+carries the SKU and the exact price without any CSS selector.
+
+Every extractor returns a list of ``{"name", "price", "sku", "link"}`` dicts
+and an empty list when the payload is missing or has an unknown shape, so
+callers fall back to DOM parsing.
+"""
+import json
+import re
+import time
+from collections import deque
+
+import price_parser
+
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL
+)
+
+NEXT_DATA_JS = (
+    "var el = document.getElementById('__NEXT_DATA__');"
+    "return el ? el.textContent : null;"
+)
+
+def extract_next_data(html):
+    """Return the decoded __NEXT_DATA__ payload of an HTML document, or None"""
+    if not html:
+        return None
+    match = NEXT_DATA_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+def wait_for_next_data(driver, timeout=10, poll=0.25):
+    """Poll the live page until __NEXT_DATA__ exists; works before the page finishes rendering"""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            raw = driver.execute_script(NEXT_DATA_JS)
+            if raw:
+                return json.loads(raw)
+        except ValueError:
+            return None
+        except Exception:
+            # Documento ainda carregando / navegação em andamento
+            pass
+        if time.time() >= deadline:
+            return None
+        time.sleep(poll)
+
+def _maybe_json(value):
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def _walk(node):
+    """Yield every dict in a JSON tree (breadth-first, page order), decoding JSON strings on the way"""
+    queue = deque([node])
+    while queue:
+        current = _maybe_json(queue.popleft())
+        if isinstance(current, dict):
+            yield current
+            queue.extend(current.values())
+        elif isinstance(current, list):
+            queue.extend(current)
+
+def _to_price(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return price_parser.parse_price(value)
+    if isinstance(value, dict):
+        return _to_price(value.get("value"))
+    return None
+
+def _first_price(*values):
+    for value in values:
+        price = _to_price(value)
+        if price:
+            return price
+    return None
+
+def kabum_products(next_data, base_url="https://www.kabum.com.br"):
+    """Products of a Kabum search page from its __NEXT_DATA__ payload"""
+    if not next_data:
+        return []
+
+    products = []
+    seen = set()
+    for node in _walk(next_data.get("props", next_data)):
+        code = node.get("code")
+        name = node.get("name")
+        if code is None or not isinstance(name, str) or "friendlyName" not in node:
+            continue
+
+        sku = str(code)
+        if sku in seen:
+            continue
+
+        # Preço à vista: oferta relâmpago tem prioridade sobre o preço do catálogo
+        offer = node.get("offer") if isinstance(node.get("offer"), dict) else {}
+        price = _first_price(
+            offer.get("priceWithDiscount"),
+            node.get("priceWithDiscount"),
+            node.get("price"),
+        )
+        if price is None:
+            continue
+
+        seen.add(sku)
+        products.append({
+            "name": name.strip(),
+            "price": price,
+            "sku": sku,
+            "link": f"{base_url}/produto/{sku}/{node.get('friendlyName') or ''}".rstrip("/"),
+        })
+    return products
+
+def pichau_products(next_data, base_url="https://www.pichau.com.br"):
+    """Products of a Pichau search page from its __NEXT_DATA__ / Apollo state"""
+    if not next_data:
+        return []
+
+    products = []
+    seen = set()
+    for node in _walk(next_data.get("props", next_data)):
+        sku = node.get("sku")
+        name = node.get("name")
+        url_key = node.get("url_key")
+        if not sku or not isinstance(name, str) or not url_key:
+            continue
+
+        sku = str(sku)
+        if sku in seen:
+            continue
+
+        pichau_prices = node.get("pichau_prices") if isinstance(node.get("pichau_prices"), dict) else {}
+        price_range = node.get("price_range") if isinstance(node.get("price_range"), dict) else {}
+        minimum_price = price_range.get("minimum_price") if isinstance(price_range.get("minimum_price"), dict) else {}
+        price = _first_price(
+            pichau_prices.get("avista"),
+            minimum_price.get("final_price"),
+            pichau_prices.get("final_price"),
+        )
+        if price is None:
+            continue
+
+        seen.add(sku)
+        products.append({
+            "name": name.strip(),
+            "price": price,
+            "sku": sku,
+            "link": f"{base_url}/{url_key.lstrip('/')}",
+        })
+    return products
@@ -0,0 +1,297 @@
+"""Local stand-in storefront for load tests.
+
+Serves synthetic search pages shaped like the real ones, under one prefix
+per site:
+
+- ``/kabum/busca/<term>``: ``__NEXT_DATA__`` with ``pageProps.data`` as a JSON string, plus product cards
+- ``/terabyte/busca?str=<term>``: ``.product-item`` cards
+- ``/pichau/search?q=<term>``: Apollo state in ``__NEXT_DATA__``, plus ``list-product`` cards
+
+Point the scrapers at it with ``KABUM_BASE_URL=http://host:port/kabum``
+(same for ``TERABYTE_BASE_URL`` and ``PICHAU_BASE_URL``). Every product name
+contains the search term, so keyword groups made from the term match. The
+catalogue of a term is stable across requests. On each request a ``churn``
+fraction of the prices moves by up to ±15%::
+
+    python fake_storefront.py --port 8800 --products 60 --latency-ms 300 --churn 0.1
+
+``--proxies`` also starts local forward proxies on the following ports, one
+per ``block_rate[:latency_ms]`` entry, to exercise ``proxy_pool``. A share
+of ``block_rate`` of the requests going through a proxy gets a 403 or a
+small captcha page instead of the forwarded response::
+
+    python fake_storefront.py --port 8800 --proxies 0,0:400,0.5,1
+    SCRAPER_PROXIES=http://127.0.0.1:8801,http://127.0.0.1:8802,...
+"""
+import argparse
+import hashlib
+import html
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote_plus, urlsplit
+from urllib.request import Request, urlopen
+
+# Respostas menores que isso são tratadas como bloqueio pelo modo HTTP
+MIN_PAGE_SIZE = 12000
+
+class Catalogue:
+    """Deterministic products per (site, term) with per-request price churn"""
+
+    def __init__(self, products=60, churn=0.1):
+        self.products = products
+        self.churn = churn
+
+    def items(self, site, term):
+        seed = int.from_bytes(hashlib.blake2b(f"{site}:{term}".encode("utf-8"), digest_size=8).digest(), "little")
+        rng = random.Random(seed)
+        title = " ".join(word.capitalize() for word in term.split()) or "Produto"
+        items = []
+        for index in range(self.products):
+            base_price = round(rng.uniform(150, 9000), 2)
+            price = base_price
+            if random.random() < self.churn:
+                price = round(base_price * random.uniform(0.85, 1.15), 2)
+            code = seed % 900000 + 100000 + index
+            items.append({
+                "code": code,
+                "name": f"{title} Modelo {index} {rng.choice(['OC', 'Gaming', 'Pro', 'Dual', 'Eagle'])} {site.upper()}",
+                "slug": f"{re.sub(r'[^a-z0-9]+', '-', term.lower()).strip('-')}-modelo-{index}",
+                "price": price,
+            })
+        return items
+
+def _brl(value):
+    integer, cents = f"{value:,.2f}".split(".")
+    return f"R$ {integer.replace(',', '.')},{cents}"
+
+def _pad(body):
+    if len(body) < MIN_PAGE_SIZE:
+        body += "<!--" + " " * (MIN_PAGE_SIZE - len(body)) + "-->"
+    return body
+
+def _next_data_script(payload):
+    return f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(payload)}</script>'
+
+def kabum_page(items):
+    catalog = [{
+        "code": item["code"],
+        "name": item["name"],
+        "friendlyName": item["slug"],
+        "price": round(item["price"] * 1.1, 2),
+        "priceWithDiscount": item["price"],
+        "offer": None,
+    } for item in items]
+    payload = {"props": {"pageProps": {"data": json.dumps({"catalogServer": {"data": catalog}})}}}
+    cards = "".join(
+        f'<article class="productCard"><a class="productLink" href="/produto/{item["code"]}/{item["slug"]}">'
+        f'<span class="nameCard">{html.escape(item["name"])}</span></a>'
+        f'<span class="priceCard">{_brl(item["price"])}</span></article>'
+        for item in items
+    )
+    return f"<html><head>{_next_data_script(payload)}</head><body>{cards}</body></html>"
+
+def terabyte_page(items, base_url):
+    cards = "".join(
+        f'<div class="product-item"><a class="product-item__image" href="{base_url}/produto/{item["code"]}/{item["slug"]}"></a>'
+        f'<h2>{html.escape(item["name"])}</h2>'
+        f'<div class="product-item__new-price"><span>{_brl(item["price"])}</span></div></div>'
+        for item in items
+    )
+    return f"<html><body>{cards}</body></html>"
+
+def pichau_page(items):
+    apollo = {
+        f"Product:{item['code']}": {
+            "sku": str(item["code"]),
+            "name": item["name"],
+            "url_key": item["slug"],
+            "pichau_prices": {"avista": item["price"], "final_price": round(item["price"] * 1.12, 2)},
+            "price_range": {"minimum_price": {"final_price": {"value": round(item["price"] * 1.12, 2)}}},
+        }
+        for item in items
+    }
+    payload = {"props": {"pageProps": {"apolloState": apollo}}}
+    cards = "".join(
+        f'<a data-cy="list-product" href="/{item["slug"]}"><h2>{html.escape(item["name"])}</h2>'
+        f'<div>{_brl(item["price"])}</div></a>'
+        for item in items
+    )
+    return f"<html><head>{_next_data_script(payload)}</head><body>{cards}</body></html>"
+
+class StorefrontServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, catalogue, latency_ms=0, jitter_ms=0):
+        super().__init__(address, StorefrontHandler)
+        self.catalogue = catalogue
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests_served = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class StorefrontHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        base_url = self.server.base_url
+
+        if parts.path.startswith("/kabum/busca/"):
+            term = unquote_plus(parts.path[len("/kabum/busca/"):]).replace("-", " ")
+            return kabum_page(self.server.catalogue.items("kabum", term))
+        if parts.path == "/terabyte/busca":
+            term = query.get("str", [""])[0]
+            return terabyte_page(self.server.catalogue.items("terabyte", term), f"{base_url}/terabyte")
+        if parts.path == "/pichau/search":
+            term = query.get("q", [""])[0]
+            return pichau_page(self.server.catalogue.items("pichau", term))
+        return None
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self.path == "/__stats":
+            body, status = json.dumps({"requests": server.requests_served}), 200
+        else:
+            page = self._route()
+            body, status = (_pad(page), 200) if page is not None else ("not found", 404)
+            with server._count_lock:
+                server.requests_served += 1
+
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_server(host="127.0.0.1", port=0, products=60, latency_ms=0, jitter_ms=0, churn=0.1):
+    """Start the storefront in a background thread; returns the server (``.base_url``, ``.shutdown()``)"""
+    server = StorefrontServer((host, port), Catalogue(products, churn), latency_ms, jitter_ms)
+    threading.Thread(target=server.serve_forever, name="fake-storefront", daemon=True).start()
+    return server
+
+CAPTCHA_PAGE = '<html><head><title>Attention Required</title></head><body><div id="px-captcha"></div></body></html>'
+
+class StandInProxy(ThreadingHTTPServer):
+    """Plain-HTTP forward proxy that blocks a share of the requests and adds latency"""
+    daemon_threads = True
+
+    def __init__(self, address, block_rate=0.0, latency_ms=0):
+        super().__init__(address, StandInProxyHandler)
+        self.block_rate = block_rate
+        self.latency_ms = latency_ms
+        self.forwarded = 0
+        self.blocked = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class StandInProxyHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        # Só requisições de proxy (URL absoluta); HTTPS/CONNECT não é suportado
+        if not self.path.startswith("http://"):
+            self._send(400, "absolute URL expected")
+            return
+
+        if random.random() < server.block_rate:
+            with server._count_lock:
+                server.blocked += 1
+            if random.random() < 0.5:
+                self._send(403, "Access Denied")
+            else:
+                self._send(200, CAPTCHA_PAGE)
+            return
+
+        headers = {name: value for name, value in self.headers.items()
+                   if name.lower() not in ("proxy-connection", "proxy-authorization", "connection", "host")}
+        try:
+            with urlopen(Request(self.path, headers=headers), timeout=30) as response:
+                status, body = response.status, response.read()
+                content_type = response.headers.get("Content-Type", "text/html")
+                encoding = response.headers.get("Content-Encoding")
+        except Exception as e:
+            status = getattr(e, "code", 502)
+            body, content_type, encoding = str(e).encode("utf-8"), "text/plain", None
+
+        with server._count_lock:
+            server.forwarded += 1
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def parse_proxy_specs(value):
+    """[(block_rate, latency_ms)] from "rate[:latency_ms],..." """
+    specs = []
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        rate, _, latency = entry.strip().partition(":")
+        specs.append((float(rate), float(latency or 0)))
+    return specs
+
+def start_proxy(host="127.0.0.1", port=0, block_rate=0.0, latency_ms=0):
+    """Start a stand-in proxy in a background thread; returns the server (``.url``, ``.shutdown()``)"""
+    server = StandInProxy((host, port), block_rate, latency_ms)
+    threading.Thread(target=server.serve_forever, name="stand-in-proxy", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loja falsa local para testes de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--products", type=int, default=60, help="produtos por página de busca")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--churn", type=float, default=0.1, help="fração de preços alterados por requisição")
+    parser.add_argument("--proxies", default="", help="proxies locais nas portas seguintes: taxa_bloqueio[:latência_ms],...")
+    args = parser.parse_args()
+
+    server = StorefrontServer((args.host, args.port), Catalogue(args.products, args.churn), args.latency_ms, args.jitter_ms)
+    print(f"🛒 Loja falsa em {server.base_url} (kabum/, terabyte/, pichau/)")
+    proxies = [
+        start_proxy(args.host, args.port + index + 1, block_rate, latency_ms)
+        for index, (block_rate, latency_ms) in enumerate(parse_proxy_specs(args.proxies))
+    ]
+    if proxies:
+        print(f"🔀 SCRAPER_PROXIES={','.join(proxy.url for proxy in proxies)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -639,6 +639,29 @@ export const useProducts = () => {
             const startDate = new Date();
             startDate.setHours(startDate.getHours() - totalHours);
 
+            // Intervalos diários/semanais: uma linha por dia do rollup price_daily
+            if (intervalHours >= 24) {
+                const { data: dailyData, error: dailyError } = await supabaseClient
+                    .from('price_daily')
+                    .select('day, close_price, close_at, min_price, max_price, avg_price')
+                    .eq('product_id', productId)
+                    .gte('day', startDate.toISOString().slice(0, 10))
+                    .order('day', { ascending: true });
+
+                if (!dailyError && dailyData && dailyData.length > 0) {
+                    setPriceHistory(dailyData.map(row => ({
+                        price: parseFloat(row.close_price),
+                        collected_at: row.close_at,
+                        price_changed_at: row.close_at,
+                        min_price: parseFloat(row.min_price),
+                        max_price: parseFloat(row.max_price),
+                        avg_price: parseFloat(row.avg_price)
+                    })));
+                    return;
+                }
+                // Sem rollup (tabela ainda não preenchida): cai para os preços brutos
+            }
+
             const { data } = await supabaseClient
                 .from('prices')
                 .select('price, collected_at, price_changed_at')
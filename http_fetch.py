@@ -0,0 +1,147 @@
+"""Lightweight HTTP fetch mode for search pages that render without JavaScript.
+
+A single pooled, keep-alive ``urllib3`` client (already installed as a
+Selenium dependency) serves every plain-HTTP fetch with gzip/deflate
+compression and the same user-agent rotation as ``create_driver``. Every
+site uses Chrome unless ``SCRAPER_FETCH_MODES`` opts it into HTTP (e.g.
+``"terabyte=http,kabum=http"``); scrapers fall back to Chrome whenever the
+HTTP page cannot be used.
+
+With a ``proxy_pool`` lease, the fetch goes through one ``ProxyManager`` per
+proxy (also pooled and kept alive) and reports the outcome to the lease.
+"""
+import os
+import random
+import threading
+import time
+
+import proxy_pool
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+]
+
+# HTTP só por opt-in via SCRAPER_FETCH_MODES
+DEFAULT_FETCH_MODES = {"kabum": "browser", "terabyte": "browser", "pichau": "browser"}
+
+HTTP_TIMEOUT = float(os.getenv('HTTP_FETCH_TIMEOUT', '15'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '4'))
+
+# Páginas menores que isso são bloqueio/erro, não listagem
+MIN_PAGE_SIZE = 10000
+
+def random_user_agent():
+    """User agent drawn from the same pool used by the Chrome drivers"""
+    return random.choice(USER_AGENTS)
+
+def parse_fetch_modes(value):
+    """Parse "site=mode,site=mode" into a dict, on top of the defaults"""
+    modes = dict(DEFAULT_FETCH_MODES)
+    for entry in (value or "").split(","):
+        if "=" not in entry:
+            continue
+        site, mode = (part.strip().lower() for part in entry.split("=", 1))
+        if site and mode in ("http", "browser"):
+            modes[site] = mode
+    return modes
+
+FETCH_MODES = parse_fetch_modes(os.getenv('SCRAPER_FETCH_MODES'))
+
+def fetch_mode(website):
+    """"http" or "browser" for the given site"""
+    return FETCH_MODES.get(website, "browser")
+
+class HttpFetcher:
+    """Pooled keep-alive HTTP client; thread safe, one instance per process"""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        import urllib3
+
+        self.pool_options = {
+            "num_pools": 10,
+            "maxsize": pool_size,
+            "block": False,
+            "timeout": urllib3.Timeout(connect=5, read=timeout),
+            "retries": urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+        }
+        self.pool = urllib3.PoolManager(**self.pool_options)
+        self.proxy_pools = {}
+        self._proxy_lock = threading.Lock()
+        self.base_headers = urllib3.make_headers(accept_encoding=True, keep_alive=True)
+        self.base_headers.update({
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+        })
+
+    def _pool_for(self, proxy):
+        """Connection pool for a proxy URL (the direct pool for None/"direct")"""
+        if proxy in (None, proxy_pool.DIRECT):
+            return self.pool
+
+        manager = self.proxy_pools.get(proxy)
+        if manager is None:
+            import urllib3
+
+            with self._proxy_lock:
+                manager = self.proxy_pools.get(proxy)
+                if manager is None:
+                    parts = urllib3.util.parse_url(proxy)
+                    proxy_headers = urllib3.make_headers(proxy_basic_auth=parts.auth) if parts.auth else None
+                    manager = self.proxy_pools[proxy] = urllib3.ProxyManager(
+                        proxy, proxy_headers=proxy_headers, **self.pool_options
+                    )
+        return manager
+
+    def fetch(self, url, lease=None):
+        """GET a page and return its decoded text, or None when it is unusable"""
+        import urllib3
+
+        headers = dict(self.base_headers)
+        headers["User-Agent"] = random_user_agent()
+        pool = self._pool_for(lease.proxy if lease else None)
+        via = f" via {proxy_pool.display_name(lease.proxy)}" if lease and not lease.direct else ""
+
+        started = time.perf_counter()
+        try:
+            response = pool.request("GET", url, headers=headers, decode_content=True)
+        except Exception as e:
+            print(f"⚠️ Erro HTTP em {url}{via}: {e}")
+            if lease:
+                # Com retries, o timeout chega embrulhado em MaxRetryError
+                timed_out = isinstance(getattr(e, "reason", e), urllib3.exceptions.TimeoutError)
+                lease.report("timeout" if timed_out else "error", time.perf_counter() - started)
+            return None
+        latency = time.perf_counter() - started
+
+        if response.status != 200:
+            print(f"⚠️ HTTP {response.status} em {url}{via}")
+            if lease:
+                lease.report("blocked" if proxy_pool.detect_block(None, response.status) else "error")
+            return None
+
+        content_type = response.headers.get("Content-Type", "")
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=", 1)[1].split(";")[0].strip() or charset
+
+        text = response.data.decode(charset, errors="replace")
+        if lease:
+            blocked = proxy_pool.detect_block(text)
+            lease.report("blocked" if blocked else "ok", latency)
+        if len(text) < MIN_PAGE_SIZE:
+            return None
+        return text
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher():
+    """Shared HttpFetcher, so every search reuses the same pooled connections"""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = HttpFetcher()
+    return _fetcher
@@ -0,0 +1,286 @@
+"""Durable local spool for observations, drained to the main database in batches.
+
+In spool mode, ``save_product`` only appends the observation to a local
+SQLite file in WAL mode, which is a fast local write that works with the
+remote database down. A ``SpoolSyncer`` thread, or ``python
+ingest_spool.py drain`` run separately, replays the spool in order in
+batches of ``INGEST_SPOOL_BATCH``. Each batch is one transaction on the main
+database.
+
+Replays are idempotent: the last applied sequence number of each spool is
+stored in ``ingest_spool_cursors`` in the same transaction as the batch. A
+crash or lost connection mid-batch therefore rolls back both, and the next
+drain resumes from the last committed row. Spools are identified by a random
+id created with the file, so a recreated spool never inherits an old
+cursor.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Table, Column, String, BigInteger, DateTime, MetaData, select
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+import alert_state
+import change_outbox
+import observation_stream
+
+BATCH_SIZE = int(os.getenv('INGEST_SPOOL_BATCH', '500'))
+SYNC_INTERVAL = float(os.getenv('INGEST_SPOOL_SYNC_SECONDS', '5'))
+
+metadata = MetaData()
+
+ingest_spool_cursors = Table("ingest_spool_cursors", metadata,
+    Column("spool_id", String, primary_key=True),
+    Column("last_seq", BigInteger, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+class IngestSpool:
+    """Append-only SQLite spool; one connection per thread, safe to share"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS observations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                price TEXT NOT NULL,
+                website TEXT NOT NULL,
+                category TEXT NOT NULL,
+                product_link TEXT,
+                observed_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('spool_id', ?)", (uuid.uuid4().hex,))
+        conn.commit()
+        self.spool_id = conn.execute("SELECT value FROM meta WHERE key = 'spool_id'").fetchone()[0]
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, name, price, website, category, product_link, observed_at):
+        """Durably record one observation"""
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO observations (name, price, website, category, product_link, observed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (name, repr(float(price)), website, category, product_link, observed_at.isoformat()),
+        )
+        conn.commit()
+
+    def read_batch(self, after_seq, limit=BATCH_SIZE):
+        """Observations with seq > after_seq, oldest first"""
+        rows = self._conn().execute(
+            "SELECT seq, name, price, website, category, product_link, observed_at "
+            "FROM observations WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, limit),
+        ).fetchall()
+        return [{
+            "seq": row[0],
+            "name": row[1],
+            "price": float(row[2]),
+            "website": row[3],
+            "category": row[4],
+            "product_link": row[5],
+            "observed_at": datetime.fromisoformat(row[6]),
+        } for row in rows]
+
+    def purge(self, upto_seq):
+        """Drop rows already applied upstream"""
+        conn = self._conn()
+        conn.execute("DELETE FROM observations WHERE seq <= ?", (upto_seq,))
+        conn.commit()
+
+    def pending(self):
+        return self._conn().execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+
+def ensure_schema(engine):
+    """Create the cursor table if it does not exist"""
+    metadata.create_all(engine, tables=[ingest_spool_cursors], checkfirst=True)
+
+def drain_batch(spool, engine, store, batch_size=BATCH_SIZE):
+    """Apply one batch in a single transaction; returns how many observations were applied.
+
+    ``store(conn, name, price, website, category, product_link, observed_at)``
+    writes one observation using the caller's connection. Its outbox rows are
+    written together at the end of the batch. Stream events and
+    promotion checks it defers run only after the batch commits, once per
+    product at its final price; a batch that rolls back drops them, so a
+    retry never sends an alert twice.
+    """
+    with engine.begin() as conn:
+        try:
+            cursor_query = select(ingest_spool_cursors.c.last_seq).where(
+                ingest_spool_cursors.c.spool_id == spool.spool_id
+            )
+            if conn.dialect.name == "postgresql":
+                # Dois drenos do mesmo spool nunca aplicam o mesmo lote
+                cursor_query = cursor_query.with_for_update()
+            last_seq = conn.execute(cursor_query).scalar()
+
+            batch = spool.read_batch(last_seq or 0, batch_size)
+            if not batch:
+                if last_seq:
+                    spool.purge(last_seq)
+                return 0
+
+            for observation in batch:
+                store(conn, observation["name"], observation["price"], observation["website"],
+                      observation["category"], observation["product_link"], observation["observed_at"])
+
+            new_seq = batch[-1]["seq"]
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            if last_seq is None:
+                conn.execute(ingest_spool_cursors.insert().values(spool_id=spool.spool_id, last_seq=new_seq, updated_at=now))
+            else:
+                conn.execute(
+                    ingest_spool_cursors.update()
+                    .where(ingest_spool_cursors.c.spool_id == spool.spool_id)
+                    .values(last_seq=new_seq, updated_at=now)
+                )
+            # Por último: o lock de ordenação do outbox só fica preso daqui até o commit
+            change_outbox.flush(conn)
+        finally:
+            # Sempre sai da conexão: num rollback, o que foi adiado é descartado
+            change_outbox.take(conn)
+            events = observation_stream.take(conn)
+            promotions = alert_state.take(conn)
+
+    observation_stream.publish(events)
+    alert_state.run(promotions)
+    # Só depois do commit remoto: um crash aqui apenas re-lê linhas já aplicadas (cursor as pula)
+    spool.purge(new_seq)
+    return len(batch)
+
+def _is_connection_error(error):
+    return isinstance(error, (OperationalError, InterfaceError)) or getattr(error, "connection_invalidated", False)
+
+def _skip_observation(spool, engine, seq):
+    """Advance the cursor past one observation that the database rejects"""
+    with engine.begin() as conn:
+        updated = conn.execute(
+            ingest_spool_cursors.update()
+            .where(ingest_spool_cursors.c.spool_id == spool.spool_id)
+            .values(last_seq=seq, updated_at=datetime.now(timezone.utc).replace(tzinfo=None))
+        ).rowcount
+        if not updated:
+            conn.execute(ingest_spool_cursors.insert().values(
+                spool_id=spool.spool_id, last_seq=seq, updated_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            ))
+    spool.purge(seq)
+
+def drain(spool, engine, store, batch_size=BATCH_SIZE, stop_event=None):
+    """Drain until the spool is empty; returns the total applied.
+
+    Connection errors propagate (the caller retries later). A batch rejected
+    for any other reason is retried row by row, and only the offending row
+    is skipped, so one bad observation cannot block the spool.
+    """
+    total = 0
+    size = batch_size
+    single_rows = 0  # linhas restantes do lote rejeitado, aplicadas uma a uma
+    while not (stop_event and stop_event.is_set()):
+        try:
+            applied = drain_batch(spool, engine, store, size)
+        except Exception as e:
+            if _is_connection_error(e):
+                raise
+            if size > 1:
+                size, single_rows = 1, batch_size
+                continue
+            with engine.begin() as conn:
+                last_seq = conn.execute(
+                    select(ingest_spool_cursors.c.last_seq).where(ingest_spool_cursors.c.spool_id == spool.spool_id)
+                ).scalar()
+            bad = spool.read_batch(last_seq or 0, 1)
+            if not bad:
+                raise
+            print(f"❌ Spool: observação {bad[0]['seq']} rejeitada, pulando: {e}")
+            _skip_observation(spool, engine, bad[0]["seq"])
+            applied = 1
+        else:
+            if not applied:
+                break
+            total += applied
+
+        single_rows -= applied
+        if single_rows <= 0:
+            size = batch_size
+    return total
+
+class SpoolSyncer(threading.Thread):
+    """Background drain loop with backoff while the main database is unreachable"""
+
+    def __init__(self, spool, engine_factory, store, stop_event, prepare=None, interval=SYNC_INTERVAL):
+        super().__init__(name="spool-sync", daemon=True)
+        self.spool = spool
+        self.engine_factory = engine_factory
+        self.store = store
+        self.stop_event = stop_event
+        self.prepare = prepare
+        self.interval = interval
+
+    def run(self):
+        backoff = self.interval
+        ready = False
+        while not self.stop_event.is_set():
+            try:
+                engine = self.engine_factory()
+                if not ready:
+                    ensure_schema(engine)
+                    if self.prepare:
+                        self.prepare()
+                    ready = True
+
+                started = time.perf_counter()
+                applied = drain(self.spool, engine, self.store, stop_event=self.stop_event)
+                if applied:
+                    print(f"📤 Spool: {applied} observações sincronizadas em {time.perf_counter() - started:.1f}s")
+                backoff = self.interval
+            except Exception as e:
+                print(f"⚠️ Spool: banco indisponível ({e}), {self.spool.pending()} observações pendentes")
+                backoff = min(backoff * 2, 300)
+
+            if self.stop_event.wait(backoff):
+                break
+
+if __name__ == "__main__":
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Spool local de observações")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    drain_parser = subparsers.add_parser("drain")
+    drain_parser.add_argument("spool_file")
+    drain_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    stats_parser = subparsers.add_parser("stats")
+    stats_parser.add_argument("spool_file")
+
+    args = parser.parse_args()
+    spool = IngestSpool(args.spool_file)
+
+    if args.command == "drain":
+        # store_observation é igual nos dois scrapers; serve para qualquer loja
+        scraper = importlib.import_module("scraperall")
+        engine = scraper.get_engine()
+        ensure_schema(engine)
+        scraper.ensure_ingest_schema()
+        print(f"✅ {drain(spool, engine, scraper.store_observation, args.batch_size)} observações sincronizadas")
+    else:
+        print(json.dumps({"spool_id": spool.spool_id, "pending": spool.pending()}))
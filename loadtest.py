@@ -0,0 +1,309 @@
+"""End-to-end load test: the real scan loop against the local fake storefront.
+
+For every combination of fetch mode, tab count and worker count, the harness
+starts a fresh SQLite database, seeds ``--searches`` search configs per
+site and runs one scan with the real scraper code. Workers are separate
+processes in distributed mode. All base URLs point at
+``fake_storefront``. It then reports searches/min, cards/sec, DB writes/sec
+and p95 search latency::
+
+    python loadtest.py --sites kabum,terabyte,pichau --searches 20 --modes http,browser --tabs 1,3 --workers 1,2
+
+``--extract js,soup`` also compares, in browser mode, reading the DOM cards
+with ``execute_script`` (``dom_cards``) against page_source + BeautifulSoup.
+
+Browser mode needs Chrome and chromedriver, as in production. With
+``--proxies`` (same format as in ``fake_storefront``), the workers route
+through local stand-in proxies via ``SCRAPER_PROXIES``, and each scan prints
+the proxy scores at the end.
+
+Each worker counts the drivers that died mid-search and the watchdog
+timeouts. Rows with failures, or with a worker that wrote no result, are
+flagged in the report, because their searches/min and p95 do not measure
+the scraper. With several workers, each worker's output goes to a log, whose
+tail is printed when the row fails.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import fake_storefront
+import page_archive
+import scan_checkpoint
+import search_watchdog
+import work_queue
+
+SEARCH_TERMS = [
+    "rtx 4060", "rtx 4070 super", "rx 7600", "rx 7800 xt", "ryzen 5 5600", "ryzen 7 5700x3d",
+    "core i5 12400f", "core i7 13700k", "ssd nvme 1tb", "memoria ddr5 32gb", "fonte 750w",
+    "placa mae b550", "placa mae b760", "water cooler 240mm", "gabinete mid tower", "monitor 27 165hz",
+]
+
+def search_text_for(site, term):
+    """search_configs.search_text as each scraper expects it"""
+    if site == "pichau":
+        return f"/search?q={term.replace(' ', '+')}"
+    return term
+
+def seed(database_url, sites, searches_per_site):
+    """Create the schema and the search configs of one run"""
+    from sqlalchemy import create_engine
+
+    scraper = importlib.import_module("scraperall")
+    engine = create_engine(database_url)
+    scraper.metadata.create_all(engine)
+    work_queue.ensure_schema(engine)
+
+    config_id = 0
+    with engine.begin() as conn:
+        for site in sites:
+            for index in range(searches_per_site):
+                term = SEARCH_TERMS[index % len(SEARCH_TERMS)]
+                if index >= len(SEARCH_TERMS):
+                    term = f"{term} v{index // len(SEARCH_TERMS)}"
+                config_id += 1
+                conn.execute(scraper.search_configs.insert().values(
+                    id=config_id, search_text=search_text_for(site, term), category="loadtest",
+                    website=site, is_active=True,
+                ))
+                conn.execute(scraper.keyword_groups.insert().values(
+                    search_config_id=config_id, keywords=",".join(term.split()),
+                ))
+    engine.dispose()
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def run_worker(sites, result_path, with_delays=False):
+    """Child process: run one scan of every scraper module involved and dump its metrics"""
+    from sqlalchemy import event
+
+    latencies = []
+    totals = {"searches": 0, "cards": 0, "saved": 0, "db_writes": 0, "driver_failures": 0}
+    # Dentro de timed_multitab: o fallback busca a busca já é medido por ele
+    in_multitab = threading.local()
+
+    modules = []
+    for site in sites:
+        module_name = page_archive.SITE_MODULES[site]
+        if module_name not in modules:
+            modules.append(module_name)
+
+    started = time.perf_counter()
+    for module_name in modules:
+        scraper = importlib.import_module(module_name)
+
+        @event.listens_for(scraper.get_engine(), "after_cursor_execute")
+        def count_writes(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+                totals["db_writes"] += max(cursor.rowcount, 1)
+
+        def timed_search(website, search_config, process_search=scraper.process_search):
+            if getattr(in_multitab, "active", False):
+                return process_search(website, search_config)
+            search_started = time.perf_counter()
+            found, saved = process_search(website, search_config)
+            latencies.append(time.perf_counter() - search_started)
+            totals["cards"] += found
+            return found, saved
+
+        def timed_multitab(website, searches, process_searches_multitab=scraper.process_searches_multitab):
+            results = process_searches_multitab(website, searches)
+            last = time.perf_counter()
+            while True:
+                in_multitab.active = True
+                try:
+                    search, found, saved = next(results)
+                except StopIteration:
+                    return
+                finally:
+                    in_multitab.active = False
+                now = time.perf_counter()
+                # Latência de uma busca em abas: desde a anterior concluída no lote
+                latencies.append(now - last)
+                last = now
+                totals["cards"] += found
+                yield search, found, saved
+
+        @contextmanager
+        def counted_driver(website=None, managed_driver=scraper.managed_driver):
+            # Driver que morreu no meio da busca (travado, morto por outro processo, sem Chrome)
+            try:
+                with managed_driver(website) as driver:
+                    yield driver
+            except Exception:
+                totals["driver_failures"] += 1
+                raise
+
+        scraper.managed_driver = counted_driver
+        scraper.process_search = timed_search
+        scraper.process_searches_multitab = timed_multitab
+        if not with_delays:
+            scraper.random_delay = lambda stop_event=scraper.stop_event: stop_event.is_set()
+
+        checkpoint = scan_checkpoint.ScanCheckpoint(f"{result_path}.{module_name}.checkpoint")
+        scraper.run_scan_once(checkpoint)
+
+    elapsed = time.perf_counter() - started
+    totals["searches"] = len(latencies)
+    totals["timeouts"] = sum(search_watchdog.watchdog.timeouts.values())
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"elapsed": elapsed, "latencies": latencies, **totals}, f)
+
+def run_combination(sites, searches, mode, tabs, workers, storefront, workdir, with_delays, proxy_urls=(), extract="js"):
+    """Run one (mode, tabs, workers, extract) combination in fresh processes and aggregate the metrics"""
+    name = f"{mode}-t{tabs}-w{workers}-{extract}"
+    database_url = f"sqlite:///{os.path.join(workdir, name + '.db')}"
+    seed(database_url, sites, searches)
+
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "KABUM_BASE_URL": f"{storefront.base_url}/kabum",
+        "TERABYTE_BASE_URL": f"{storefront.base_url}/terabyte",
+        "PICHAU_BASE_URL": f"{storefront.base_url}/pichau",
+        "SCRAPER_FETCH_MODES": ",".join(f"{site}={mode}" for site in sites),
+        "SCRAPER_TABS": ",".join(f"{site}={tabs}" for site in sites),
+        "SCRAPER_DISTRIBUTED": "1" if workers > 1 else "",
+        "PAGE_ARCHIVE_DIR": "",
+        "SCRAPER_PROXIES": ",".join(proxy_urls),
+        "SCRAPER_DOM_EXTRACT": extract,
+    })
+
+    result_paths = [os.path.join(workdir, f"{name}.{index}.json") for index in range(workers)]
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--sites", ",".join(sites)]
+    if with_delays:
+        command.append("--with-delays")
+
+    started = time.perf_counter()
+    processes = []
+    logs = []
+    for path in result_paths:
+        # Vários workers: a saída de cada um vai para um log (mostrado se algo falhar)
+        log = open(f"{path}.log", "w", encoding="utf-8") if workers > 1 else None
+        logs.append(log)
+        processes.append(subprocess.Popen(command + ["--result", path], env=env, cwd=workdir,
+                                          stdout=log, stderr=subprocess.STDOUT if log else None))
+    for process in processes:
+        process.wait()
+    for log in logs:
+        if log:
+            log.close()
+    wall = time.perf_counter() - started
+
+    results = []
+    for path in result_paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                results.append(json.load(f))
+        except (OSError, ValueError):
+            print(f"⚠️ Worker sem resultado: {path}")
+
+    latencies = [latency for result in results for latency in result["latencies"]]
+    elapsed = max((result["elapsed"] for result in results), default=wall) or wall
+    total = lambda key: sum(result.get(key, 0) for result in results)
+
+    failures = total("driver_failures") + total("timeouts")
+    if workers > 1 and (failures or len(results) < workers):
+        print(f"⚠️ {failures} falhas de driver/timeouts com {workers} workers; final dos logs:")
+        for path in result_paths:
+            with open(f"{path}.log", "r", encoding="utf-8", errors="replace") as f:
+                for line in f.readlines()[-10:]:
+                    print(f"   [{os.path.basename(path)}] {line.rstrip()}")
+
+    return {
+        "mode": mode,
+        "tabs": tabs,
+        "extract": extract,
+        "workers": workers,
+        "searches": len(latencies),
+        "searches_per_min": len(latencies) / elapsed * 60,
+        "cards_per_sec": total("cards") / elapsed,
+        "db_writes_per_sec": total("db_writes") / elapsed,
+        "p95_latency": _percentile(latencies, 0.95),
+        "elapsed": elapsed,
+        "driver_failures": failures,
+        "complete": len(results) == workers,
+    }
+
+def print_report(rows):
+    print(f"\n{'modo':<8} {'abas':>4} {'extração':>8} {'workers':>7} {'buscas':>6} {'buscas/min':>10} {'cards/s':>8} {'escritas/s':>10} {'p95 (s)':>8} {'tempo (s)':>9} {'falhas':>6}")
+    for row in rows:
+        flag = "" if row["complete"] and not row["driver_failures"] else "  ⚠️"
+        print(f"{row['mode']:<8} {row['tabs']:>4} {row['extract']:>8} {row['workers']:>7} {row['searches']:>6} "
+              f"{row['searches_per_min']:>10.1f} {row['cards_per_sec']:>8.1f} {row['db_writes_per_sec']:>10.1f} "
+              f"{row['p95_latency']:>8.2f} {row['elapsed']:>9.1f} {row['driver_failures']:>6}{flag}")
+    if any(row["driver_failures"] or not row["complete"] for row in rows):
+        print("⚠️ Linhas marcadas tiveram drivers derrubados, timeouts ou workers sem resultado: "
+              "buscas/min e p95 delas não são comparáveis")
+
+def _int_list(value):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do scraper contra a loja falsa local")
+    parser.add_argument("--sites", default="kabum,terabyte,pichau")
+    parser.add_argument("--searches", type=int, default=10, help="configs de busca por site")
+    parser.add_argument("--modes", default="http,browser", help="modos de fetch a comparar")
+    parser.add_argument("--tabs", default="1", help="abas por site a comparar (modo browser)")
+    parser.add_argument("--extract", default="js", help="extração dos cards no DOM a comparar: js, soup (modo browser)")
+    parser.add_argument("--workers", default="1", help="processos em modo distribuído a comparar")
+    parser.add_argument("--products", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--churn", type=float, default=0.1)
+    parser.add_argument("--proxies", default="", help="proxies locais: taxa_bloqueio[:latência_ms],...")
+    parser.add_argument("--with-delays", action="store_true", help="mantém os delays aleatórios entre buscas")
+    parser.add_argument("--json", help="grava os resultados também neste arquivo")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sites = [site.strip() for site in args.sites.split(",") if site.strip() in page_archive.SITE_MODULES]
+
+    if args.worker:
+        run_worker(sites, args.result, args.with_delays)
+        sys.exit(0)
+
+    storefront = fake_storefront.start_server(
+        products=args.products, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, churn=args.churn
+    )
+    print(f"🛒 Loja falsa em {storefront.base_url}")
+    proxies = [
+        fake_storefront.start_proxy(block_rate=block_rate, latency_ms=latency_ms)
+        for block_rate, latency_ms in fake_storefront.parse_proxy_specs(args.proxies)
+    ]
+    if proxies:
+        print(f"🔀 Proxies: {', '.join(proxy.url for proxy in proxies)}")
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="scraper-loadtest-") as workdir:
+        modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+        extracts = [extract.strip() for extract in args.extract.split(",") if extract.strip()]
+        for mode, tabs, workers, extract in itertools.product(modes, _int_list(args.tabs), _int_list(args.workers), extracts):
+            if mode == "http" and (tabs > 1 or extract != extracts[0]):
+                continue  # abas e extração do DOM só existem no modo browser
+            print(f"\n🏁 modo={mode} abas={tabs} workers={workers} extração={extract}")
+            rows.append(run_combination(sites, args.searches, mode, tabs, workers, storefront, workdir, args.with_delays,
+                                        [proxy.url for proxy in proxies], extract))
+
+    storefront.shutdown()
+    for proxy in proxies:
+        print(f"🔀 {proxy.url}: {proxy.forwarded} encaminhadas, {proxy.blocked} bloqueadas")
+        proxy.shutdown()
+    print_report(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,124 @@
+"""RSS tracking for the scraper process and the Chrome process tree it drives.
+
+Uses ``psutil`` when it is installed and falls back to ``/proc`` on Linux,
+so the container image does not need an extra dependency. Limits are set in
+megabytes with ``SCRAPER_RSS_LIMIT_MB`` (our Python process) and
+``DRIVER_RSS_LIMIT_MB`` (chromedriver + every Chrome process below it).
+"""
+import gc
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SCRAPER_RSS_LIMIT_MB = int(os.getenv('SCRAPER_RSS_LIMIT_MB', '400'))
+DRIVER_RSS_LIMIT_MB = int(os.getenv('DRIVER_RSS_LIMIT_MB', '1200'))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _proc_children(pid):
+    """Direct children of a pid from /proc (Linux without psutil)"""
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # comm pode conter espaços: o ppid vem depois do último ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return children
+
+def process_rss(pid=None):
+    """Resident memory of a single process in bytes (0 when unknown)"""
+    pid = pid or os.getpid()
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except Exception:
+            return 0
+    return _proc_rss(pid)
+
+def process_tree_rss(pid):
+    """Resident memory of a process and all of its descendants in bytes"""
+    if not pid:
+        return 0
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except Exception:
+                    continue
+            return total
+        except Exception:
+            return 0
+
+    return sum(_proc_rss(current) for current in process_tree_pids(pid))
+
+def process_tree_pids(pid):
+    """A process followed by all of its descendants (parents before children)"""
+    if not pid:
+        return []
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except Exception:
+            return [pid]
+
+    pids = []
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(_proc_children(current))
+    return pids
+
+def driver_pid(driver):
+    """PID of the chromedriver process behind a Selenium driver, if available"""
+    try:
+        return driver.service.process.pid
+    except Exception:
+        return None
+
+def driver_rss(driver):
+    """RSS of chromedriver plus every Chrome process it spawned, in bytes"""
+    return process_tree_rss(driver_pid(driver))
+
+def mb(value):
+    return value / (1024 * 1024)
+
+def driver_over_limit(driver, limit_mb=DRIVER_RSS_LIMIT_MB):
+    """True when the driver's process tree passed the configured ceiling"""
+    rss = driver_rss(driver)
+    if rss and mb(rss) > limit_mb:
+        print(f"♻️ Chrome usando {mb(rss):.0f} MB (limite {limit_mb} MB), reciclando driver")
+        return True
+    return False
+
+def enforce_process_limit(limit_mb=SCRAPER_RSS_LIMIT_MB):
+    """Collect garbage when our own RSS passed the ceiling; returns the RSS in MB"""
+    rss_mb = mb(process_rss())
+    if rss_mb > limit_mb:
+        gc.collect()
+        rss_mb = mb(process_rss())
+        print(f"🧹 RSS do scraper acima do limite ({limit_mb} MB): {rss_mb:.0f} MB após gc")
+    return rss_mb
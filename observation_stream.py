@@ -0,0 +1,219 @@
+"""NDJSON stream of observations and price changes, published as they commit.
+
+``store_observation`` queues one event per observation on its connection.
+Whoever owns the transaction (``save_product``, the spool drain) takes the
+queued events and publishes them only after the commit. A rolled back
+transaction's events are simply never taken, so consumers never see a price
+the database does not have. Every event is one JSON line:
+
+    {"type": "price_change", "site": "kabum", "sku": "123456", "product_id": 42,
+     "name": "...", "category": "...", "link": "...", "price": 1899.9,
+     "previous_price": 1999.9, "weighted_average": 2049.3,
+     "observed_at": "2026-01-01T12:00:00-03:00"}
+
+``type`` is ``new_product``, ``price_change`` or ``observation`` (same
+price, checked again), the same classification as ``change_outbox``. ``weighted_average`` is the same check_count-weighted
+average of the earlier price rows that the promotion check uses.
+
+Outputs, each optional:
+
+- ``OBSERVATION_STREAM_PORT``: HTTP server on ``OBSERVATION_STREAM_HOST``
+  (default 127.0.0.1). ``GET /events`` streams NDJSON (``?site=kabum`` to
+  filter), with a heartbeat line every 15s. A client that falls more than
+  ``OBSERVATION_STREAM_BUFFER`` events behind loses the overflow, never
+  slowing the scraper down.
+- ``OBSERVATION_STREAM_FILE``: append-only NDJSON file.
+
+To follow a stream::
+
+    python observation_stream.py tail http://127.0.0.1:8790/events --site kabum
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import case, func, select
+
+import product_keys
+
+STREAM_HOST = os.getenv('OBSERVATION_STREAM_HOST', '127.0.0.1')
+STREAM_PORT = os.getenv('OBSERVATION_STREAM_PORT', '')
+STREAM_FILE = os.getenv('OBSERVATION_STREAM_FILE', '')
+BUFFER_SIZE = int(os.getenv('OBSERVATION_STREAM_BUFFER', '10000'))
+HEARTBEAT_SECONDS = 15
+
+class Broker:
+    """Fan-out of events to subscriber queues and the optional file"""
+
+    def __init__(self, file_path=None):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._file = open(file_path, "a", encoding="utf-8") if file_path else None
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def active(self):
+        return self._file is not None or bool(self._subscribers) or _server is not None
+
+    def subscribe(self, site=None):
+        subscriber = (queue.Queue(maxsize=BUFFER_SIZE), site)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, events):
+        lines = [json.dumps(item, ensure_ascii=False, default=str) for item in events]
+        with self._lock:
+            if self._file is not None:
+                self._file.write("".join(line + "\n" for line in lines))
+                self._file.flush()
+            for item, line in zip(events, lines):
+                self.published += 1
+                for subscriber_queue, site in self._subscribers:
+                    if site and item.get("site") != site:
+                        continue
+                    try:
+                        subscriber_queue.put_nowait(line)
+                    except queue.Full:
+                        self.dropped += 1
+
+broker = Broker(STREAM_FILE or None)
+
+def enabled():
+    """True when some output is configured (events are not even built otherwise)"""
+    return broker.active
+
+# Eventos por conexão ainda não commitados (somem com a conexão)
+_pending = weakref.WeakKeyDictionary()
+
+def defer(conn, item):
+    """Queue an event on a connection, to be published after its transaction commits"""
+    _pending.setdefault(conn, []).append(item)
+
+def take(conn):
+    """Events queued on a connection (call inside the transaction, publish after it)"""
+    return _pending.pop(conn, [])
+
+def publish(events):
+    if not events:
+        return
+    try:
+        broker.publish(events)
+    except Exception as e:
+        print(f"⚠️ Erro ao publicar eventos: {e}")
+
+def build_event(conn, prices, kind, product_id, name, price, website, category, product_link,
+                observed_at, previous_price):
+    """Event for an observation just written.
+
+    ``kind`` is the change kind ``store_observation`` also writes to the
+    outbox (``observation`` when neither applies), so both always agree.
+    previous_price is None when the product had no price row.
+    """
+    price = float(price)
+
+    # Mesma regra de calculate_weighted_average: linhas anteriores com peso
+    # max(1, check_count) e a linha atual com check_count - 1, ou seja, tudo
+    # menos a checagem que acabou de ser gravada
+    checks = case((prices.c.check_count > 1, prices.c.check_count), else_=1)
+    rows, weighted_sum, total_checks = conn.execute(
+        select(func.count(), func.sum(prices.c.price * checks), func.sum(checks))
+        .where(prices.c.product_id == product_id)
+    ).one()
+    weighted_average = None
+    if rows > 1 and total_checks > 1:
+        weighted_average = round((float(weighted_sum) - price) / (total_checks - 1), 2)
+
+    return {
+        "type": kind,
+        "site": website,
+        "sku": product_keys.extract_site_sku(website, product_link),
+        "product_id": product_id,
+        "name": name,
+        "category": category,
+        "link": product_link,
+        "price": price,
+        "previous_price": previous_price,
+        "weighted_average": weighted_average,
+        "observed_at": observed_at.isoformat(),
+    }
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path != "/events":
+            self.send_error(404)
+            return
+
+        site = parse_qs(parts.query).get("site", [None])[0]
+        subscriber = broker.subscribe(site)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.flush()
+
+            while True:
+                try:
+                    line = subscriber[0].get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    line = '{"type": "heartbeat"}'
+                self.wfile.write(line.encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            broker.unsubscribe(subscriber)
+
+class StreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+_server = None
+
+def start(host=STREAM_HOST, port=None):
+    """Start the /events server in a background thread when a port is configured"""
+    global _server
+    port = port if port is not None else STREAM_PORT
+    if _server is not None or port in (None, ""):
+        return _server
+    _server = StreamServer((host, int(port)), StreamHandler)
+    threading.Thread(target=_server.serve_forever, name="observation-stream", daemon=True).start()
+    print(f"📡 Stream de observações em http://{host}:{_server.server_address[1]}/events")
+    return _server
+
+if __name__ == "__main__":
+    from urllib.request import urlopen
+
+    parser = argparse.ArgumentParser(description="Stream NDJSON de observações")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tail_parser = subparsers.add_parser("tail")
+    tail_parser.add_argument("url")
+    tail_parser.add_argument("--site")
+
+    args = parser.parse_args()
+    url = f"{args.url}{'&' if '?' in args.url else '?'}site={args.site}" if args.site else args.url
+    try:
+        with urlopen(url) as response:
+            for raw in response:
+                line = raw.decode("utf-8").strip()
+                if line and '"heartbeat"' not in line:
+                    print(line, flush=True)
+    except KeyboardInterrupt:
+        pass
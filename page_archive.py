@@ -0,0 +1,247 @@
+"""Compressed archive of fetched search pages, plus a parallel reprocessing command.
+
+When ``PAGE_ARCHIVE_DIR`` is set, every page a scraper fetches is stored
+zstd-compressed in a content-addressed object store
+(``objects/<sha256[:2]>/<sha256>.zst``) and indexed by site, search and
+fetch time in a local SQLite file. Identical pages are stored once.
+
+Reprocessing re-runs extraction and matching (with the current search
+configs) over a date range with a process pool, with no browser and no
+network, and backfills price history older than what the database has::
+
+    python page_archive.py reprocess --since 2026-10-01 --until 2026-10-05 --site kabum --workers 4
+    python page_archive.py stats
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+ARCHIVE_DIR = os.getenv('PAGE_ARCHIVE_DIR', '')
+ENABLED = bool(ARCHIVE_DIR)
+ZSTD_LEVEL = int(os.getenv('PAGE_ARCHIVE_ZSTD_LEVEL', '6'))
+
+brasilia = ZoneInfo("America/Sao_Paulo")
+
+# site -> módulo do scraper que define SITE_PAGES[site]
+SITE_MODULES = {
+    "kabum": "scraperall",
+    "terabyte": "scraperall",
+    "pichau": "scraperpichau",
+}
+
+_index_lock = threading.Lock()
+_index_conn = None
+
+def _index():
+    global _index_conn
+    if _index_conn is None:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(ARCHIVE_DIR, "index.db"), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                site TEXT NOT NULL,
+                search_text TEXT NOT NULL,
+                category TEXT NOT NULL,
+                keywords TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS pages_site_fetched_at ON pages (site, fetched_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)")
+        conn.commit()
+        _index_conn = conn
+    return _index_conn
+
+def _object_path(digest):
+    return os.path.join(ARCHIVE_DIR, "objects", digest[:2], f"{digest}.zst")
+
+def archive_page(site, search_text, wordlist, category, page_source):
+    """Store a fetched page (no-op unless PAGE_ARCHIVE_DIR is set); never raises"""
+    if not ENABLED or not page_source:
+        return None
+
+    try:
+        import zstandard
+
+        raw = page_source.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = _object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw))
+            os.replace(tmp_path, path)
+
+        fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        with _index_lock:
+            conn = _index()
+            conn.execute(
+                "INSERT INTO pages (site, search_text, category, keywords, fetched_at, digest, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (site, search_text, category, json.dumps(wordlist), fetched_at, digest, len(raw)),
+            )
+            conn.commit()
+        return digest
+    except Exception as e:
+        print(f"⚠️ Erro ao arquivar página de {site}: {e}")
+        return None
+
+def load_page(digest):
+    """Decompressed HTML of an archived page"""
+    import zstandard
+
+    with open(_object_path(digest), "rb") as f:
+        return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+
+def iter_pages(since=None, until=None, site=None):
+    """Index rows in fetch order, optionally filtered by UTC date range and site"""
+    query = "SELECT id, site, search_text, category, keywords, fetched_at, digest FROM pages WHERE 1=1"
+    params = []
+    if since:
+        query += " AND fetched_at >= ?"
+        params.append(since)
+    if until:
+        query += " AND fetched_at < ?"
+        params.append(until)
+    if site:
+        query += " AND site = ?"
+        params.append(site)
+    query += " ORDER BY fetched_at, id"
+
+    with _index_lock:
+        rows = _index().execute(query, params).fetchall()
+    for row in rows:
+        yield {
+            "id": row[0],
+            "site": row[1],
+            "search_text": row[2],
+            "category": row[3],
+            "keywords": json.loads(row[4]),
+            "fetched_at": row[5],
+            "digest": row[6],
+        }
+
+def _extract_worker(page):
+    """Process-pool worker: decompress and run the site's extractor (CPU only, no DB)"""
+    module = importlib.import_module(SITE_MODULES[page["site"]])
+    _, extract_page, _ = module.SITE_PAGES[page["site"]]
+    try:
+        extracted = extract_page(load_page(page["digest"]), page["keywords"])
+    except Exception as e:
+        print(f"❌ Erro ao reprocessar página {page['id']}: {e}")
+        extracted = None
+    return page, extracted
+
+def current_searches(pages):
+    """Active search configs of the archived pages' sites, keyed by (site, search_text)"""
+    searches = {}
+    for module_name in sorted({SITE_MODULES[page["site"]] for page in pages}):
+        module = importlib.import_module(module_name)
+        for search in module.get_search_configs_with_keywords():
+            searches[(search["website"], search["search_text"])] = search
+    return searches
+
+def reprocess(since=None, until=None, site=None, workers=None, dry_run=False):
+    """Re-run extraction over archived pages in parallel and backfill the results.
+
+    Pages are matched with the *current* keywords and category of their
+    search config; pages of searches that are no longer active are skipped.
+    Results go through the scrapers' ``backfill_observation``, oldest page
+    first: they fill gaps in a product's price history (e.g. days a selector
+    was broken), observations whose time already has a price row are
+    skipped and counted, and no alert, outbox row or stream event is
+    produced. Returns (found, written, skipped).
+    """
+    pages = list(iter_pages(since, until, site))
+    searches = current_searches(pages)
+
+    replayable = []
+    for page in pages:
+        search = searches.get((page["site"], page["search_text"]))
+        if search is None:
+            continue
+        page["keywords"] = search["keywords"]
+        page["category"] = search["category"]
+        replayable.append(page)
+
+    skipped_pages = len(pages) - len(replayable)
+    print(f"🔁 Reprocessando {len(replayable)} páginas com {workers or os.cpu_count()} processos"
+          f"{f' ({skipped_pages} de buscas inativas ignoradas)' if skipped_pages else ''}")
+
+    total_found = total_saved = total_skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for page, extracted in executor.map(_extract_worker, replayable, chunksize=8):
+            if not extracted:
+                continue
+
+            products_found, products = extracted
+            total_found += products_found
+            if dry_run:
+                continue
+
+            module = importlib.import_module(SITE_MODULES[page["site"]])
+            _, _, store = module.SITE_PAGES[page["site"]]
+            observed_at = datetime.fromisoformat(page["fetched_at"]).replace(tzinfo=timezone.utc).astimezone(brasilia)
+            module.ensure_ingest_schema()
+            try:
+                with module.get_engine().begin() as conn:
+                    for product in products:
+                        if product["price"] and product["price"] > 10.0 and product["link"]:
+                            if module.backfill_observation(conn, product["name"], product["price"], store,
+                                                           page["category"], product["link"], observed_at):
+                                total_saved += 1
+                            else:
+                                total_skipped += 1
+            except Exception as e:
+                print(f"❌ Erro ao gravar página {page['id']}: {e}")
+
+    print(f"✅ Reprocessamento: {total_found} produtos encontrados, {total_saved} gravados no histórico")
+    if total_skipped:
+        print(f"⏭️ {total_skipped} observações ignoradas: o horário já tinha preço gravado")
+    return total_found, total_saved, total_skipped
+
+def stats():
+    """Print page count, raw size and stored size of the archive"""
+    with _index_lock:
+        count, raw_size, unique = _index().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT digest) FROM pages"
+        ).fetchone()
+    stored = 0
+    for root, _, files in os.walk(os.path.join(ARCHIVE_DIR, "objects")):
+        stored += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    print(f"📦 {count} páginas ({unique} únicas), {raw_size / 1e6:.1f} MB brutos, {stored / 1e6:.1f} MB armazenados")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivo de páginas e reprocessamento")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reprocess_parser = subparsers.add_parser("reprocess")
+    reprocess_parser.add_argument("--since", help="data/hora UTC inicial (ISO, inclusiva)")
+    reprocess_parser.add_argument("--until", help="data/hora UTC final (ISO, exclusiva)")
+    reprocess_parser.add_argument("--site", choices=sorted(SITE_MODULES))
+    reprocess_parser.add_argument("--workers", type=int, default=None)
+    reprocess_parser.add_argument("--dry-run", action="store_true")
+
+    subparsers.add_parser("stats")
+
+    args = parser.parse_args()
+    if not ENABLED:
+        parser.error("defina PAGE_ARCHIVE_DIR")
+
+    if args.command == "reprocess":
+        reprocess(args.since, args.until, args.site, args.workers, args.dry_run)
+    else:
+        stats()
@@ -0,0 +1,53 @@
+import { supabaseClient } from '@/utils/supabase';
+
+// Leitura incremental do change_outbox: o cliente guarda o último cursor e pede só o que mudou depois dele
+export default async function handler(req, res) {
+  if (req.method !== 'GET') {
+    return res.status(405).json({ message: 'Method not allowed' });
+  }
+
+  const since = parseInt(req.query.since ?? '0', 10);
+  const limit = Math.min(Math.max(parseInt(req.query.limit ?? '500', 10) || 500, 1), 5000);
+
+  if (Number.isNaN(since) || since < 0) {
+    return res.status(400).json({ error: 'Invalid cursor' });
+  }
+
+  try {
+    let query = supabaseClient
+      .from('change_outbox')
+      .select('seq, kind, product_id, website, name, category, product_link, price, previous_price, changed_at')
+      .gt('seq', since)
+      .order('seq', { ascending: true })
+      .limit(limit);
+
+    if (req.query.website) {
+      query = query.eq('website', req.query.website);
+    }
+
+    const { data: changes, error } = await query;
+
+    if (error) {
+      return res.status(500).json({
+        error: 'Failed to fetch changes',
+        details: error.message
+      });
+    }
+
+    const cursor = changes.length > 0 ? changes[changes.length - 1].seq : since;
+
+    res.setHeader('Cache-Control', 'no-store');
+    return res.status(200).json({
+      changes: changes.map(change => ({
+        ...change,
+        price: parseFloat(change.price),
+        previous_price: change.previous_price === null ? null : parseFloat(change.previous_price)
+      })),
+      cursor,
+      hasMore: changes.length === limit
+    });
+  } catch (error) {
+    console.error('Error fetching changes:', error);
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+}
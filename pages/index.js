@@ -593,6 +593,14 @@ export default function Home() {
     });
   };
 
+  // Pede rescan prioritário (tabela scrape_requests, lida pelos scrapers em segundos)
+  const requestRescan = async (configIds) => {
+    const rows = configIds.filter(Boolean).map(id => ({ search_config_id: id, requested_by: 'dashboard' }));
+    if (rows.length === 0) return;
+    const { error } = await supabaseClient.from('scrape_requests').insert(rows);
+    if (error) console.error('Error requesting rescan:', error);
+  };
+
   const updateSearchConfig = async () => {
     if (!newSearch.search_text || !newSearch.category) return;
 
@@ -630,6 +638,7 @@ export default function Home() {
       }));
 
       await supabaseClient.from('keyword_groups').insert(keywordGroupsData);
+      const rescanIds = [editingConfig.id];
 
       // Handle additional websites (create new configs if multiple selected)
       for (let i = 1; i < selectedWebsites.length; i++) {
@@ -649,8 +658,11 @@ export default function Home() {
         }));
 
         await supabaseClient.from('keyword_groups').insert(keywordGroupsData);
+        rescanIds.push(configData[0].id);
       }
 
+      if (newSearch.is_active) await requestRescan(rescanIds);
+
       cancelEdit();
       window.location.reload();
     } catch (error) {
@@ -671,6 +683,7 @@ export default function Home() {
     if (selectedWebsites.length === 0) return;
 
     try {
+      const rescanIds = [];
       for (const website of selectedWebsites) {
         const { data: configData } = await supabaseClient
           .from('search_configs')
@@ -688,8 +701,11 @@ export default function Home() {
         }));
 
         await supabaseClient.from('keyword_groups').insert(keywordGroupsData);
+        rescanIds.push(configData[0].id);
       }
 
+      if (newSearch.is_active) await requestRescan(rescanIds);
+
       cancelEdit();
     } catch (error) {
       console.error('Error adding config:', error);
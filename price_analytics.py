@@ -0,0 +1,236 @@
+"""Bulk recompute of weighted averages, discounts and would-alert flags.
+
+``calculate_weighted_average`` answers for one product at a time. To
+re-evaluate the whole catalog after changing the promotion rule, this
+streams ``prices`` in (product, ``price_changed_at``) order into NumPy
+arrays and computes every product in one vectorised pass, using
+``np.add.reduceat`` over the product boundaries. The rule is the same:
+
+- earlier rows weigh ``max(1, check_count)``
+- the current row (the last one) weighs ``check_count - current_adjust``
+  (``check_count - 1`` by default, never below 0)
+- products with a single row have no average
+
+A product would alert when its current price is at least ``--threshold``
+percent under the average and at least ``--floor`` reais. Results go to a
+CSV file or to the ``price_analytics`` table (replaced on each run)::
+
+    python price_analytics.py --csv analytics.csv
+    python price_analytics.py --table --threshold 7 --floor 50
+    python price_analytics.py --csv /tmp/a.csv --verify 200
+"""
+import argparse
+import csv
+import os
+import random
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import (Table, Column, Integer, Float, Boolean, DateTime, String, MetaData, select, cast,
+                        func)
+
+brasilia = ZoneInfo("America/Sao_Paulo")
+
+DEFAULT_THRESHOLD = 5.0   # % mínimo de desconto (check_promotion_and_notify)
+DEFAULT_FLOOR = 20.0      # preço mínimo em R$
+DEFAULT_CURRENT_ADJUST = 1
+CHUNK_ROWS = 100_000
+
+metadata = MetaData()
+
+_prices = Table("prices", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("product_id", Integer),
+    Column("price", Float),
+    Column("check_count", Integer),
+    Column("price_changed_at", DateTime),
+)
+
+_products = Table("products", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("website", String),
+)
+
+price_analytics = Table("price_analytics", metadata,
+    Column("product_id", Integer, primary_key=True),
+    Column("price_rows", Integer, nullable=False),
+    Column("current_price", Float, nullable=False),
+    Column("weighted_average", Float),
+    Column("discount_percent", Float),
+    Column("would_alert", Boolean, nullable=False),
+    Column("threshold", Float, nullable=False),
+    Column("price_floor", Float, nullable=False),
+    Column("computed_at", DateTime, nullable=False),
+)
+
+def load_prices(engine, chunk_rows=CHUNK_ROWS):
+    """(product_id, price, check_count) arrays of every prices row, in calculation order"""
+    query = (
+        select(_prices.c.product_id, cast(_prices.c.price, Float), func.coalesce(_prices.c.check_count, 1))
+        .order_by(_prices.c.product_id, _prices.c.price_changed_at, _prices.c.id)
+    )
+    product_ids, prices, checks = [], [], []
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(query)
+        for rows in result.partitions(chunk_rows):
+            columns = np.array(rows, dtype=np.float64)
+            product_ids.append(columns[:, 0].astype(np.int64))
+            prices.append(columns[:, 1])
+            checks.append(columns[:, 2].astype(np.int64))
+
+    if not product_ids:
+        empty = np.array([], dtype=np.int64)
+        return empty, np.array([], dtype=np.float64), empty
+    return np.concatenate(product_ids), np.concatenate(prices), np.concatenate(checks)
+
+def compute(product_ids, prices, checks, threshold=DEFAULT_THRESHOLD, floor=DEFAULT_FLOOR,
+            current_adjust=DEFAULT_CURRENT_ADJUST):
+    """Per-product arrays: ids, rows, current price, weighted average (NaN = none), discount %, would_alert"""
+    if product_ids.size == 0:
+        empty = np.array([])
+        return {"product_id": empty.astype(np.int64), "price_rows": empty.astype(np.int64),
+                "current_price": empty, "weighted_average": empty, "discount_percent": empty,
+                "would_alert": empty.astype(bool)}
+
+    starts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]])
+    ends = np.r_[starts[1:], product_ids.size] - 1
+    rows = ends - starts + 1
+
+    weights = np.maximum(checks, 1).astype(np.float64)
+    # Linha atual: check_count - ajuste (a checagem que dispara o alerta não entra na própria média)
+    weights[ends] = np.maximum(np.maximum(checks[ends], 1) - current_adjust, 0)
+
+    weighted_sums = np.add.reduceat(prices * weights, starts)
+    total_weights = np.add.reduceat(weights, starts)
+    valid = (rows > 1) & (total_weights > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        averages = np.where(valid, weighted_sums / total_weights, np.nan)
+        current = prices[ends]
+        discount = np.where(valid, (current - averages) / averages * 100, np.nan)
+
+    discount_off = np.where(discount < 0, -discount, 0.0)
+    would_alert = (
+        valid
+        & (averages != current)
+        & (discount < 0)
+        & (discount_off >= threshold)
+        & (current >= floor)
+        & (averages - current > 0)
+    )
+
+    return {
+        "product_id": product_ids[starts],
+        "price_rows": rows,
+        "current_price": current,
+        "weighted_average": averages,
+        "discount_percent": discount,
+        "would_alert": would_alert,
+    }
+
+def _records(results, threshold, floor):
+    computed_at = datetime.now(brasilia).replace(tzinfo=None)
+    for index in range(results["product_id"].size):
+        average = results["weighted_average"][index]
+        discount = results["discount_percent"][index]
+        yield {
+            "product_id": int(results["product_id"][index]),
+            "price_rows": int(results["price_rows"][index]),
+            "current_price": float(results["current_price"][index]),
+            "weighted_average": None if np.isnan(average) else round(float(average), 4),
+            "discount_percent": None if np.isnan(discount) else round(float(discount), 4),
+            "would_alert": bool(results["would_alert"][index]),
+            "threshold": threshold,
+            "price_floor": floor,
+            "computed_at": computed_at,
+        }
+
+def write_table(engine, results, threshold, floor, batch_size=5000):
+    """Replace the contents of price_analytics with these results"""
+    metadata.create_all(engine, tables=[price_analytics], checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(price_analytics.delete())
+        batch = []
+        for record in _records(results, threshold, floor):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                conn.execute(price_analytics.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(price_analytics.insert(), batch)
+
+def write_csv(engine, path, results, threshold, floor):
+    """Write the results with product name and site to a CSV file"""
+    with engine.connect() as conn:
+        names = {row.id: (row.name, row.website) for row in conn.execute(select(_products))}
+
+    fields = ["product_id", "website", "name", "price_rows", "current_price", "weighted_average",
+              "discount_percent", "would_alert", "threshold", "price_floor", "computed_at"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for record in _records(results, threshold, floor):
+            name, website = names.get(record["product_id"], (None, None))
+            writer.writerow({**record, "name": name, "website": website})
+
+def verify(results, sample_size=100):
+    """Compare a sample against calculate_weighted_average (current rule only); returns (checked, mismatches)"""
+    import scraperall
+
+    indexes = list(range(results["product_id"].size))
+    sample = random.sample(indexes, min(sample_size, len(indexes)))
+    mismatches = []
+    for index in sample:
+        product_id = int(results["product_id"][index])
+        expected = scraperall.calculate_weighted_average(product_id)
+        got = results["weighted_average"][index]
+        got = None if np.isnan(got) else float(got)
+        if (expected is None) != (got is None) or (expected is not None and abs(expected - got) > 1e-6):
+            mismatches.append((product_id, expected, got))
+    return len(sample), mismatches
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Recalcula médias ponderadas e descontos do catálogo inteiro")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="desconto mínimo em %%")
+    parser.add_argument("--floor", type=float, default=DEFAULT_FLOOR, help="preço mínimo em R$")
+    parser.add_argument("--current-adjust", type=int, default=DEFAULT_CURRENT_ADJUST,
+                        help="checagens da linha atual fora da média (regra atual: 1)")
+    parser.add_argument("--csv", help="grava os resultados neste CSV")
+    parser.add_argument("--table", action="store_true", help="grava os resultados na tabela price_analytics")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="confere N produtos sorteados com calculate_weighted_average")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.getenv('DATABASE_URL'), echo=False)
+
+    started = time.perf_counter()
+    product_ids, prices, checks = load_prices(engine)
+    loaded = time.perf_counter()
+    results = compute(product_ids, prices, checks, args.threshold, args.floor, args.current_adjust)
+    computed = time.perf_counter()
+
+    if args.csv:
+        write_csv(engine, args.csv, results, args.threshold, args.floor)
+    if args.table:
+        write_table(engine, results, args.threshold, args.floor)
+    written = time.perf_counter()
+
+    with_average = int(np.count_nonzero(~np.isnan(results["weighted_average"])))
+    print(f"📊 {prices.size} linhas, {results['product_id'].size} produtos, {with_average} com média")
+    print(f"🔔 {int(results['would_alert'].sum())} alertariam (≥{args.threshold:g}% e ≥ R$ {args.floor:g})")
+    print(f"⏱️ leitura {loaded - started:.2f}s, cálculo {computed - loaded:.3f}s, gravação {written - computed:.2f}s")
+
+    if args.verify:
+        checked, mismatches = verify(results, args.verify)
+        if mismatches:
+            for product_id, expected, got in mismatches[:20]:
+                print(f"❌ Produto {product_id}: esperado {expected}, calculado {got}")
+        else:
+            print(f"✅ {checked} produtos conferem com calculate_weighted_average")
@@ -0,0 +1,115 @@
+"""Brazilian currency (BRL) price extraction shared by every site scraper.
+
+One precompiled pattern understands the formats the stores render
+("R$ 1.234,56", "R$1.234", "1234,5", "R$ 12,90 à vista", "1234.56") and
+returns ``None`` for text without a price, or with a malformed decimal part
+("R$ 1.234,567"), instead of raising, so callers never need exceptions for
+control flow.
+
+Benchmark over generated strings in every storefront format::
+
+    python price_parser.py --bench 50000
+"""
+import re
+
+# Thousands use "." and decimals use ","; a "." followed by one or two final
+# digits is still read as decimal point (Pichau sometimes renders "1234.56").
+_NUMBER = r"(?P<int>\d{1,3}(?:\.\d{3})+|\d+)(?:[,.](?P<dec>\d{1,2})(?!\d))?"
+
+CURRENCY_PATTERN = re.compile(r"R\$\s*" + _NUMBER)
+NUMBER_PATTERN = re.compile(_NUMBER)
+# Separador com mais dígitos logo após o número: decimal com 3+ casas
+_MALFORMED_TAIL = re.compile(r"[,.]\d")
+# "10x de " logo antes do R$: valor da parcela, não do produto
+_INSTALLMENT = re.compile(r"\d\s*x\s*(?:de\s*)?$", re.IGNORECASE)
+
+def _match_to_price(match):
+    if _MALFORMED_TAIL.match(match.string, match.end()):
+        return None
+    integer = match.group("int").replace(".", "")
+    decimals = match.group("dec")
+    if decimals:
+        return int(integer) + int(decimals.ljust(2, "0")) / 100
+    return float(integer)
+
+def _apply_cents_heuristic(price):
+    # Preço renderizado em centavos sem separador (ex: "123456" -> 1234.56)
+    if price > 10000:
+        corrected_price = price / 100
+        if 10 <= corrected_price <= 10000:
+            return corrected_price
+    return price
+
+def parse_price(price_text, cents_heuristic=False):
+    """Parse one BRL price string; returns a float or None when no price is found.
+
+    Text containing "R$" is parsed from its currency-prefixed numbers, so
+    installment texts like "10x de R$ 99,90" yield the price and not the count.
+    With several prices ("De R$ 1.999,90 Por R$ 1.499,90") the lowest one
+    that is not an installment value wins.
+    """
+    if not price_text:
+        return None
+
+    if price_text.count("R$") > 1:
+        matches = list(CURRENCY_PATTERN.finditer(price_text))
+        totals = [match for match in matches if not _INSTALLMENT.search(price_text, 0, match.start())]
+        prices = [price for price in map(_match_to_price, totals or matches[:1]) if price is not None]
+        price = min(prices, default=None)
+    else:
+        match = CURRENCY_PATTERN.search(price_text) or NUMBER_PATTERN.search(price_text)
+        if match is None:
+            return None
+        price = _match_to_price(match)
+
+    if price is not None and cents_heuristic:
+        price = _apply_cents_heuristic(price)
+    return price
+
+def parse_prices(price_texts, cents_heuristic=False):
+    """Parse a list of price strings, preserving order (None for failures)"""
+    return [parse_price(price_text, cents_heuristic) for price_text in price_texts]
+
+def _format_brl(cents, style):
+    """One price in each format the storefronts render"""
+    integer, decimals = divmod(cents, 100)
+    grouped = f"{integer:,}".replace(",", ".")
+    return [
+        f"R$ {grouped},{decimals:02d}",
+        f"R$\u00a0{grouped},{decimals:02d}",
+        f"R${grouped},{decimals:02d} à vista",
+        f"{integer},{decimals:02d}",
+        f"10x de R$ {grouped},{decimals:02d} sem juros",
+        f"{integer}.{decimals:02d}",
+    ][style]
+
+def _benchmark(count):
+    import random
+    import time
+
+    rng = random.Random(42)
+    samples = [rng.randint(1000, 5_000_000) for _ in range(count)]
+    texts = [_format_brl(cents, rng.randrange(6)) for cents in samples]
+
+    start = time.perf_counter()
+    parsed = parse_prices(texts)
+    elapsed = time.perf_counter() - start
+
+    failures = [
+        (text, cents / 100, got)
+        for text, cents, got in zip(texts, samples, parsed)
+        if got is None or abs(got - cents / 100) > 0.001
+    ]
+    print(f"📊 {count} preços em {elapsed * 1000:.1f} ms ({count / elapsed:,.0f} preços/s)")
+    for text, expected, got in failures[:10]:
+        print(f"❌ '{text}': esperado {expected}, obtido {got}")
+    return not failures
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark do parser de preços")
+    parser.add_argument("--bench", type=int, default=50000, metavar="N", help="quantidade de preços gerados")
+    args = parser.parse_args()
+    sys.exit(0 if _benchmark(args.bench) else 1)
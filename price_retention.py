@@ -0,0 +1,168 @@
+"""Retention / downsampling for the ``prices`` table.
+
+Rows newer than ``--keep-days`` are kept as they are. Older rows of a
+product are merged per bucket: per day up to ``--daily-days``, per ISO week
+beyond that. A merged row keeps the earliest ``collected_at`` and
+``price_changed_at``, the latest ``last_checked_at``, ``check_count`` = Σ
+checks and price = Σ(price × checks) / Σ checks. This is exactly what
+``calculate_weighted_average`` sums over the non-current rows, so its result
+does not change. A product's current row, its most recent by
+``price_changed_at`` and by ``last_checked_at``, is never touched, because
+``save_product`` keeps updating it.
+
+Work goes in batches of ``--batch-products`` products, one short transaction
+each, with a pause in between, so it can run while the scrapers write::
+
+    python price_retention.py --keep-days 30 --daily-days 180 --dry-run
+    python price_retention.py --keep-days 30 --daily-days 180 --batch-products 200 --pause 0.5
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Table, Column, Integer, Numeric, DateTime, MetaData, select
+
+brasilia = ZoneInfo("America/Sao_Paulo")
+
+# Casas decimais do preço médio de um bucket (o erro na média ponderada fica abaixo disso)
+PRICE_QUANTUM = Decimal("0.0000000001")
+
+metadata = MetaData()
+
+prices = Table("prices", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("product_id", Integer, nullable=False),
+    Column("price", Numeric, nullable=False),
+    Column("collected_at", DateTime),
+    Column("last_checked_at", DateTime),
+    Column("price_changed_at", DateTime),
+    Column("check_count", Integer),
+)
+
+def _local(moment):
+    if moment is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(brasilia).replace(tzinfo=None)
+    return moment
+
+def bucket_key(moment, daily_cutoff):
+    """Day bucket for rows newer than daily_cutoff, ISO week bucket for older ones"""
+    moment = _local(moment)
+    if moment >= daily_cutoff:
+        return ("day", moment.date())
+    year, week, _ = moment.isocalendar()
+    return ("week", year, week)
+
+def _changed_at(row):
+    return row.price_changed_at or row.collected_at
+
+def merge_rows(rows):
+    """Values of the single row that replaces a bucket of rows (check_count-weighted)"""
+    checks = [max(1, row.check_count or 1) for row in rows]
+    total_checks = sum(checks)
+    weighted_sum = sum(Decimal(str(row.price)) * count for row, count in zip(rows, checks))
+    return {
+        "price": (weighted_sum / total_checks).quantize(PRICE_QUANTUM),
+        "check_count": total_checks,
+        "collected_at": min(row.collected_at or _changed_at(row) for row in rows),
+        "price_changed_at": min(_changed_at(row) for row in rows),
+        "last_checked_at": max(row.last_checked_at or _changed_at(row) for row in rows),
+    }
+
+def plan_product(rows, cutoff, daily_cutoff):
+    """Buckets to merge for one product's rows (ordered oldest first); returns [(keep, drop, values)]"""
+    if len(rows) < 3:
+        return []
+
+    # Linha atual: nunca entra em merge (save_product ainda atualiza o check_count dela)
+    current_ids = {
+        max(rows, key=lambda row: (_changed_at(row), row.id)).id,
+        max(rows, key=lambda row: (row.last_checked_at or _changed_at(row), row.id)).id,
+    }
+
+    buckets = {}
+    for row in rows:
+        if row.id in current_ids or _local(_changed_at(row)) >= cutoff:
+            continue
+        buckets.setdefault(bucket_key(_changed_at(row), daily_cutoff), []).append(row)
+
+    plan = []
+    for bucket_rows in buckets.values():
+        if len(bucket_rows) < 2:
+            continue
+        keep = bucket_rows[0]
+        plan.append((keep.id, [row.id for row in bucket_rows[1:]], merge_rows(bucket_rows)))
+    return plan
+
+def downsample(engine, keep_days=30, daily_days=180, batch_products=200, pause=0.5, dry_run=False):
+    """Merge old price rows batch by batch; returns (rows_before, rows_removed)"""
+    now = datetime.now(brasilia).replace(tzinfo=None)
+    cutoff = now - timedelta(days=keep_days)
+    daily_cutoff = now - timedelta(days=max(daily_days, keep_days))
+
+    last_product = 0
+    rows_seen = rows_removed = 0
+
+    while True:
+        with engine.begin() as conn:
+            product_ids = [row[0] for row in conn.execute(
+                select(prices.c.product_id)
+                .distinct()
+                .where(prices.c.product_id > last_product)
+                .order_by(prices.c.product_id)
+                .limit(batch_products)
+            )]
+            if not product_ids:
+                break
+
+            query = (
+                select(prices)
+                .where(prices.c.product_id.in_(product_ids))
+                .order_by(prices.c.product_id, prices.c.price_changed_at, prices.c.id)
+            )
+            if conn.dialect.name == "postgresql" and not dry_run:
+                query = query.with_for_update()
+            rows = conn.execute(query).fetchall()
+
+            by_product = {}
+            for row in rows:
+                by_product.setdefault(row.product_id, []).append(row)
+
+            batch_removed = 0
+            for product_rows in by_product.values():
+                for keep_id, drop_ids, values in plan_product(product_rows, cutoff, daily_cutoff):
+                    batch_removed += len(drop_ids)
+                    if dry_run:
+                        continue
+                    conn.execute(prices.update().where(prices.c.id == keep_id).values(**values))
+                    conn.execute(prices.delete().where(prices.c.id.in_(drop_ids)))
+
+        rows_seen += len(rows)
+        rows_removed += batch_removed
+        last_product = product_ids[-1]
+        action = "seriam removidas" if dry_run else "removidas"
+        print(f"🗜️ Produtos até {last_product}: {rows_removed}/{rows_seen} linhas {action}")
+
+        if pause:
+            time.sleep(pause)
+
+    return rows_seen, rows_removed
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Retenção e downsampling da tabela prices")
+    parser.add_argument("--keep-days", type=int, default=30, help="dias mantidos em resolução total")
+    parser.add_argument("--daily-days", type=int, default=180, help="até quantos dias os buckets são diários (depois, semanais)")
+    parser.add_argument("--batch-products", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.5, help="segundos entre lotes")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.getenv('DATABASE_URL'), echo=False)
+    seen, removed = downsample(engine, args.keep_days, args.daily_days, args.batch_products, args.pause, args.dry_run)
+    print(f"✅ {removed} de {seen} linhas {'seriam removidas' if args.dry_run else 'removidas'}")
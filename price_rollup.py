@@ -0,0 +1,249 @@
+"""Daily price rollup (``price_daily``) so charts read one row per product per day.
+
+``record`` is called by ``store_observation`` in the same transaction as
+the raw price write. It folds the check into the row of its day (Brasília
+time): running min/max, the closing price (the latest observation of the
+day), and ``weighted_sum``/``check_count``, whose ratio is ``avg_price``. On
+PostgreSQL and SQLite this is a single ``INSERT ... ON CONFLICT DO UPDATE``.
+
+History that predates the rollup is rebuilt from ``prices``. A ``prices``
+row stands for ``check_count`` checks at one price, from ``collected_at``
+to ``last_checked_at``, so its checks are spread over the days it spans::
+
+    python price_rollup.py backfill
+    python price_rollup.py backfill --product-id 1234
+"""
+import argparse
+import os
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (Table, Column, Integer, Numeric, Date, DateTime, MetaData, select,
+                        case, func)
+
+brasilia = ZoneInfo("America/Sao_Paulo")
+
+metadata = MetaData()
+
+price_daily = Table("price_daily", metadata,
+    Column("product_id", Integer, primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("min_price", Numeric, nullable=False),
+    Column("max_price", Numeric, nullable=False),
+    Column("close_price", Numeric, nullable=False),
+    Column("close_at", DateTime, nullable=False),
+    Column("avg_price", Numeric, nullable=False),
+    Column("weighted_sum", Numeric, nullable=False),
+    Column("check_count", Integer, nullable=False),
+)
+
+# Somente leitura, para o backfill
+_prices = Table("prices", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("product_id", Integer),
+    Column("price", Numeric),
+    Column("collected_at", DateTime),
+    Column("last_checked_at", DateTime),
+    Column("check_count", Integer),
+)
+
+def _local(moment):
+    """Naive Brasília wall time (aware datetimes are converted, naive ones kept)"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(brasilia).replace(tzinfo=None)
+    return moment
+
+_ready_engines = set()
+
+def ensure_schema(engine):
+    """Create price_daily once per engine"""
+    if id(engine) not in _ready_engines:
+        metadata.create_all(engine, tables=[price_daily], checkfirst=True)
+        _ready_engines.add(id(engine))
+
+def _insert_for(dialect_name):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert, func.least, func.greatest
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        # min()/max() com dois argumentos são escalares no SQLite
+        return insert, func.min, func.max
+    return None, None, None
+
+def record(conn, product_id, price, observed_at):
+    """Fold one check into its day's rollup row, inside the caller's transaction"""
+    observed_at = _local(observed_at)
+    day = observed_at.date()
+    price = float(price)
+
+    insert, least, greatest = _insert_for(conn.dialect.name)
+    if insert is None:
+        _record_generic(conn, product_id, price, observed_at, day)
+        return
+
+    statement = insert(price_daily).values(
+        product_id=product_id,
+        day=day,
+        min_price=price,
+        max_price=price,
+        close_price=price,
+        close_at=observed_at,
+        avg_price=price,
+        weighted_sum=price,
+        check_count=1,
+    )
+    excluded = statement.excluded
+    row = price_daily.c
+    later = excluded.close_at >= row.close_at
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=[row.product_id, row.day],
+        set_={
+            "min_price": least(row.min_price, excluded.min_price),
+            "max_price": greatest(row.max_price, excluded.max_price),
+            "close_price": case((later, excluded.close_price), else_=row.close_price),
+            "close_at": case((later, excluded.close_at), else_=row.close_at),
+            "weighted_sum": row.weighted_sum + excluded.weighted_sum,
+            "check_count": row.check_count + 1,
+            "avg_price": (row.weighted_sum + excluded.weighted_sum) / (row.check_count + 1),
+        },
+    ))
+
+def _record_generic(conn, product_id, price, observed_at, day):
+    current = conn.execute(
+        select(price_daily).where(price_daily.c.product_id == product_id, price_daily.c.day == day)
+    ).first()
+    if current is None:
+        conn.execute(price_daily.insert().values(
+            product_id=product_id, day=day, min_price=price, max_price=price, close_price=price,
+            close_at=observed_at, avg_price=price, weighted_sum=price, check_count=1,
+        ))
+        return
+
+    later = observed_at >= current.close_at
+    weighted_sum = float(current.weighted_sum) + price
+    check_count = current.check_count + 1
+    conn.execute(
+        price_daily.update()
+        .where(price_daily.c.product_id == product_id, price_daily.c.day == day)
+        .values(
+            min_price=min(float(current.min_price), price),
+            max_price=max(float(current.max_price), price),
+            close_price=price if later else current.close_price,
+            close_at=observed_at if later else current.close_at,
+            weighted_sum=weighted_sum,
+            check_count=check_count,
+            avg_price=weighted_sum / check_count,
+        )
+    )
+
+def checks_around(conn, product_id, start, moment):
+    """Daily checks of a product from start up to moment, to cut a ``prices`` row at moment.
+
+    Returns (checks_before, last_close_before, first_close_after). Day rows
+    only keep each day's last check, so the bounds are approximate to the day.
+    """
+    start, moment = _local(start), _local(moment)
+    row = price_daily.c
+    checks_before, last_before = conn.execute(
+        select(func.sum(row.check_count), func.max(row.close_at))
+        .where(row.product_id == product_id, row.close_at >= start, row.close_at < moment)
+    ).one()
+    first_after = conn.execute(
+        select(func.min(row.close_at)).where(row.product_id == product_id, row.close_at > moment)
+    ).scalar()
+    return int(checks_before or 0), last_before, first_after
+
+def rollup_rows(price_rows):
+    """Daily aggregates of one product's prices rows; returns {day: aggregate}"""
+    days = {}
+    for row in price_rows:
+        price = float(row.price)
+        start = _local(row.collected_at)
+        end = max(_local(row.last_checked_at or row.collected_at), start)
+        span = [start.date() + timedelta(days=offset) for offset in range((end.date() - start.date()).days + 1)]
+
+        # Checagens espalhadas pelos dias cobertos; o resto vai para os últimos dias
+        checks = max(1, row.check_count or 1)
+        base, extra = divmod(checks, len(span))
+
+        for index, day in enumerate(span):
+            day_checks = base + (1 if index >= len(span) - extra else 0)
+            close_at = end if day == end.date() else datetime.combine(day, dt_time.max)
+            aggregate = days.get(day)
+            if aggregate is None:
+                aggregate = days[day] = {
+                    "min_price": price, "max_price": price, "close_price": price,
+                    "close_at": close_at, "weighted_sum": 0.0, "check_count": 0,
+                }
+            aggregate["min_price"] = min(aggregate["min_price"], price)
+            aggregate["max_price"] = max(aggregate["max_price"], price)
+            if close_at >= aggregate["close_at"]:
+                aggregate["close_price"], aggregate["close_at"] = price, close_at
+            aggregate["weighted_sum"] += price * day_checks
+            aggregate["check_count"] += day_checks
+
+    for aggregate in days.values():
+        # Dias cobertos só pelo intervalo de uma linha, sem checagem própria
+        count = aggregate["check_count"]
+        aggregate["avg_price"] = aggregate["weighted_sum"] / count if count else aggregate["close_price"]
+    return days
+
+def backfill(engine, product_id=None, batch_size=500):
+    """Rebuild price_daily from prices, one transaction per batch of products; returns rows written"""
+    ensure_schema(engine)
+    last_id = 0
+    written = 0
+
+    while True:
+        with engine.begin() as conn:
+            id_query = select(_prices.c.product_id).distinct().where(_prices.c.product_id > last_id)
+            if product_id is not None:
+                id_query = id_query.where(_prices.c.product_id == product_id)
+            product_ids = [row[0] for row in conn.execute(
+                id_query.order_by(_prices.c.product_id).limit(batch_size)
+            )]
+            if not product_ids:
+                break
+
+            rows = conn.execute(
+                select(_prices.c.product_id, _prices.c.price, _prices.c.collected_at,
+                       _prices.c.last_checked_at, _prices.c.check_count)
+                .where(_prices.c.product_id.in_(product_ids))
+                .order_by(_prices.c.product_id, _prices.c.collected_at)
+            ).fetchall()
+
+            by_product = {}
+            for row in rows:
+                by_product.setdefault(row.product_id, []).append(row)
+
+            conn.execute(price_daily.delete().where(price_daily.c.product_id.in_(product_ids)))
+            values = [
+                {"product_id": pid, "day": day, **aggregate}
+                for pid, product_rows in by_product.items()
+                for day, aggregate in rollup_rows(product_rows).items()
+            ]
+            if values:
+                conn.execute(price_daily.insert(), values)
+
+        written += len(values)
+        last_id = product_ids[-1]
+        print(f"📅 {last_id}: {written} linhas diárias gravadas")
+
+    return written
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Rollup diário de preços (price_daily)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = subparsers.add_parser("backfill")
+    backfill_parser.add_argument("--product-id", type=int)
+    backfill_parser.add_argument("--batch-size", type=int, default=500)
+
+    args = parser.parse_args()
+    load_dotenv()
+    engine = create_engine(os.getenv('DATABASE_URL'), echo=False)
+    print(f"✅ Backfill concluído: {backfill(engine, args.product_id, args.batch_size)} linhas")
@@ -0,0 +1,267 @@
+"""Cross-site product identity index (MinHash + LSH over normalised name tokens).
+
+Products are keyed by (name, website), so the same card at Kabum, Terabyte
+and Pichau is three unrelated rows. Each product name is reduced to a set of
+normalised tokens and token bigrams, summarised as a ``NUM_PERM``-value
+MinHash signature, and split into ``BANDS`` LSH bands whose hashes are
+stored in ``product_lsh_buckets``. Two listings with Jaccard similarity
+``s`` share at least one bucket with probability ``1 - (1 - s**ROWS)**BANDS``,
+so "find equivalents" only compares the handful of listings that collide
+instead of scanning the whole catalogue.
+
+``save_product`` indexes new products in the same transaction that creates
+them; existing data is indexed with::
+
+    python product_identity.py rebuild
+    python product_identity.py find "RTX 4060 Ti 8GB Gigabyte"
+    python product_identity.py find --id 1234
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import struct
+import threading
+import unicodedata
+from datetime import datetime, timezone
+
+from sqlalchemy import (Table, Column, Integer, SmallInteger, BigInteger, String, LargeBinary,
+                        DateTime, MetaData, Index, select, and_, or_)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Similaridade estimada mínima para considerar dois anúncios o mesmo produto
+DEFAULT_THRESHOLD = float(os.getenv('PRODUCT_IDENTITY_THRESHOLD', '0.5'))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Semente fixa: assinaturas precisam ser iguais entre processos (mudar exige rebuild)
+_rng = random.Random(0x5CA9E)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+STOPWORDS = {
+    "a", "o", "e", "de", "da", "do", "das", "dos", "com", "para", "por", "em", "sem",
+    "the", "and", "with", "for", "new", "novo", "nova",
+}
+
+_UNIT_PATTERN = re.compile(r"(\d+(?:[.,]\d+)?)\s+(gb|tb|mb|mhz|ghz|hz|w|mm|pol)\b")
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)?")
+_SKU_SUFFIX_PATTERN = re.compile(r"\s*#\d+$")
+
+metadata = MetaData()
+
+product_signatures = Table("product_signatures", metadata,
+    Column("product_id", Integer, primary_key=True),
+    Column("website", String, nullable=False),
+    Column("signature", LargeBinary, nullable=False),
+    Column("indexed_at", DateTime, nullable=False),
+)
+
+product_lsh_buckets = Table("product_lsh_buckets", metadata,
+    Column("band", SmallInteger, primary_key=True),
+    Column("bucket", BigInteger, primary_key=True),
+    Column("product_id", Integer, primary_key=True),
+    Index("product_lsh_buckets_product_id", "product_id"),
+)
+
+# Somente leitura: a tabela é criada pelos scrapers
+_products = Table("products", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("website", String),
+)
+
+def normalize_tokens(name):
+    """Lowercase, accent-free tokens of a product name with units glued to numbers"""
+    name = _SKU_SUFFIX_PATTERN.sub("", name or "")
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch)).lower()
+    name = _UNIT_PATTERN.sub(r"\1\2", name)
+    return [token for token in _TOKEN_PATTERN.findall(name) if token not in STOPWORDS]
+
+def shingles(name):
+    """Token set plus adjacent token pairs (keeps some word order)"""
+    tokens = normalize_tokens(name)
+    result = set(tokens)
+    result.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return result
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+def minhash(name):
+    """MinHash signature (NUM_PERM ints) of a product name, or None when it has no tokens"""
+    hashes = [_hash64(shingle) for shingle in shingles(name)]
+    if not hashes:
+        return None
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+def band_buckets(signature):
+    """(band, bucket) pairs of a signature; buckets are signed 64-bit for BIGINT"""
+    buckets = []
+    for band in range(BANDS):
+        chunk = struct.pack(f"<{ROWS}Q", *signature[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERM
+
+def _pack(signature):
+    return struct.pack(f"<{NUM_PERM}Q", *signature)
+
+def _unpack(blob):
+    return list(struct.unpack(f"<{NUM_PERM}Q", blob))
+
+_ready_engines = set()
+_ready_lock = threading.Lock()
+
+def ensure_schema(engine):
+    """Create the identity tables once per engine"""
+    with _ready_lock:
+        if id(engine) in _ready_engines:
+            return
+        metadata.create_all(engine, tables=[product_signatures, product_lsh_buckets], checkfirst=True)
+        _ready_engines.add(id(engine))
+
+def index_product(conn, product_id, name, website):
+    """(Re)index one product inside the caller's transaction"""
+    signature = minhash(name)
+
+    conn.execute(product_lsh_buckets.delete().where(product_lsh_buckets.c.product_id == product_id))
+    conn.execute(product_signatures.delete().where(product_signatures.c.product_id == product_id))
+    if signature is None:
+        return
+
+    conn.execute(product_signatures.insert().values(
+        product_id=product_id,
+        website=website,
+        signature=_pack(signature),
+        indexed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    ))
+    conn.execute(product_lsh_buckets.insert(), [
+        {"band": band, "bucket": bucket, "product_id": product_id}
+        for band, bucket in band_buckets(signature)
+    ])
+
+def find_equivalents(engine, product_id=None, name=None, threshold=DEFAULT_THRESHOLD,
+                     other_sites_only=True, limit=20):
+    """Listings that look like the same product, best match first.
+
+    Pass either an indexed ``product_id`` or a free-text ``name``. Only
+    listings sharing an LSH bucket are compared, so the cost depends on the
+    number of near matches rather than on the catalogue size.
+    """
+    website = None
+    with engine.begin() as conn:
+        if product_id is not None:
+            row = conn.execute(
+                select(product_signatures.c.signature, product_signatures.c.website)
+                .where(product_signatures.c.product_id == product_id)
+            ).first()
+            if row is None:
+                return []
+            signature, website = _unpack(row.signature), row.website
+        else:
+            signature = minhash(name)
+            if signature is None:
+                return []
+
+        bucket_filter = or_(*(
+            and_(product_lsh_buckets.c.band == band, product_lsh_buckets.c.bucket == bucket)
+            for band, bucket in band_buckets(signature)
+        ))
+        candidates = conn.execute(
+            select(
+                product_signatures.c.product_id,
+                product_signatures.c.signature,
+                _products.c.name,
+                _products.c.website,
+            )
+            .select_from(product_signatures.join(_products, _products.c.id == product_signatures.c.product_id))
+            .where(product_signatures.c.product_id.in_(
+                select(product_lsh_buckets.c.product_id).where(bucket_filter).distinct()
+            ))
+        ).fetchall()
+
+    matches = []
+    for candidate in candidates:
+        if candidate.product_id == product_id:
+            continue
+        if other_sites_only and website and candidate.website == website:
+            continue
+        score = similarity(signature, _unpack(candidate.signature))
+        if score >= threshold:
+            matches.append({
+                "product_id": candidate.product_id,
+                "name": candidate.name,
+                "website": candidate.website,
+                "similarity": score,
+            })
+
+    matches.sort(key=lambda match: match["similarity"], reverse=True)
+    return matches[:limit]
+
+def rebuild(engine, batch_size=1000):
+    """Index every product, in batches of one transaction each; returns the count"""
+    ensure_schema(engine)
+    last_id = 0
+    total = 0
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(_products.c.id, _products.c.name, _products.c.website)
+                .where(_products.c.id > last_id)
+                .order_by(_products.c.id)
+                .limit(batch_size)
+            ).fetchall()
+            for row in rows:
+                index_product(conn, row.id, row.name, row.website)
+
+        if not rows:
+            break
+        last_id = rows[-1].id
+        total += len(rows)
+        print(f"🔎 {total} produtos indexados")
+
+    return total
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Índice de identidade de produtos entre lojas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild")
+    rebuild_parser.add_argument("--batch-size", type=int, default=1000)
+
+    find_parser = subparsers.add_parser("find")
+    find_parser.add_argument("name", nargs="?")
+    find_parser.add_argument("--id", type=int)
+    find_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    find_parser.add_argument("--same-site", action="store_true", help="inclui anúncios da mesma loja")
+
+    args = parser.parse_args()
+    load_dotenv()
+    engine = create_engine(os.getenv('DATABASE_URL'), echo=False)
+
+    if args.command == "rebuild":
+        print(f"✅ Índice reconstruído: {rebuild(engine, args.batch_size)} produtos")
+    else:
+        if args.id is None and not args.name:
+            parser.error("informe um nome ou --id")
+        ensure_schema(engine)
+        for match in find_equivalents(engine, args.id, args.name, args.threshold, not args.same_site):
+            print(f"{match['similarity']:.2f}  [{match['website']}] #{match['product_id']} {match['name']}")
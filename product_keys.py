@@ -0,0 +1,227 @@
+"""Site-native product keys (``products.site_sku``) and the upsert that uses them.
+
+Products used to be identified by their full title, so a retitled listing
+became a new product. ``site_sku`` holds the store's own identifier, taken
+from the product link:
+
+- Kabum: the numeric id in ``/produto/<id>/...``
+- Terabyte: the numeric id in ``/produto/<id>/...``, else the last path segment
+- Pichau: the URL slug
+
+``ensure_schema`` adds the column, backfills it from ``product_link`` and
+creates a unique index on ``(website, site_sku)``. On PostgreSQL,
+``upsert_product`` is a single ``INSERT ... ON CONFLICT DO UPDATE ...
+RETURNING``. Other databases fall back to select-then-insert. Run the
+migration by hand with::
+
+    python product_keys.py migrate
+"""
+import argparse
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from sqlalchemy import inspect, literal_column, select, text
+from sqlalchemy.exc import OperationalError
+
+_PRODUCT_ID_PATTERN = re.compile(r"/produto/(\d+)")
+
+INDEX_NAME = "products_website_site_sku"
+
+def extract_site_sku(website, link):
+    """Store-native identifier of a product from its link, or None"""
+    if not link:
+        return None
+
+    path = urlsplit(link).path.rstrip("/")
+    if website in ("kabum", "terabyteshop"):
+        match = _PRODUCT_ID_PATTERN.search(path)
+        if match:
+            return match.group(1)
+        if website == "kabum":
+            return None
+
+    slug = path.rsplit("/", 1)[-1]
+    return slug.lower() or None
+
+_ready_engines = set()
+_ready_lock = threading.Lock()
+
+def backfill(engine, batch_size=1000):
+    """Fill site_sku for legacy rows.
+
+    Retitled duplicates share one key; it goes to the row with the most
+    recent price check (the newest row on a tie), which is the one the
+    scrapers kept writing to, so the current price history stays keyed.
+    """
+    with engine.begin() as conn:
+        taken = {
+            (row.website, row.site_sku)
+            for row in conn.execute(text(
+                "SELECT website, site_sku FROM products WHERE site_sku IS NOT NULL"
+            ))
+        }
+        rows = conn.execute(text(
+            "SELECT id, website, product_link, "
+            "(SELECT MAX(last_checked_at) FROM prices WHERE prices.product_id = products.id) AS last_checked_at "
+            "FROM products WHERE site_sku IS NULL"
+        )).fetchall()
+
+    # Mais recente primeiro: quem fica com a chave é a linha ainda em uso
+    rows.sort(key=lambda row: (row.last_checked_at is not None, row.last_checked_at or "", row.id), reverse=True)
+
+    updates = []
+    for row in rows:
+        sku = extract_site_sku(row.website, row.product_link)
+        if sku and (row.website, sku) not in taken:
+            taken.add((row.website, sku))
+            updates.append({"product_id": row.id, "site_sku": sku})
+
+    for start in range(0, len(updates), batch_size):
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE products SET site_sku = :site_sku WHERE id = :product_id"),
+                updates[start:start + batch_size],
+            )
+    return len(updates)
+
+def ensure_schema(engine):
+    """Add products.site_sku, backfill it and create the unique index (once per engine)"""
+    with _ready_lock:
+        if id(engine) in _ready_engines:
+            return
+
+        columns = {column["name"] for column in inspect(engine).get_columns("products")}
+        if "site_sku" not in columns:
+            # Os dois scrapers podem migrar ao mesmo tempo
+            if engine.dialect.name == "postgresql":
+                with engine.begin() as conn:
+                    conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS site_sku VARCHAR"))
+            else:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("ALTER TABLE products ADD COLUMN site_sku VARCHAR"))
+                except OperationalError:
+                    if "site_sku" not in {column["name"] for column in inspect(engine).get_columns("products")}:
+                        raise
+
+        indexes = {index["name"] for index in inspect(engine).get_indexes("products")}
+        if INDEX_NAME not in indexes:
+            filled = backfill(engine)
+            print(f"🔑 site_sku preenchido em {filled} produtos")
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON products (website, site_sku)"
+                ))
+
+        _ready_engines.add(id(engine))
+
+def upsert_product(conn, products, name, website, category, product_link):
+    """Find or create a product by its site SKU; returns ``(product_id, created, renamed)``.
+
+    Title and link are refreshed on every hit, so a retitled listing keeps
+    its price history; ``renamed`` tells the caller the stored title changed.
+    Products whose link yields no SKU are matched by name.
+    """
+    site_sku = extract_site_sku(website, product_link)
+    values = {
+        "name": name,
+        "website": website,
+        "category": category,
+        "product_link": product_link,
+        "site_sku": site_sku,
+    }
+
+    if site_sku is None:
+        product_id = conn.execute(
+            select(products.c.id).where(products.c.name == name, products.c.website == website)
+        ).scalar()
+        if product_id is not None:
+            return product_id, False, False
+        return conn.execute(products.insert().values(**values)).inserted_primary_key[0], True, False
+
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        # Subconsulta do RETURNING lê o snapshot anterior ao comando: é o título antigo
+        previous = products.alias("previous")
+        previous_name = (
+            select(previous.c.name)
+            .where(previous.c.website == website, previous.c.site_sku == site_sku)
+            .scalar_subquery()
+        )
+        statement = insert(products).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[products.c.website, products.c.site_sku],
+            set_={"name": statement.excluded.name, "product_link": statement.excluded.product_link},
+        ).returning(
+            products.c.id,
+            literal_column("(xmax = 0)").label("created"),
+            previous_name.label("previous_name"),
+        )
+        row = conn.execute(statement).first()
+        created = bool(row.created)
+        return row.id, created, not created and row.previous_name != name
+
+    row = conn.execute(
+        select(products.c.id, products.c.name, products.c.product_link)
+        .where(products.c.website == website, products.c.site_sku == site_sku)
+    ).first()
+    if row is None:
+        return conn.execute(products.insert().values(**values)).inserted_primary_key[0], True, False
+    if row.name != name or row.product_link != product_link:
+        conn.execute(
+            products.update().where(products.c.id == row.id).values(name=name, product_link=product_link)
+        )
+    return row.id, False, row.name != name
+
+def find_or_create_product(conn, products, name, website, category, product_link):
+    """Like upsert_product, but an existing product is left untouched; returns ``(product_id, created)``.
+
+    For backfills of old observations, whose title and link must not
+    overwrite the current ones.
+    """
+    site_sku = extract_site_sku(website, product_link)
+    if site_sku is None:
+        match = (products.c.name == name, products.c.website == website)
+    else:
+        match = (products.c.website == website, products.c.site_sku == site_sku)
+
+    product_id = conn.execute(select(products.c.id).where(*match)).scalar()
+    if product_id is not None:
+        return product_id, False
+
+    values = {
+        "name": name,
+        "website": website,
+        "category": category,
+        "product_link": product_link,
+        "site_sku": site_sku,
+    }
+    if site_sku is not None and conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        # Criado por um scraper entre o select e o insert: usa o dele
+        row = conn.execute(
+            insert(products).values(**values)
+            .on_conflict_do_nothing(index_elements=[products.c.website, products.c.site_sku])
+            .returning(products.c.id)
+        ).first()
+        if row is None:
+            return conn.execute(select(products.c.id).where(*match)).scalar(), False
+        return row.id, True
+    return conn.execute(products.insert().values(**values)).inserted_primary_key[0], True
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Chaves nativas (site_sku) dos produtos")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate")
+
+    args = parser.parse_args()
+    load_dotenv()
+    ensure_schema(create_engine(os.getenv('DATABASE_URL'), echo=False))
+    print("✅ Migração de site_sku concluída")
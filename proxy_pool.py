@@ -0,0 +1,255 @@
+"""Outbound proxy pool with per-site health and latency scores.
+
+``SCRAPER_PROXIES`` lists the egress routes, separated by commas or spaces,
+e.g. ``"direct,http://10.0.0.2:3128,http://10.0.0.3:3128"``. ``direct``
+stands for this machine's own IP. With the variable empty, the pool is
+disabled and every request leaves directly, as before.
+
+Every search leases a proxy for its site. ``create_driver`` passes it to
+Chrome as ``--proxy-server``, and the HTTP mode sends through a
+``ProxyManager`` for it. The search then reports an outcome:
+
+- ``ok``, with the page latency
+- ``blocked``: 403/429, a captcha or challenge page, or a page too small to be a listing
+- ``timeout``: an HTTP timeout, or the driver was killed by the watchdog
+- ``error``
+
+Scores are kept per (proxy, site), because a store that blocks an IP does
+not mean the others do. Health is an EWMA of successes. Latency is an EWMA
+of the seconds per page. A block also puts the proxy in cooldown for that
+site, with the cooldown doubling on each consecutive block. Leases are drawn
+at random, weighted by health² / latency and divided by the proxy's leases
+in flight, so the best routes take most of the traffic while the others are
+still probed.
+
+Chrome ignores credentials in ``--proxy-server``. Proxies used by the
+browser path must therefore allow this host's IP, or be local forwarders.
+"""
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+DIRECT = "direct"
+
+HEALTH_ALPHA = float(os.getenv('PROXY_HEALTH_ALPHA', '0.3'))
+LATENCY_ALPHA = float(os.getenv('PROXY_LATENCY_ALPHA', '0.3'))
+BLOCK_COOLDOWN_SECONDS = float(os.getenv('PROXY_BLOCK_COOLDOWN_SECONDS', '120'))
+MAX_COOLDOWN_SECONDS = float(os.getenv('PROXY_MAX_COOLDOWN_SECONDS', '1800'))
+# Saúde mínima no sorteio, para que um proxy ruim ainda seja testado de vez em quando
+MIN_WEIGHT_HEALTH = 0.05
+
+# Páginas menores que isso são bloqueio/erro, não listagem (mesmo limite do modo HTTP)
+MIN_PAGE_SIZE = 10000
+
+BLOCK_STATUSES = (403, 407, 429)
+BLOCK_MARKERS = re.compile(
+    r"captcha|cf-chl|challenge-platform|attention required|access denied|"
+    r"request unsuccessful|px-captcha|acesso negado|too many requests",
+    re.IGNORECASE,
+)
+
+OUTCOMES = ("ok", "blocked", "timeout", "error")
+
+def parse_proxies(value):
+    """Proxy URLs (or "direct") from a comma/space separated list, deduplicated in order"""
+    proxies = []
+    for entry in re.split(r"[,\s]+", value or ""):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.lower() == DIRECT:
+            entry = DIRECT
+        elif "://" not in entry:
+            entry = f"http://{entry}"
+        if entry not in proxies:
+            proxies.append(entry)
+    return proxies
+
+def detect_block(page_source, status=None):
+    """Reason the response looks like a block page, or None when it looks like a listing"""
+    if status in BLOCK_STATUSES:
+        return f"HTTP {status}"
+    if page_source is None:
+        return None
+    # Marcadores só contam em páginas pequenas; listagens grandes citam "captcha" em scripts
+    if len(page_source) < MIN_PAGE_SIZE * 3:
+        match = BLOCK_MARKERS.search(page_source)
+        if match:
+            return match.group(0).lower()
+    if len(page_source) < MIN_PAGE_SIZE:
+        return "página pequena"
+    return None
+
+def display_name(proxy):
+    """Proxy URL without credentials, for logs"""
+    if proxy == DIRECT:
+        return proxy
+    parts = urlsplit(proxy)
+    return f"{parts.scheme}://{parts.hostname}:{parts.port}" if parts.port else f"{parts.scheme}://{parts.hostname}"
+
+def chrome_arguments(proxy):
+    """Chrome arguments routing through a proxy (credentials dropped); empty for direct"""
+    if proxy == DIRECT:
+        return []
+    # <-loopback>: o Chrome não passa localhost pelo proxy por padrão (stand-ins locais)
+    return [f"--proxy-server={display_name(proxy)}", "--proxy-bypass-list=<-loopback>"]
+
+class ProxyStats:
+    """Scores of one proxy for one site"""
+
+    def __init__(self):
+        self.health = 1.0
+        self.latency = None
+        self.in_flight = 0
+        self.consecutive_blocks = 0
+        self.cooldown_until = 0.0
+        self.outcomes = Counter()
+
+    def weight(self, now):
+        if self.cooldown_until > now:
+            return 0.0
+        health = max(self.health, MIN_WEIGHT_HEALTH)
+        latency = self.latency if self.latency is not None else 1.0
+        return health * health / (0.5 + latency) / (1 + self.in_flight)
+
+class ProxyLease:
+    """One proxy held for one site; report() outcomes, then release()"""
+
+    def __init__(self, pool, proxy, website):
+        self.pool = pool
+        self.proxy = proxy
+        self.website = website
+        self.started = time.monotonic()
+        self._released = False
+
+    @property
+    def direct(self):
+        return self.proxy == DIRECT
+
+    def chrome_arguments(self):
+        return chrome_arguments(self.proxy)
+
+    def report(self, outcome, latency=None):
+        self.pool.report(self.proxy, self.website, outcome, latency)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release(self.proxy, self.website)
+
+class ProxyPool:
+    """Per-site routing over the configured proxies; thread safe, one instance per process"""
+
+    def __init__(self, proxies):
+        self.proxies = list(proxies)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.proxies)
+
+    def _stats_for(self, proxy, website):
+        key = (proxy, website)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ProxyStats()
+        return stats
+
+    def acquire(self, website):
+        """Lease the proxy to use for the next page of a site, or None when the pool is disabled"""
+        if not self.proxies:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            candidates = [(proxy, self._stats_for(proxy, website)) for proxy in self.proxies]
+            weights = [stats.weight(now) for _, stats in candidates]
+            if any(weights):
+                proxy, stats = random.choices(candidates, weights=weights)[0]
+            else:
+                # Todos em cooldown: o que sai do cooldown primeiro
+                proxy, stats = min(candidates, key=lambda candidate: candidate[1].cooldown_until)
+            stats.in_flight += 1
+
+        return ProxyLease(self, proxy, website)
+
+    def release(self, proxy, website):
+        with self._lock:
+            stats = self._stats_for(proxy, website)
+            stats.in_flight = max(0, stats.in_flight - 1)
+
+    def report(self, proxy, website, outcome, latency=None):
+        """Fold one outcome into the (proxy, site) scores"""
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Unknown proxy outcome: {outcome}")
+
+        with self._lock:
+            stats = self._stats_for(proxy, website)
+            stats.outcomes[outcome] += 1
+            success = 1.0 if outcome == "ok" else 0.0
+            stats.health += HEALTH_ALPHA * (success - stats.health)
+
+            if outcome == "ok":
+                stats.consecutive_blocks = 0
+                if latency is not None:
+                    stats.latency = latency if stats.latency is None else stats.latency + LATENCY_ALPHA * (latency - stats.latency)
+                return
+
+            if outcome == "blocked":
+                stats.consecutive_blocks += 1
+                cooldown = min(BLOCK_COOLDOWN_SECONDS * 2 ** (stats.consecutive_blocks - 1), MAX_COOLDOWN_SECONDS)
+                stats.cooldown_until = time.monotonic() + cooldown
+
+        if outcome == "blocked":
+            print(f"🚫 {website.upper()}: bloqueio via {display_name(proxy)}, pausado por {cooldown:.0f}s")
+
+    def snapshot(self, website=None):
+        """[(proxy, site, health, latency, outcomes)] for the scan summary"""
+        with self._lock:
+            return [
+                (proxy, site, stats.health, stats.latency, dict(stats.outcomes))
+                for (proxy, site), stats in sorted(self._stats.items())
+                if website is None or site == website
+            ]
+
+    def summary_lines(self):
+        lines = []
+        for proxy, site, health, latency, outcomes in self.snapshot():
+            if not outcomes:
+                continue
+            latency_text = f"{latency:.2f}s" if latency is not None else "-"
+            counts = " ".join(f"{name}={outcomes[name]}" for name in OUTCOMES if outcomes.get(name))
+            lines.append(f"{site}@{display_name(proxy)}: saúde {health:.2f}, latência {latency_text} ({counts})")
+        return lines
+
+def release(driver):
+    """Release the proxy lease attached to a driver by create_driver, if any"""
+    lease = getattr(driver, "proxy_lease", None)
+    if lease is not None:
+        lease.release()
+        driver.proxy_lease = None
+
+def report_driver(driver, outcome, latency=None):
+    """Report an outcome for the proxy a driver is using (no-op without a lease)"""
+    lease = getattr(driver, "proxy_lease", None)
+    if lease is not None:
+        lease.report(outcome, latency)
+
+def report_search(driver, found, latency):
+    """Score the driver's proxy after a browser search; a page without cards may be a block page"""
+    if getattr(driver, "proxy_lease", None) is None:
+        return
+    blocked = None
+    if not found:
+        try:
+            blocked = detect_block(driver.page_source)
+        except Exception:
+            blocked = "sem página"
+    report_driver(driver, "blocked" if blocked else "ok", latency)
+
+pool = ProxyPool(parse_proxies(os.getenv('SCRAPER_PROXIES', '')))
@@ -0,0 +1,316 @@
+"""Priority queue of on-demand rescans, run ahead of the scheduled scan.
+
+Requests come from two places:
+
+- the ``scrape_requests`` table. The dashboard inserts a row when a search
+  config is created or edited, and anyone can insert one by hand. A poller
+  thread claims the pending rows of this process's sites every
+  ``RESCAN_POLL_SECONDS``.
+- a local control socket on ``RESCAN_CONTROL_PORT`` (127.0.0.1, disabled by
+  default; use a different port per scraper process). It reads lines of
+  ``<search_config_id> [priority]``.
+
+The scan loop drains the queue between searches, between sites and while it
+waits for the next scan, so an urgent config runs within seconds instead of
+waiting for the next fixed scan. Requests are deduplicated per search
+config. A repeated request only raises the priority of the queued one, and
+every row it came from is marked done after the single search. The poller
+renews the claim of rows still waiting in the queue, e.g. behind a site's
+multi-tab run, so only rows whose process died become claimable again after
+``RESCAN_CLAIM_SECONDS``::
+
+    python rescan_queue.py request 42 --priority 50
+    python rescan_queue.py request 42 --port 8792
+    python rescan_queue.py pending
+"""
+import argparse
+import heapq
+import itertools
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import (Table, Column, Integer, String, DateTime, MetaData, select, and_, or_,
+                        text)
+
+POLL_SECONDS = float(os.getenv('RESCAN_POLL_SECONDS', '5'))
+CLAIM_SECONDS = int(os.getenv('RESCAN_CLAIM_SECONDS', '600'))
+CONTROL_HOST = '127.0.0.1'
+CONTROL_PORT = os.getenv('RESCAN_CONTROL_PORT', '')
+DEFAULT_PRIORITY = 10
+
+metadata = MetaData()
+
+scrape_requests = Table("scrape_requests", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("search_config_id", Integer, nullable=False),
+    Column("priority", Integer, nullable=False, server_default=text(str(DEFAULT_PRIORITY))),
+    Column("status", String, nullable=False, server_default=text("'pending'")),
+    Column("requested_by", String),
+    Column("requested_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
+    Column("claimed_by", String),
+    Column("claimed_at", DateTime),
+    Column("completed_at", DateTime),
+)
+
+# Somente leitura, para filtrar os pedidos pelos sites deste processo
+_search_configs = Table("search_configs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("website", String),
+)
+
+def utcnow():
+    """Naive UTC timestamp, comparable on both Postgres and SQLite"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def ensure_schema(engine):
+    """Create the request table if it does not exist"""
+    metadata.create_all(engine, tables=[scrape_requests], checkfirst=True)
+
+class RescanRequest:
+    """One queued search config with every request row it stands for"""
+
+    def __init__(self, search_config_id, priority, request_ids=(), source="socket"):
+        self.search_config_id = search_config_id
+        self.priority = priority
+        self.request_ids = list(request_ids)
+        self.source = source
+
+class RescanQueue:
+    """Max-priority queue of search configs, one entry per config; thread safe"""
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def push(self, search_config_id, priority=DEFAULT_PRIORITY, request_ids=(), source="socket"):
+        """Queue a config; returns False when it was already queued (priority raised if higher)"""
+        with self._condition:
+            entry = self._entries.get(search_config_id)
+            if entry is not None:
+                entry.request_ids.extend(request_ids)
+                if priority <= entry.priority:
+                    return False
+                entry.priority = priority
+                # A entrada antiga no heap fica obsoleta e é pulada no pop()
+                heapq.heappush(self._heap, (-priority, next(self._counter), search_config_id))
+                return False
+
+            self._entries[search_config_id] = RescanRequest(search_config_id, priority, request_ids, source)
+            heapq.heappush(self._heap, (-priority, next(self._counter), search_config_id))
+            self._condition.notify_all()
+            return True
+
+    def pop(self):
+        """Highest-priority request, or None when the queue is empty"""
+        with self._condition:
+            while self._heap:
+                negative_priority, _, search_config_id = heapq.heappop(self._heap)
+                entry = self._entries.get(search_config_id)
+                if entry is None or entry.priority != -negative_priority:
+                    continue
+                del self._entries[search_config_id]
+                return entry
+            return None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._entries)
+
+    def request_ids(self):
+        """scrape_requests ids of every queued entry"""
+        with self._condition:
+            return [request_id for entry in self._entries.values() for request_id in entry.request_ids]
+
+    def wait(self, timeout, stop_event=None):
+        """Block up to timeout seconds for a request; True when one is queued"""
+        with self._condition:
+            if self._entries:
+                return True
+            # Fatias curtas para também acordar com o stop_event
+            deadline = threading.TIMEOUT_MAX if timeout is None else timeout
+            waited = 0.0
+            while not self._entries and waited < deadline:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                step = min(1.0, deadline - waited)
+                self._condition.wait(step)
+                waited += step
+            return bool(self._entries)
+
+queue = RescanQueue()
+
+def _claimable(now):
+    return or_(
+        scrape_requests.c.status == "pending",
+        and_(scrape_requests.c.status == "claimed",
+             scrape_requests.c.claimed_at < now - timedelta(seconds=CLAIM_SECONDS)),
+    )
+
+def claim_requests(engine, websites, worker_id, limit=50):
+    """Claim pending requests for configs of the given websites; returns [(config_id, priority, request_id)]"""
+    now = utcnow()
+    with engine.begin() as conn:
+        query = (
+            select(scrape_requests.c.id, scrape_requests.c.search_config_id, scrape_requests.c.priority)
+            .select_from(scrape_requests.join(
+                _search_configs, _search_configs.c.id == scrape_requests.c.search_config_id
+            ))
+            .where(_search_configs.c.website.in_(list(websites)), _claimable(now))
+            .order_by(scrape_requests.c.priority.desc(), scrape_requests.c.id.asc())
+            .limit(limit)
+        )
+        if conn.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True, of=scrape_requests)
+        rows = conn.execute(query).fetchall()
+
+        claimed = []
+        for row in rows:
+            # Update condicional: se outro processo pegou antes, nada muda
+            result = conn.execute(
+                scrape_requests.update()
+                .where(scrape_requests.c.id == row.id, _claimable(now))
+                .values(status="claimed", claimed_by=worker_id, claimed_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append((row.search_config_id, row.priority, row.id))
+        return claimed
+
+def renew_claims(engine, request_ids, worker_id):
+    """Refresh claimed_at of rows this worker still holds, so they never look abandoned"""
+    if not request_ids:
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            scrape_requests.update()
+            .where(
+                scrape_requests.c.id.in_(request_ids),
+                scrape_requests.c.status == "claimed",
+                scrape_requests.c.claimed_by == worker_id,
+            )
+            .values(claimed_at=utcnow())
+        )
+
+def complete(engine, request):
+    """Mark every request row behind a finished rescan as done"""
+    if not request.request_ids:
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            scrape_requests.update()
+            .where(scrape_requests.c.id.in_(request.request_ids))
+            .values(status="done", completed_at=utcnow())
+        )
+
+class RequestPoller(threading.Thread):
+    """Moves claimed scrape_requests rows into the in-process queue"""
+
+    def __init__(self, engine_factory, websites, worker_id, stop_event, interval=POLL_SECONDS):
+        super().__init__(name="rescan-poller", daemon=True)
+        self.engine_factory = engine_factory
+        self.websites = list(websites)
+        self.worker_id = worker_id
+        self.stop_event = stop_event
+        self.interval = interval
+
+    def run(self):
+        ready = False
+        while not self.stop_event.is_set():
+            try:
+                engine = self.engine_factory()
+                if not ready:
+                    ensure_schema(engine)
+                    ready = True
+                # Ainda na fila (ex.: atrás de uma rodada multi-aba): o claim não pode vencer
+                renew_claims(engine, queue.request_ids(), self.worker_id)
+                for search_config_id, priority, request_id in claim_requests(engine, self.websites, self.worker_id):
+                    queue.push(search_config_id, priority, [request_id], source="scrape_requests")
+            except Exception as e:
+                print(f"⚠️ Erro ao ler scrape_requests: {e}")
+
+            if self.stop_event.wait(self.interval):
+                break
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            parts = raw.decode("utf-8", errors="replace").split()
+            if not parts:
+                continue
+            try:
+                search_config_id = int(parts[0])
+                priority = int(parts[1]) if len(parts) > 1 else DEFAULT_PRIORITY
+            except ValueError:
+                self.wfile.write(b"error: expected <search_config_id> [priority]\n")
+                continue
+            added = queue.push(search_config_id, priority, source="socket")
+            self.wfile.write(b"queued\n" if added else b"duplicate\n")
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+_started = False
+
+def start(engine_factory, websites, worker_id, stop_event, control_port=None):
+    """Start the scrape_requests poller and, when a port is configured, the control socket"""
+    global _started
+    if _started:
+        return
+    _started = True
+
+    RequestPoller(engine_factory, websites, worker_id, stop_event).start()
+
+    port = control_port if control_port is not None else CONTROL_PORT
+    if port not in (None, ""):
+        server = ControlServer((CONTROL_HOST, int(port)), ControlHandler)
+        threading.Thread(target=server.serve_forever, name="rescan-control", daemon=True).start()
+        print(f"⚡ Fila de rescan em {CONTROL_HOST}:{server.server_address[1]}")
+
+def send(search_config_id, priority=DEFAULT_PRIORITY, port=CONTROL_PORT, host=CONTROL_HOST):
+    """Queue a rescan through a running scraper's control socket; returns its reply"""
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        sock.sendall(f"{search_config_id} {priority}\n".encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        return sock.makefile("r", encoding="utf-8").readline().strip()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Fila de rescans prioritários")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    request_parser = subparsers.add_parser("request")
+    request_parser.add_argument("search_config_id", type=int)
+    request_parser.add_argument("--priority", type=int, default=DEFAULT_PRIORITY)
+    request_parser.add_argument("--port", help="envia pelo socket de controle em vez da tabela")
+
+    subparsers.add_parser("pending")
+
+    args = parser.parse_args()
+
+    if args.command == "request" and args.port:
+        print(send(args.search_config_id, args.priority, args.port))
+    else:
+        load_dotenv()
+        engine = create_engine(os.getenv('DATABASE_URL'), echo=False)
+        ensure_schema(engine)
+        if args.command == "request":
+            with engine.begin() as conn:
+                conn.execute(scrape_requests.insert().values(
+                    search_config_id=args.search_config_id, priority=args.priority,
+                    status="pending", requested_by="cli", requested_at=utcnow(),
+                ))
+            print(f"✅ Rescan da config {args.search_config_id} pedido")
+        else:
+            with engine.begin() as conn:
+                for row in conn.execute(
+                    select(scrape_requests).where(scrape_requests.c.status != "done")
+                    .order_by(scrape_requests.c.priority.desc(), scrape_requests.c.id)
+                ):
+                    print(f"{row.id}: config {row.search_config_id} prioridade {row.priority} ({row.status})")
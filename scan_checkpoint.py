@@ -0,0 +1,101 @@
+"""Persisted scan progress so a restarted scraper resumes instead of starting over.
+
+The checkpoint is a small JSON file holding the current scan id, the search
+config ids already completed in it and the last run timestamp of every
+search. It is rewritten atomically after each search, so a SIGTERM, deploy
+or OOM-killed Chrome loses at most the search that was running.
+"""
+import json
+import os
+import time
+
+FRESHNESS_SECONDS = int(os.getenv('SCAN_FRESHNESS_SECONDS', '300'))
+
+class ScanCheckpoint:
+    """Scan id, completed searches and per-search last run times"""
+
+    def __init__(self, path, freshness=FRESHNESS_SECONDS):
+        self.path = path
+        self.freshness = freshness
+        self.scan_id = 0
+        self.finished = True
+        self.completed = set()
+        self.last_run = {}
+        self.resumed = False
+
+    @classmethod
+    def load(cls, path, freshness=FRESHNESS_SECONDS):
+        """Load the checkpoint from disk; a missing or corrupt file starts fresh"""
+        checkpoint = cls(path, freshness)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            checkpoint.scan_id = int(data.get("scan_id", 0))
+            checkpoint.finished = bool(data.get("finished", True))
+            checkpoint.completed = {int(i) for i in data.get("completed", [])}
+            checkpoint.last_run = {int(k): float(v) for k, v in data.get("last_run", {}).items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Checkpoint inválido em {path}, ignorando: {e}")
+        return checkpoint
+
+    def save(self):
+        """Write the checkpoint atomically (temp file + rename)"""
+        data = {
+            "scan_id": self.scan_id,
+            "finished": self.finished,
+            "completed": sorted(self.completed),
+            "last_run": {str(k): v for k, v in self.last_run.items()},
+        }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar checkpoint: {e}")
+
+    def start_scan(self):
+        """Begin the next scan, or resume the one interrupted by a restart.
+
+        Returns the scan id to report.
+        """
+        if not self.finished and self.scan_id:
+            self.resumed = True
+            print(f"♻️ Retomando scan #{self.scan_id} ({len(self.completed)} buscas já concluídas)")
+        else:
+            self.resumed = False
+            self.scan_id += 1
+            self.completed = set()
+            self.finished = False
+            self.save()
+        return self.scan_id
+
+    def should_skip(self, search_id, now=None):
+        """True if the search already ran in this scan or, right after a restart, is still fresh"""
+        if search_id in self.completed:
+            return True
+        if not self.resumed:
+            return False
+        now = now if now is not None else time.time()
+        last_run = self.last_run.get(search_id)
+        return last_run is not None and now - last_run < self.freshness
+
+    def mark_done(self, search_id, now=None):
+        """Record a completed search and persist"""
+        self.completed.add(search_id)
+        self.last_run[search_id] = now if now is not None else time.time()
+        self.save()
+
+    def finish_scan(self, active_ids=None):
+        """Close the current scan; drops timestamps of configs no longer active"""
+        self.finished = True
+        self.resumed = False
+        self.completed = set()
+        if active_ids is not None:
+            active_ids = set(active_ids)
+            self.last_run = {k: v for k, v in self.last_run.items() if k in active_ids}
+        self.save()
@@ -0,0 +1,141 @@
+"""Profiling for a single scan (``--profile`` run mode of the scrapers).
+
+Every search (or multi-tab batch) runs under its own ``cProfile`` profiler
+and between two ``tracemalloc`` snapshots. For each one the output directory
+gets:
+
+- ``NNN_<site>_<search>.pstats``: a cProfile dump (``python -m pstats``, snakeviz…)
+- ``NNN_<site>_<search>.alloc.txt``: the lines that allocated the most memory
+- ``NNN_<site>_<search>.json``: site, search configs, elapsed time and file names
+
+``summary.txt`` ranks the searches by time and shows the merged hot spots of
+the scraper functions (``scrape_*``, ``extract_*``, ``save_product``,
+``calculate_weighted_average``). ``scan.pstats`` holds the merged profile.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '10'))
+
+# Funções do scraper destacadas no resumo
+HOTSPOT_PATTERN = r"scrape_|extract_|save_product|calculate_weighted_average|check_promotion|match_embedded"
+
+def _slug(text, limit=40):
+    return re.sub(r"[^a-z0-9]+", "-", (text or "").lower()).strip("-")[:limit] or "busca"
+
+def _describe(search):
+    return {
+        "id": search.get("id"),
+        "search_text": search.get("search_text"),
+        "category": search.get("category"),
+        "website": search.get("website"),
+        "keywords": search.get("keywords"),
+    }
+
+class ScanProfiler:
+    """Writes one cProfile dump and one allocation report per profiled section"""
+
+    def __init__(self, output_dir, top=25):
+        self.output_dir = output_dir
+        self.top = top
+        self.records = []
+        os.makedirs(output_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def profile(self, website, searches):
+        """Profile the body; ``searches`` is one search config or a list of them"""
+        if isinstance(searches, dict):
+            searches = [searches]
+
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            after = tracemalloc.take_snapshot()
+            try:
+                self._write(website, searches, profiler, elapsed, before, after)
+            except Exception as e:
+                print(f"⚠️ Erro ao gravar perfil: {e}")
+
+    def wrap(self, handler):
+        """``handler(website, search_config)`` profiled per call"""
+        def profiled(website, search_config):
+            with self.profile(website, search_config):
+                return handler(website, search_config)
+        return profiled
+
+    def _write(self, website, searches, profiler, elapsed, before, after):
+        label = searches[0].get("search_text") if len(searches) == 1 else f"{len(searches)}-buscas"
+        base = os.path.join(self.output_dir, f"{len(self.records) + 1:03d}_{website}_{_slug(label)}")
+
+        profiler.dump_stats(f"{base}.pstats")
+
+        with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"# site: {website}\n")
+            for search in searches:
+                f.write(f"# busca: {json.dumps(_describe(search), ensure_ascii=False)}\n")
+            f.write(f"# tempo: {elapsed:.2f}s\n\n")
+            f.write(f"Top {self.top} alocações líquidas durante a busca (arquivo:linha):\n")
+            for stat in after.compare_to(before, "lineno")[:self.top]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTop {self.top} blocos vivos ao final (arquivo:linha):\n")
+            for stat in after.statistics("lineno")[:self.top]:
+                f.write(f"{stat}\n")
+
+        record = {
+            "website": website,
+            "searches": [_describe(search) for search in searches],
+            "elapsed": round(elapsed, 3),
+            "pstats": os.path.basename(f"{base}.pstats"),
+            "alloc": os.path.basename(f"{base}.alloc.txt"),
+        }
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+
+        self.records.append(record)
+        print(f"🔬 Perfil gravado: {os.path.basename(base)} ({elapsed:.1f}s)")
+
+    def finish(self, scan_elapsed=None):
+        """Write summary.txt and the merged scan.pstats; returns the summary path"""
+        summary_path = os.path.join(self.output_dir, "summary.txt")
+        paths = [os.path.join(self.output_dir, record["pstats"]) for record in self.records]
+
+        with open(summary_path, "w", encoding="utf-8") as f:
+            if scan_elapsed is not None:
+                f.write(f"Scan: {scan_elapsed:.1f}s, {len(self.records)} seções perfiladas\n\n")
+
+            f.write("Seções por tempo:\n")
+            for record in sorted(self.records, key=lambda r: r["elapsed"], reverse=True):
+                searches = ", ".join(str(search["search_text"]) for search in record["searches"])
+                f.write(f"  {record['elapsed']:8.2f}s  {record['website']:<10} {searches}  ({record['pstats']})\n")
+
+            if paths:
+                stream = io.StringIO()
+                merged = pstats.Stats(*paths, stream=stream)
+                merged.dump_stats(os.path.join(self.output_dir, "scan.pstats"))
+                merged.sort_stats("cumulative").print_stats(HOTSPOT_PATTERN, self.top)
+                f.write("\nFunções do scraper (acumulado no scan):\n")
+                f.write(stream.getvalue())
+
+        print(f"🔬 Resumo do perfil em {summary_path}")
+        return summary_path
+
+def section(profiler, website, searches):
+    """``profiler.profile(...)``, or a no-op context when not profiling"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.profile(website, searches)
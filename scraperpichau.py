@@ -1,37 +1,54 @@
-import asyncio
 import time
-import random
-import threading
-import signal
-import sys
-import os
-import subprocess
-import shutil
-from urllib.parse import quote_plus
-from contextlib import contextmanager
-from zoneinfo import ZoneInfo
-
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-
-from telegram_bot.telegram_bot import TelegramPriceBot
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, Table, Column, Integer, String, Numeric, ForeignKey, MetaData, select, Boolean, DateTime
-from datetime import datetime
-import re
+
+# Antes dos demais imports: o tempo de startup inclui o custo de importá-los
+STARTUP_BEGIN = time.perf_counter()
+
+import argparse  # noqa: E402
+import random  # noqa: E402
+import threading  # noqa: E402
+import signal  # noqa: E402
+import sys  # noqa: E402
+import os  # noqa: E402
+from urllib.parse import quote_plus  # noqa: E402
+from contextlib import contextmanager  # noqa: E402
+from zoneinfo import ZoneInfo  # noqa: E402
+
+# selenium, webdriver_manager, telegram, asyncio e bs4 são importados sob demanda (startup rápido).
+# SQLAlchemy fica aqui: as tabelas abaixo (e nos módulos auxiliares) são definidas no import
+import chromedriver_cache  # noqa: E402
+import work_queue  # noqa: E402
+import scan_checkpoint  # noqa: E402
+import price_parser  # noqa: E402
+import embedded_data  # noqa: E402
+import http_fetch  # noqa: E402
+import tab_pool  # noqa: E402
+import memory_monitor  # noqa: E402
+import page_archive  # noqa: E402
+import alert_state  # noqa: E402
+import product_identity  # noqa: E402
+import product_keys  # noqa: E402
+import search_watchdog  # noqa: E402
+import scan_profiler  # noqa: E402
+import browser_profiles  # noqa: E402
+import ingest_spool  # noqa: E402
+import price_rollup  # noqa: E402
+import proxy_pool  # noqa: E402
+import observation_stream  # noqa: E402
+import rescan_queue  # noqa: E402
+import change_outbox  # noqa: E402
+import dom_cards  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from sqlalchemy import create_engine, Table, Column, Integer, String, Numeric, ForeignKey, MetaData, select, Boolean, DateTime  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+import re  # noqa: E402
 
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 brasilia = ZoneInfo("America/Sao_Paulo")
 
-engine = create_engine(DATABASE_URL, echo=False)
+_engine = None
+_engine_lock = threading.Lock()
 metadata = MetaData()
 
 products = Table("products", metadata,
@@ -40,6 +57,7 @@ products = Table("products", metadata,
     Column("website", String, nullable=False),
     Column("category", String, nullable=False),
     Column("product_link", String),
+    Column("site_sku", String),
 )
 
 prices = Table("prices", metadata,
@@ -70,10 +88,30 @@ keyword_groups = Table("keyword_groups", metadata,
 
 TIMEOUT = 25
 
+PICHAU_BASE_URL = os.getenv('PICHAU_BASE_URL', 'https://www.pichau.com.br')
+
+# Modo distribuído: vários nós dividem cada scan através da fila scan_work_items
+DISTRIBUTED_MODE = os.getenv('SCRAPER_DISTRIBUTED', '').lower() in ('1', 'true', 'yes')
+WORKER_ID = work_queue.default_worker_id()
+
+# Progresso do scan persistido para retomar após restart
+CHECKPOINT_FILE = os.getenv('SCAN_CHECKPOINT_FILE', '.scan_checkpoint_pichau.json')
+SPOOL_MODE = os.getenv('SCRAPER_SPOOL', '').lower() in ('1', 'true', 'yes')
+SPOOL_FILE = os.getenv('INGEST_SPOOL_FILE', '.ingest_spool_pichau.db')
+
 # Global variables
 stop_event = threading.Event()
 is_windows = sys.platform.startswith('win')
 
+def get_engine():
+    """Create the SQLAlchemy engine on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(DATABASE_URL, echo=False)
+    return _engine
+
 @contextmanager
 def managed_driver(website=None):
     """Context manager for driver with proper cleanup and crash recovery"""
@@ -82,73 +120,85 @@ def managed_driver(website=None):
         driver = create_driver(website)
         if not driver:
             raise Exception(f"Failed to create driver for {website}")
+        with _open_drivers_lock:
+            _open_drivers.add(driver)
         yield driver
     except Exception as e:
         print(f"❌ Erro no driver: {e}")
         raise
     finally:
         if driver:
+            with _open_drivers_lock:
+                _open_drivers.discard(driver)
+            # Lida antes do quit: depois dele os Chrome que sobrarem ficam órfãos
+            leftover_pids = search_watchdog.driver_pids(driver)
             try:
                 driver.quit()
             except Exception as e:
                 print(f"⚠️ Erro ao finalizar driver: {e}")
             finally:
-                cleanup_browser_processes()
+                # Só o que sobrou deste driver; outros drivers e processos seguem vivos
+                search_watchdog.kill_pids(leftover_pids)
+                browser_profiles.release(driver)
+                proxy_pool.release(driver)
+
+_open_drivers = set()
+_open_drivers_lock = threading.Lock()
 
 def cleanup_browser_processes():
-    """Force cleanup of Chrome processes"""
-    if not is_windows:
+    """Kill the process trees of the drivers this process still has open"""
+    with _open_drivers_lock:
+        drivers = list(_open_drivers)
+    for driver in drivers:
         try:
-            commands = [
-                ['pkill', '-f', 'chrome'],
-                ['pkill', '-f', 'chromedriver']
-            ]
-            
-            for cmd in commands:
-                subprocess.run(cmd, timeout=3, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+            search_watchdog.kill_driver(driver)
         except Exception:
             pass
 
 def random_delay():
-    """Interruptible random delay"""
+    """Interruptible random delay (priority rescans run during it)"""
     delay_time = random.uniform(1, 3)
-    return stop_event.wait(delay_time)
+    return wait_with_rescans(delay_time)
 
-def normalize_price_pichau(price_text):
-    """Normalize Pichau price formatting"""
-    try:
-        clean_text = price_text.replace("\xa0", " ").replace("R$", "").replace(" ", "").strip()
-        
-        if "." in clean_text and "," in clean_text:
-            clean_text = clean_text.replace(".", "").replace(",", ".")
-            price = float(clean_text)
-        elif "," in clean_text and "." not in clean_text:
-            clean_text = clean_text.replace(",", ".")
-            price = float(clean_text)
-        elif "." in clean_text and "," not in clean_text:
-            parts = clean_text.split(".")
-            if len(parts) == 2 and len(parts[1]) > 2:
-                price = float(clean_text) / 100
-            else:
-                price = float(clean_text)
-        else:
-            price = float(clean_text)
+def run_rescans(handler=None):
+    """Run every queued priority rescan now; returns how many searches ran"""
+    handler = handler or process_search
+    ran = 0
+    while not stop_event.is_set():
+        request = rescan_queue.queue.pop()
+        if request is None:
+            break
         
-        if price > 10000:
-            corrected_price = price / 100
-            if 10 <= corrected_price <= 10000:
-                price = corrected_price
-        
-        return price
+        configs = get_search_configs_with_keywords([request.search_config_id])
+        if configs and configs[0]["website"] in SITE_PAGES:
+            search = configs[0]
+            print(f"\n⚡ Rescan prioritário ({request.source}): {search['search_text']} em {search['website'].upper()}")
+            handler(search["website"], search)
+            ran += 1
+        else:
+            print(f"⚠️ Rescan da config {request.search_config_id} ignorado (inativa ou de outro scraper)")
         
-    except Exception as e:
-        print(f"Erro ao normalizar preço '{price_text}': {e}")
-        return 0.0
+        try:
+            rescan_queue.complete(get_engine(), request)
+        except Exception as e:
+            print(f"⚠️ Erro ao concluir pedido de rescan: {e}")
+    return ran
+
+def wait_with_rescans(seconds):
+    """Wait up to seconds, running priority rescans as they arrive; True when stopping"""
+    deadline = time.monotonic() + seconds
+    while not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if rescan_queue.queue.wait(remaining, stop_event):
+            run_rescans()
+    return stop_event.is_set()
 
 def calculate_weighted_average(product_id):
     """Calculate historical weighted average using the CORRECT logic with check_count weighting"""
     try:
-        with engine.begin() as conn:
+        with get_engine().begin() as conn:
             # Buscar TODOS os registros históricos, ordenados por data (mais antigo primeiro)
             query = select(
                 prices.c.price,
@@ -228,7 +278,16 @@ def check_promotion_and_notify(product_id, product_name, current_price, product_
                        discount_amount > 0)
         
         if is_promotion:
+            # Mesmo produto/faixa de preço já alertado dentro do cooldown
+            alerts = alert_state.get_store(get_engine())
+            if not alerts.should_alert(product_id, current_price):
+                print(f"🔕 Alerta repetido suprimido: {product_name} - {actual_discount_percent:.1f}% OFF")
+                return False
+
             try:
+                import asyncio
+                from telegram_bot.telegram_bot import TelegramPriceBot
+                
                 bot = TelegramPriceBot()
                 message = f" -- DESCONTO ENCONTRADO -- \n\n"
                 message += f"Produto: {product_name}\n\n"
@@ -238,6 +297,7 @@ def check_promotion_and_notify(product_id, product_name, current_price, product_
                 message += f"{product_link}"
                 
                 asyncio.run(bot.send_message(message))
+                alerts.record(product_id, current_price)
                 print(f"✅ Notificação enviada: {product_name} - {actual_discount_percent:.1f}% OFF")
                 return True
             except Exception as e:
@@ -255,98 +315,260 @@ def check_promotion_and_notify(product_id, product_name, current_price, product_
         print(f"❌ Erro ao verificar promoção: {e}")
         return False
 
-def save_product(name, price, website, category, product_link, keywords_matched=None):
-    """Save product with optimized duplicate checking"""
-    if price <= 10.0:
-        return
+def ensure_ingest_schema():
+    """Schema changes store_observation relies on (checked once per engine)"""
+    product_keys.ensure_schema(get_engine())
+    product_identity.ensure_schema(get_engine())
+    price_rollup.ensure_schema(get_engine())
+    change_outbox.ensure_schema(get_engine())
+    # Tabela de alertas criada fora da transação do save (evita lock no SQLite)
+    alert_state.get_store(get_engine())
+
+def store_observation(conn, name, price, website, category, product_link, observed_at=None):
+    """Write one observation inside the caller's transaction (observed_at defaults to now)"""
+    # Upsert pelo SKU da loja (título pode mudar sem criar outro produto)
+    product_id, created, renamed = product_keys.upsert_product(
+        conn, products, name, website, category, product_link
+    )
     
-    try:
-        with engine.begin() as conn:
-            # Check if product exists
-            query = select(products.c.id).where(
-                products.c.name == name,
-                products.c.website == website
-            )
-            product_id = conn.execute(query).scalar()
-            
-            if product_id is None:
-                result = conn.execute(products.insert().values(
-                    name=name,
-                    website=website,
-                    category=category,
-                    product_link=product_link
-                ))
-                product_id = result.inserted_primary_key[0]
-            
-            # Get last price
-            last_price_query = select(
-                prices.c.price,
-                prices.c.check_count,
-                prices.c.id,
-                prices.c.last_checked_at
-            ).where(
-                prices.c.product_id == product_id
-            ).order_by(
-                prices.c.last_checked_at.desc()
-            ).limit(1)
+    # Título novo: a assinatura MinHash antiga deixaria o produto nos buckets errados
+    if created or renamed:
+        product_identity.index_product(conn, product_id, name, website)
+    
+    # Get last price
+    last_price_query = select(
+        prices.c.price,
+        prices.c.check_count,
+        prices.c.id,
+        prices.c.last_checked_at
+    ).where(
+        prices.c.product_id == product_id
+    ).order_by(
+        prices.c.last_checked_at.desc()
+    ).limit(1)
+    
+    last_price_result = conn.execute(last_price_query).first()
+    current_time = observed_at or datetime.now(brasilia)
+    previous_price = None
+    change_kind = None
+    
+    if last_price_result is None:
+        # First price for this product
+        conn.execute(prices.insert().values(
+            product_id=product_id,
+            price=price,
+            collected_at=current_time,
+            last_checked_at=current_time,
+            price_changed_at=current_time,
+            check_count=1
+        ))
+        # Produto antigo sem linhas de preço conta como mudança (stream e outbox concordam)
+        change_kind = "new_product" if created else "price_change"
+    else:
+        last_price = float(last_price_result.price)
+        current_price = float(price)
+        previous_price = last_price
+        
+        if abs(last_price - current_price) > 0.01:
+            # Price changed - insert new record
+            conn.execute(prices.insert().values(
+                product_id=product_id,
+                price=current_price,
+                collected_at=current_time,
+                last_checked_at=current_time,
+                price_changed_at=current_time,
+                check_count=1
+            ))
+            change_kind = "price_change"
             
-            last_price_result = conn.execute(last_price_query).first()
-            current_time = datetime.now(brasilia)
+            # Depois do commit: a média enxerga este preço e o alerta nunca sai de um rollback.
+            # Num lote, só a última mudança do produto é avaliada
+            alert_state.defer(conn, product_id, check_promotion_and_notify,
+                              product_id, name, current_price, product_link)
+        else:
+            # Same price - update counters
+            current_check_count = last_price_result.check_count or 0
+            new_check_count = current_check_count + 1
             
-            if last_price_result is None:
-                # First price for this product
-                conn.execute(prices.insert().values(
-                    product_id=product_id,
-                    price=price,
-                    collected_at=current_time,
+            conn.execute(
+                prices.update()
+                .where(prices.c.id == last_price_result.id)
+                .values(
                     last_checked_at=current_time,
-                    price_changed_at=current_time,
-                    check_count=1
-                ))
-            else:
-                last_price = float(last_price_result.price)
-                current_price = float(price)
-                
-                if abs(last_price - current_price) > 0.01:
-                    # Price changed - insert new record
-                    conn.execute(prices.insert().values(
-                        product_id=product_id,
-                        price=current_price,
-                        collected_at=current_time,
-                        last_checked_at=current_time,
-                        price_changed_at=current_time,
-                        check_count=1
-                    ))
-                    
-                    check_promotion_and_notify(product_id, name, current_price, product_link)
-                else:
-                    # Same price - update counters
-                    current_check_count = last_price_result.check_count or 0
-                    new_check_count = current_check_count + 1
-                    
-                    conn.execute(
-                        prices.update()
-                        .where(prices.c.id == last_price_result.id)
-                        .values(
-                            last_checked_at=current_time,
-                            check_count=new_check_count
-                        )
-                    )
+                    check_count=new_check_count
+                )
+            )
+    
+    # Linha do dia em price_daily (gráficos leem no máximo uma linha por dia)
+    price_rollup.record(conn, product_id, price, current_time)
+    
+    # Evento do stream NDJSON; quem é dono da transação publica após o commit
+    if observation_stream.enabled():
+        observation_stream.defer(conn, observation_stream.build_event(
+            conn, prices, change_kind or "observation", product_id, name, price, website,
+            category, product_link, current_time, previous_price
+        ))
+    
+    # Gravado por quem é dono da transação, logo antes do commit (change_outbox.flush)
+    if change_kind:
+        change_outbox.append(conn, change_kind, product_id, website, name, category, product_link,
+                             price, previous_price, current_time)
+
+def backfill_observation(conn, name, price, website, category, product_link, observed_at):
+    """Write an old observation (archive replay) into a gap of the product's price history.
+
+    The product's name and link are kept and no alert, outbox row or stream
+    event is produced. An observation the history already agrees with (a
+    price row of the same price spans its time) or that lands on a recorded
+    check is skipped. Otherwise it extends the neighbouring row with the
+    same price, joins the two neighbours when both have it, or gets a row of
+    its own; a row of another price that spanned the gap is cut in two around
+    it. Replay oldest first. Returns True when written.
+    """
+    product_id, created = product_keys.find_or_create_product(
+        conn, products, name, website, category, product_link
+    )
+    if created:
+        product_identity.index_product(conn, product_id, name, website)
+    
+    def local(value):
+        return value.astimezone(brasilia).replace(tzinfo=None) if value.tzinfo is not None else value
+    
+    columns = (prices.c.id, prices.c.price, prices.c.collected_at, prices.c.last_checked_at, prices.c.check_count)
+    # Vizinhos no histórico: a última faixa que começou antes e a primeira que começa depois
+    before = conn.execute(
+        select(*columns)
+        .where(prices.c.product_id == product_id, prices.c.collected_at <= observed_at)
+        .order_by(prices.c.collected_at.desc())
+        .limit(1)
+    ).first()
+    after = conn.execute(
+        select(*columns)
+        .where(prices.c.product_id == product_id, prices.c.collected_at > observed_at)
+        .order_by(prices.c.collected_at.asc())
+        .limit(1)
+    ).first()
+    
+    price = float(price)
+    same_before = before is not None and abs(float(before.price) - price) <= 0.01
+    same_after = after is not None and abs(float(after.price) - price) <= 0.01
+    observed_local = local(observed_at)
+    
+    if before is not None and observed_local <= local(before.last_checked_at):
+        start, end = local(before.collected_at), local(before.last_checked_at)
+        if same_before or observed_local in (start, end):
+            # Horário já coberto pelo histórico gravado ao vivo
+            return False
+        
+        # A faixa atravessava o buraco sem checagens nele: é cortada em volta desta observação
+        checks = max(before.check_count or 1, 2)
+        checks_before, last_before, first_after = price_rollup.checks_around(conn, product_id, start, observed_local)
+        head_checks = min(max(checks_before, 1), checks - 1)
+        head_end = min(max(last_before or start, start), observed_local)
+        tail_start = min(max(first_after or end, observed_local + timedelta(seconds=1)), end)
+        conn.execute(
+            prices.update()
+            .where(prices.c.id == before.id)
+            .values(last_checked_at=head_end.replace(tzinfo=brasilia), check_count=head_checks)
+        )
+        conn.execute(prices.insert().values(
+            product_id=product_id,
+            price=before.price,
+            collected_at=tail_start.replace(tzinfo=brasilia),
+            last_checked_at=before.last_checked_at,
+            price_changed_at=tail_start.replace(tzinfo=brasilia),
+            check_count=checks - head_checks
+        ))
+        same_before = same_after = False
+    
+    if same_before and same_after:
+        # O buraco separava duas faixas do mesmo preço: viram uma só
+        conn.execute(
+            prices.update()
+            .where(prices.c.id == before.id)
+            .values(
+                last_checked_at=after.last_checked_at,
+                check_count=(before.check_count or 0) + (after.check_count or 0) + 1
+            )
+        )
+        conn.execute(prices.delete().where(prices.c.id == after.id))
+    elif same_before:
+        conn.execute(
+            prices.update()
+            .where(prices.c.id == before.id)
+            .values(last_checked_at=observed_at, check_count=(before.check_count or 0) + 1)
+        )
+    elif same_after:
+        # A faixa seguinte passa a começar mais cedo
+        conn.execute(
+            prices.update()
+            .where(prices.c.id == after.id)
+            .values(
+                collected_at=observed_at,
+                price_changed_at=observed_at,
+                check_count=(after.check_count or 0) + 1
+            )
+        )
+    else:
+        conn.execute(prices.insert().values(
+            product_id=product_id,
+            price=price,
+            collected_at=observed_at,
+            last_checked_at=observed_at,
+            price_changed_at=observed_at,
+            check_count=1
+        ))
+    
+    price_rollup.record(conn, product_id, price, observed_at)
+    return True
+
+_spool = None
+_spool_lock = threading.Lock()
+
+def get_spool():
+    """Local ingest spool, opened on first use"""
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                _spool = ingest_spool.IngestSpool(SPOOL_FILE)
+    return _spool
+
+def save_product(name, price, website, category, product_link, keywords_matched=None, observed_at=None):
+    """Save product with optimized duplicate checking (observed_at defaults to now)"""
+    if price <= 10.0:
+        return
+    
+    try:
+        if SPOOL_MODE:
+            # Grava local primeiro; o SpoolSyncer envia ao banco em lotes
+            get_spool().append(name, price, website, category, product_link, observed_at or datetime.now(brasilia))
+            return
+        
+        ensure_ingest_schema()
+        with get_engine().begin() as conn:
+            store_observation(conn, name, price, website, category, product_link, observed_at)
+            change_outbox.flush(conn)
+            events = observation_stream.take(conn)
+            promotions = alert_state.take(conn)
+        observation_stream.publish(events)
+        alert_state.run(promotions)
 
     except Exception as e:
         print(f"❌ Erro ao salvar produto: {e}")
 
-
-def get_search_configs_with_keywords():
-    """Get all active search configurations with their keyword groups"""
+def get_search_configs_with_keywords(config_ids=None):
+    """Get all active search configurations with their keyword groups (optionally only config_ids)"""
     try:
-        with engine.begin() as conn:
+        with get_engine().begin() as conn:
             configs_query = select(
                 search_configs.c.id,
                 search_configs.c.search_text,
                 search_configs.c.category,
                 search_configs.c.website
             ).where(search_configs.c.is_active == True)
+            if config_ids is not None:
+                configs_query = configs_query.where(search_configs.c.id.in_(list(config_ids)))
             
             configs = conn.execute(configs_query).fetchall()
             
@@ -365,6 +587,7 @@ def get_search_configs_with_keywords():
                 
                 if keyword_groups_list:
                     configs_with_keywords.append({
+                        "id": config.id,
                         "search_text": config.search_text,
                         "keywords": keyword_groups_list,
                         "category": config.category,
@@ -376,54 +599,171 @@ def get_search_configs_with_keywords():
         print(f"❌ Erro ao buscar configurações: {e}")
         return []
 
+def match_embedded_products(items, wordlist, sku_in_name=False):
+    """Keyword-match products read from the page's embedded JSON; returns (found, products)"""
+    products_found = 0
+    products = []
+    
+    for item in items:
+        name = item["name"].lower()
+        matched_keywords = []
+        for words in wordlist:
+            if all(p.lower() in name for p in words):
+                matched_keywords.append(words)
+        
+        if not matched_keywords:
+            continue
+        
+        products_found += 1
+        products.append({
+            "name": f"{name} #{item['sku']}" if sku_in_name else name,
+            "price": item["price"],
+            "link": item["link"],
+            "keywords": matched_keywords,
+        })
+    
+    return products_found, products
+
+def save_products(products, website, category):
+    """Save extracted products; returns how many were saved"""
+    products_saved = 0
+    
+    # Banco lento não conta no prazo da busca (o watchdog mataria um driver saudável)
+    with search_watchdog.watchdog.suspended():
+        for product in products:
+            if stop_event.is_set():
+                break
+            
+            if product["price"] and product["price"] > 10.0 and product["link"]:
+                save_product(product["name"], product["price"], website, category, product["link"], product["keywords"])
+                products_saved += 1
+    
+    return products_saved
+
+def pichau_search_url(query):
+    """Pichau search URL; search_text is stored as a path (e.g. /search?q=...)"""
+    return f"{PICHAU_BASE_URL}{query}"
+
+def extract_pichau_cards(page_source, wordlist):
+    """Extract matching products from rendered Pichau cards; None when the page has no cards"""
+    products_found = 0
+    
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(page_source, "html.parser")
+    cards = soup.select("[data-cy='list-product']")
+    
+    if not cards:
+        soup.decompose()
+        return None
+    
+    matched_cards = []
+    
+    for card in cards:
+        if stop_event.is_set():
+            break
+            
+        try:
+            name = card.select_one("h2").get_text(strip=True).lower()
+            matched_keywords = []
+            for words in wordlist:
+                if all(p.lower() in name for p in words):
+                    matched_keywords.append(words)
+            
+            if matched_keywords:
+                products_found += 1
+                
+                product_link = PICHAU_BASE_URL + card.get("href")
+                price_elem = card.select_one("div.mui-12athy2-price_vista, .price, [data-testid='price']")
+                
+                if price_elem:
+                    matched_cards.append((name, product_link, price_elem.get_text(strip=True), matched_keywords))
+                
+        except Exception as e:
+            print(f"❌ Erro parsing produto Pichau: {e}")
+    
+    # Libera a árvore assim que os cards foram lidos
+    soup.decompose()
+    del soup, cards
+    
+    return products_found, pichau_card_products(matched_cards)
+
+def pichau_card_products(matched_cards):
+    """Products from matched Pichau cards [(name, link, price_text, keywords)]"""
+    # Pichau às vezes renderiza o preço em centavos sem separador
+    card_prices = price_parser.parse_prices(
+        [price_text for _, _, price_text, _ in matched_cards], cents_heuristic=True
+    )
+    
+    products = []
+    for (name, product_link, price_text, matched_keywords), price in zip(matched_cards, card_prices):
+        if price is None:
+            print(f"Erro ao normalizar preço '{price_text}'")
+            continue
+        products.append({"name": name, "price": price, "link": product_link, "keywords": matched_keywords})
+    
+    return products
+
+def extract_dom_cards(driver, website, wordlist, scroll=None):
+    """Read a search page's cards in the browser (execute_script, lazy-load scroll); None when it has no cards"""
+    if not dom_cards.enabled():
+        return None
+    cards = dom_cards.extract_cards(driver, website, scroll=scroll)
+    if not cards:
+        return None
+    products_found, matched_cards = dom_cards.match_cards(cards, wordlist)
+    return products_found, pichau_card_products(matched_cards)
+
+def extract_pichau_page(page_source, wordlist):
+    """Extract matching products from a fetched Pichau page: embedded JSON first, rendered cards as fallback"""
+    items = embedded_data.pichau_products(embedded_data.extract_next_data(page_source), PICHAU_BASE_URL)
+    if items:
+        return match_embedded_products(items, wordlist)
+    return extract_pichau_cards(page_source, wordlist)
+
 def scrape_pichau(driver, wait, query, wordlist, category):
     """Scrape Pichau with enhanced price parsing"""
     if stop_event.is_set():
         return 0, 0
     
     print(f"\nBuscando {query} em: PICHAU")
-    products_found = 0
-    products_saved = 0
     
     try:
-        base_url = "https://www.pichau.com.br"
-        url = f"{base_url}{query}"
+        url = pichau_search_url(query)
         
         driver.get(url)
-        time.sleep(3)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-cy='list-product']")))
-        time.sleep(7)
         
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        cards = soup.select("[data-cy='list-product']")
+        # Caminho estruturado: Apollo state embutido no HTML, sem esperar renderizar
+        next_data = embedded_data.wait_for_next_data(driver, timeout=10)
+        items = embedded_data.pichau_products(next_data, PICHAU_BASE_URL)
+        del next_data
         
-        for card in cards:
-            if stop_event.is_set():
-                break
-                
-            try:
-                name = card.select_one("h2").get_text(strip=True).lower()
-                matched_keywords = []
-                for words in wordlist:
-                    if all(p.lower() in name for p in words):
-                        matched_keywords.append(words)
-                
-                if matched_keywords:
-                    products_found += 1
-                    
-                    product_link = base_url + card.get("href")
-                    price_elem = card.select_one("div.mui-12athy2-price_vista, .price, [data-testid='price']")
-                    
-                    if price_elem:
-                        price_text = price_elem.get_text(strip=True).replace("\xa0", " ")
-                        price = normalize_price_pichau(price_text)
-                        
-                        if price > 10.0:
-                            save_product(name, price, "pichau", category, product_link, matched_keywords)
-                            products_saved += 1
-                    
-            except Exception as e:
-                print(f"❌ Erro parsing produto Pichau: {e}")
+        if items:
+            if page_archive.ENABLED:
+                page_archive.archive_page("pichau", query, wordlist, category, driver.page_source)
+            products_found, products = match_embedded_products(items, wordlist)
+        else:
+            # Fallback: cards renderizados no DOM
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support import expected_conditions as EC
+            
+            time.sleep(3)
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-cy='list-product']")))
+            
+            # Cards lidos no navegador; o scroll coleta os que o lazy-load adiciona
+            extracted = extract_dom_cards(driver, "pichau", wordlist)
+            if extracted is not None:
+                if page_archive.ENABLED:
+                    page_archive.archive_page("pichau", query, wordlist, category, driver.page_source)
+                products_found, products = extracted
+            else:
+                time.sleep(7)
+                page_source = driver.page_source
+                page_archive.archive_page("pichau", query, wordlist, category, page_source)
+                products_found, products = extract_pichau_cards(page_source, wordlist) or (0, [])
+                del page_source
+        
+        products_saved = save_products(products, "pichau", category)
                 
     except Exception as e:
         print(f"❌ Erro: {e}")
@@ -436,64 +776,66 @@ def scrape_pichau(driver, wait, query, wordlist, category):
     
     return products_found, products_saved
 
-def get_chromedriver_path():
-    """Get ChromeDriver path with robust error handling"""
-    if not is_windows:
-        return "/usr/local/bin/chromedriver"
+# site -> (URL de busca, extrator de página, nome salvo em products.website)
+SITE_PAGES = {
+    "pichau": (pichau_search_url, extract_pichau_page, "pichau"),
+}
+
+def scrape_http(website, search_config):
+    """Fetch and parse a search page over pooled HTTP; None means fall back to Chrome"""
+    query = search_config["search_text"]
+    
+    if website not in SITE_PAGES:
+        return None
+    
+    search_url, extract_page, store = SITE_PAGES[website]
+    url = search_url(query)
+    
+    print(f"\nBuscando {query} em: {website.upper()} (HTTP)")
     
+    proxy = proxy_pool.pool.acquire(website)
     try:
-        # First attempt: use webdriver-manager
-        print("🔄 Baixando/verificando ChromeDriver...")
-        driver_path = ChromeDriverManager().install()
-        
-        # Validate the path is an executable
-        if os.path.exists(driver_path) and driver_path.endswith('.exe'):
-            print(f"✅ ChromeDriver encontrado: {driver_path}")
-            return driver_path
-            
-        # If path doesn't end with .exe, search for the actual executable
-        print("⚠️ Procurando executável do ChromeDriver...")
-        driver_dir = os.path.dirname(driver_path)
-        for file in os.listdir(driver_dir):
-            if file.endswith('.exe') and 'chromedriver' in file.lower():
-                exe_path = os.path.join(driver_dir, file)
-                if os.path.exists(exe_path):
-                    print(f"✅ ChromeDriver executável encontrado: {exe_path}")
-                    return exe_path
-        
-        # If still no valid path, clear cache and try again
-        print("🔄 ChromeDriver inválido, limpando cache...")
-        cache_dir = os.path.expanduser('~/.wdm')
-        if os.path.exists(cache_dir):
-            shutil.rmtree(cache_dir)
-            print("✅ Cache limpo")
-            
-        # Retry after cache clear
-        print("🔄 Reinstalando ChromeDriver...")
-        driver_path = ChromeDriverManager().install()
-        
-        if driver_path.endswith('.exe'):
-            print(f"✅ ChromeDriver reinstalado: {driver_path}")
-            return driver_path
-            
-        # Last attempt: find any chromedriver.exe in the directory
-        driver_dir = os.path.dirname(driver_path)
-        for file in os.listdir(driver_dir):
-            if file == 'chromedriver.exe':
-                exe_path = os.path.join(driver_dir, file)
-                print(f"✅ ChromeDriver encontrado: {exe_path}")
-                return exe_path
-                
-        raise Exception("ChromeDriver executável não encontrado")
-        
+        page_source = http_fetch.get_fetcher().fetch(url, proxy)
+    finally:
+        if proxy:
+            proxy.release()
+    if not page_source:
+        return None
+    
+    page_archive.archive_page(website, query, search_config["keywords"], search_config["category"], page_source)
+    
+    try:
+        extracted = extract_page(page_source, search_config["keywords"])
     except Exception as e:
-        raise Exception(f"Falha ao configurar ChromeDriver: {e}. Verifique se o Chrome está instalado.")
+        print(f"❌ Erro parsing HTTP {website}: {e}")
+        return None
+    finally:
+        del page_source
+    
+    if extracted is None:
+        return None
+    
+    products_found, products = extracted
+    products_saved = save_products(products, store, search_config["category"])
+    
+    if products_found > 0:
+        print(f"{products_found} produtos encontrados e {products_saved} salvos")
+    else:
+        print("Nenhum produto encontrado")
+    
+    return products_found, products_saved
 
 def create_driver(website=None):
     """Create optimized Chrome driver with robust error handling"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.chrome.service import Service
+    
     try:
-        # Get ChromeDriver path
-        driver_path = get_chromedriver_path()
+        launch_started = time.perf_counter()
+        
+        # Get ChromeDriver path (resolvido uma vez e cacheado em disco)
+        driver_path = chromedriver_cache.get_chromedriver_path()
         service = Service(driver_path)
         
         options = ChromeOptions()
@@ -520,28 +862,50 @@ def create_driver(website=None):
         options.add_argument("--max_old_space_size=2048")
         options.add_argument("--aggressive-cache-discard")
         
-        # User agent rotation
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        ]
-        options.add_argument(f"--user-agent={random.choice(user_agents)}")
+        # User agent rotation (mesmo pool do modo HTTP)
+        options.add_argument(f"--user-agent={http_fetch.random_user_agent()}")
         
         # Anti-detection
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
         options.add_argument("--disable-blink-features=AutomationControlled")
         
-        driver = webdriver.Chrome(service=service, options=options)
+        # Kabum/Pichau são lidos do __NEXT_DATA__, que existe antes do load completo
+        if website in ("kabum", "pichau"):
+            options.page_load_strategy = "eager"
+        
+        # Perfil persistente por site: bundles JS/CSS/fontes vêm do cache em disco
+        profile = browser_profiles.acquire(website)
+        if profile:
+            for argument in profile.chrome_arguments():
+                options.add_argument(argument)
+        
+        # Proxy de saída escolhido pela saúde/latência no site (proxy_pool)
+        proxy = proxy_pool.pool.acquire(website) if website else None
+        if proxy:
+            for argument in proxy.chrome_arguments():
+                options.add_argument(argument)
+        
+        try:
+            driver = webdriver.Chrome(service=service, options=options)
+        except Exception:
+            if profile:
+                profile.release()
+            if proxy:
+                proxy.release()
+            raise
+        driver.profile_lease = profile
+        driver.proxy_lease = proxy
         
         # Optimized timeouts
         driver.set_page_load_timeout(30)
-        driver.implicitly_wait(10)
+        # Esperas explícitas (WebDriverWait); implicit wait travava cada find_element ausente
+        driver.implicitly_wait(0)
         
         # Hide webdriver property
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
+        print(f"⏱️ Chrome iniciado em {time.perf_counter() - launch_started:.2f}s")
         return driver
         
     except Exception as e:
@@ -553,100 +917,224 @@ def process_search(website, search_config):
     if stop_event.is_set():
         return 0, 0
     
+    if http_fetch.fetch_mode(website) == "http":
+        result = scrape_http(website, search_config)
+        if result is not None:
+            return result
+        print(f"↩️ {website.upper()}: página HTTP inutilizável, usando Chrome")
+    
+    from selenium.webdriver.support.ui import WebDriverWait
+    
     try:
         with managed_driver(website) as driver:
-            wait = WebDriverWait(driver, TIMEOUT)
+            with search_watchdog.watchdog.watch(driver, website, search_config["search_text"]):
+                wait = WebDriverWait(driver, TIMEOUT)
+                search_started = time.perf_counter()
             
-            if website == "pichau":
-                found, saved = scrape_pichau(driver, wait, search_config["search_text"], 
-                                           search_config["keywords"], search_config["category"])
-            else:
-                return 0, 0
+                if website == "pichau":
+                    found, saved = scrape_pichau(driver, wait, search_config["search_text"], 
+                                               search_config["keywords"], search_config["category"])
+                else:
+                    return 0, 0
             
-            return found, saved
+                proxy_pool.report_search(driver, found, time.perf_counter() - search_started)
+                return found, saved
             
     except Exception as e:
         print(f"❌ Erro na busca '{search_config['search_text']}' em {website}: {e}")
         return 0, 0
 
-def start_search():
-    """Main search loop with optimized error handling"""
-    def search_task():
-        scan_count = 0
+def process_searches_multitab(website, searches):
+    """Run a site's searches in several tabs of one Chrome instance, yielding (search, found, saved)"""
+    if website not in SITE_PAGES or stop_event.is_set():
+        return
+    
+    search_url, extract_page, store = SITE_PAGES[website]
+    tab_count = tab_pool.tabs_for(website)
+    remaining = list(searches)
+    
+    def harvest(page_source, search):
+        print(f"\nBuscando {search['search_text']} em: {website.upper()} (aba)")
+        page_archive.archive_page(website, search["search_text"], search["keywords"], search["category"], page_source)
+        # driver: o da rodada atual (definido abaixo, antes de qualquer harvest)
+        proxy_pool.report_driver(driver, "blocked" if proxy_pool.detect_block(page_source) else "ok")
+        try:
+            return extract_page(page_source, search["keywords"]) or (0, [])
+        except Exception as e:
+            print(f"❌ Erro parsing {website}: {e}")
+            return 0, []
+    
+    # Um driver por rodada; é reciclado quando passa do limite de memória ou trava
+    while remaining and not stop_event.is_set():
+        jobs = [(search_url(search["search_text"]), search) for search in remaining]
+        recycled = False
+        deadline = None
+        pending_before = len(remaining)
         
         try:
-            while not stop_event.is_set():
-                scan_count += 1
-                print(f"\n{'='*50}")
-                print(f"   INICIANDO SCAN #{scan_count}")
-                print(f"{'='*50}")
-                
-                start_time = time.time()
-                total_found = 0
-                total_saved = 0
-                total_searches = 0
-                
-                try:
-                    all_searches = get_search_configs_with_keywords()
-                    
-                    if not all_searches:
-                        print("❌ Nenhuma configuração de busca ativa")
-                        if stop_event.wait(300):  # 5 minutes
-                            break
-                        continue
-                    
-                    searches_by_website = {"pichau": []}
-                    
-                    for search in all_searches:
-                        website = search['website']
-                        if website in searches_by_website:
-                            searches_by_website[website].append(search)
-                    
-                    # Process each website sequentially for stability
-                    for website, searches in searches_by_website.items():
-                        if not searches or stop_event.is_set():
-                            continue
+            with managed_driver(website) as driver:
+                with search_watchdog.watchdog.watch(driver, website, f"{len(remaining)} buscas em abas") as deadline:
+                    for search, (found, products) in tab_pool.run_multitab(driver, website, jobs, harvest, stop_event, tab_count):
+                        remaining.remove(search)
+                        yield search, found, save_products(products, store, search["category"])
+                        deadline.extend()
                         
-                        print(f"\n🔍 {website.upper()}: {len(searches)} buscas")
-                        website_found = 0
-                        website_saved = 0
-                        
-                        for search in searches:
-                            if stop_event.is_set():
-                                break
-                            
-                            found, saved = process_search(website, search)
+                        memory_monitor.enforce_process_limit()
+                        if remaining and memory_monitor.driver_over_limit(driver):
+                            recycled = True
+                            break
+        except Exception as e:
+            # Driver morto pelo watchdog: recomeça só se a rodada avançou
+            if deadline is None or not deadline.expired or len(remaining) == pending_before:
+                print(f"❌ Erro no modo multi-aba em {website}: {e}")
+                break
+            recycled = True
+        
+        if not recycled:
+            break
+    
+    # O que as abas não concluíram segue uma busca por vez, cada uma com seu driver
+    if remaining and not stop_event.is_set():
+        print(f"↩️ {website.upper()}: {len(remaining)} buscas sem resultado nas abas, seguindo uma a uma: "
+              f"{', '.join(search['search_text'] for search in remaining)}")
+        for search in list(remaining):
+            if stop_event.is_set():
+                break
+            found, saved = process_search(website, search)
+            remaining.remove(search)
+            yield search, found, saved
+            if random_delay():
+                break
+
+def run_scan_once(checkpoint, profiler=None):
+    """Run one full scan; returns its elapsed seconds, or None when there is nothing to scan"""
+    scan_count = checkpoint.start_scan()
+    print(f"\n{'='*50}")
+    print(f"   INICIANDO SCAN #{scan_count}")
+    print(f"{'='*50}")
+    
+    start_time = time.time()
+    total_found = 0
+    total_saved = 0
+    total_searches = 0
+    all_searches = []
+    handler = profiler.wrap(process_search) if profiler else process_search
+    
+    try:
+        all_searches = get_search_configs_with_keywords()
+        
+        if not all_searches:
+            print("❌ Nenhuma configuração de busca ativa")
+            checkpoint.finish_scan()
+            return None
+        
+        searches_by_website = {"pichau": []}
+        
+        for search in all_searches:
+            website = search['website']
+            if website in searches_by_website:
+                searches_by_website[website].append(search)
+        
+        if DISTRIBUTED_MODE:
+            queued = [search for searches in searches_by_website.values() for search in searches]
+            total_searches, total_found, total_saved = work_queue.run_scan(
+                get_engine(), WORKER_ID, queued, handler, stop_event, delay=random_delay
+            )
+        else:
+            # Process each website sequentially for stability
+            for website, searches in searches_by_website.items():
+                if not searches or stop_event.is_set():
+                    continue
+                
+                # Pedidos urgentes passam na frente do site seguinte
+                run_rescans(handler)
+            
+                print(f"\n🔍 {website.upper()}: {len(searches)} buscas")
+                website_found = 0
+                website_saved = 0
+            
+                if tab_pool.tabs_for(website) > 1 and http_fetch.fetch_mode(website) == "browser":
+                    # Várias buscas em paralelo em abas do mesmo Chrome
+                    pending = [search for search in searches if not checkpoint.should_skip(search["id"])]
+                    with scan_profiler.section(profiler, website, pending):
+                        for search, found, saved in process_searches_multitab(website, pending):
                             website_found += found
                             website_saved += saved
                             total_searches += 1
-                            
-                            # Small delay between searches
-                            if random_delay():
-                                break
-                        
-                        total_found += website_found
-                        total_saved += website_saved
-                        
-                        print(f"✅ {website.upper()}: {website_found} encontrados, {website_saved} salvos")
-                        
-                        # Delay between websites
-                        if stop_event.wait(random.uniform(2, 4)):
+                            if not stop_event.is_set():
+                                checkpoint.mark_done(search["id"])
+                else:
+                    for search in searches:
+                        if stop_event.is_set():
                             break
                     
-                except Exception as e:
-                    print(f"❌ Erro no ciclo de busca: {e}")
+                        if checkpoint.should_skip(search["id"]):
+                            continue
                 
-                # Final summary
-                elapsed = time.time() - start_time
-                print(f"\n📊 RESUMO SCAN #{scan_count}:")
-                print(f"   Tempo: {elapsed:.1f}s")
-                print(f"   Buscas: {total_searches}")
-                print(f"   Produtos encontrados: {total_found}")
-                print(f"   Produtos salvos: {total_saved}")
+                        found, saved = handler(website, search)
+                        if not stop_event.is_set():
+                            checkpoint.mark_done(search["id"])
+                        memory_monitor.enforce_process_limit()
+                        website_found += found
+                        website_saved += saved
+                        total_searches += 1
+                
+                        # Small delay between searches
+                        if random_delay():
+                            break
+            
+                total_found += website_found
+                total_saved += website_saved
+            
+                print(f"✅ {website.upper()}: {website_found} encontrados, {website_saved} salvos")
+            
+                # Delay between websites
+                if wait_with_rescans(random.uniform(2, 4)):
+                    break
+        
+    except Exception as e:
+        print(f"❌ Erro no ciclo de busca: {e}")
+    
+    if not stop_event.is_set():
+        checkpoint.finish_scan(search["id"] for search in all_searches)
+    
+    # Final summary
+    elapsed = time.time() - start_time
+    print(f"\n📊 RESUMO SCAN #{scan_count}:")
+    print(f"   Tempo: {elapsed:.1f}s")
+    print(f"   Buscas: {total_searches}")
+    print(f"   Produtos encontrados: {total_found}")
+    print(f"   Produtos salvos: {total_saved}")
+    
+    if total_found > 0:
+        success_rate = (total_saved / total_found) * 100
+        print(f"   Taxa de sucesso: {success_rate:.1f}%")
+    
+    scan_timeouts = search_watchdog.watchdog.take_scan_timeouts()
+    if scan_timeouts:
+        print(f"   Timeouts: {', '.join(f'{site}={count}' for site, count in sorted(scan_timeouts.items()))}")
+    for line in proxy_pool.pool.summary_lines():
+        print(f"   Proxy {line}")
+    
+    return elapsed
+
+def start_search():
+    """Main search loop with optimized error handling"""
+    def search_task():
+        checkpoint = scan_checkpoint.ScanCheckpoint.load(CHECKPOINT_FILE)
+        
+        try:
+            if DISTRIBUTED_MODE:
+                work_queue.ensure_schema(get_engine())
+                print(f"🌐 Modo distribuído ativo (worker {WORKER_ID})")
+            
+            while not stop_event.is_set():
+                elapsed = run_scan_once(checkpoint)
                 
-                if total_found > 0:
-                    success_rate = (total_saved / total_found) * 100
-                    print(f"   Taxa de sucesso: {success_rate:.1f}%")
+                if elapsed is None:
+                    if wait_with_rescans(300):  # 5 minutes
+                        break
+                    continue
                 
                 if stop_event.is_set():
                     break
@@ -655,7 +1143,7 @@ def start_search():
                 delay = max(360 - elapsed, 60)
                 print(f"\n⏳ Próximo scan em {delay//60} minutos...")
                 
-                if stop_event.wait(delay):
+                if wait_with_rescans(delay):
                     break
                     
         except Exception as e:
@@ -667,6 +1155,22 @@ def start_search():
     search_thread.start()
     return search_thread
 
+def run_profile_scan(output_dir):
+    """Run a single profiled scan in the foreground and write the reports to output_dir"""
+    print(f"🔬 Modo perfil: um scan, relatórios em {output_dir}")
+    profiler = scan_profiler.ScanProfiler(output_dir)
+    # Checkpoint descartável: o scan perfilado roda todas as buscas
+    checkpoint = scan_checkpoint.ScanCheckpoint(os.path.join(output_dir, "checkpoint.json"))
+    
+    if DISTRIBUTED_MODE:
+        work_queue.ensure_schema(get_engine())
+    
+    try:
+        elapsed = run_scan_once(checkpoint, profiler)
+    finally:
+        cleanup_browser_processes()
+    profiler.finish(elapsed)
+
 def signal_handler(sig, frame):
     """Handle shutdown signals gracefully"""
     print("\n🛑 Parando graciosamente...")
@@ -674,16 +1178,29 @@ def signal_handler(sig, frame):
     cleanup_browser_processes()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PC Scraper - Pichau")
+    parser.add_argument("--profile", nargs="?", const="profiles", metavar="DIR",
+                        help="roda um único scan com cProfile + tracemalloc e grava os relatórios em DIR")
+    args = parser.parse_args()
+    
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    if args.profile:
+        run_profile_scan(args.profile)
+        sys.exit(0)
+    
     system_name = f"{'Windows' if is_windows else 'Linux'}"
     print(f"Iniciando PC Scraper v3.0 - Pichau Edition")
     print(f"Sistema: {system_name} | Driver: Chrome")
+    print(f"⏱️ Startup: {(time.perf_counter() - STARTUP_BEGIN) * 1000:.0f} ms")
     print("Pressione Ctrl+C para parar")
     
     # 📱 NOTIFICAÇÃO DE INICIALIZAÇÃO
     try:
+        import asyncio
+        from telegram_bot.telegram_bot import TelegramPriceBot
+        
         bot = TelegramPriceBot()
         startup_message = f"🚀 SCRAPER INICIADO\n\n"
         startup_message += f"📋 Scraper: PICHAU\n"
@@ -696,8 +1213,13 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Erro ao enviar notificação de inicialização: {e}")
     
-    # Initial cleanup
-    cleanup_browser_processes()
+    if SPOOL_MODE:
+        print(f"💾 Spool local ativo em {SPOOL_FILE}")
+        ingest_spool.SpoolSyncer(get_spool(), get_engine, store_observation, stop_event,
+                                 prepare=ensure_ingest_schema).start()
+    
+    observation_stream.start()
+    rescan_queue.start(get_engine, list(SITE_PAGES), WORKER_ID, stop_event)
     
     search_thread = start_search()
     
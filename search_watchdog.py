@@ -0,0 +1,158 @@
+"""Wall-clock deadlines for searches, enforced by killing only the stuck driver.
+
+Selenium calls can block far past their own timeouts when Chrome hangs.
+Each search runs under ``watchdog.watch(driver, website, label)``. A single
+background thread checks the registered deadlines, and when one expires it
+kills that driver's process tree (chromedriver plus its Chrome processes).
+The blocked Selenium call then fails, and the caller moves on with a fresh
+driver. Other drivers are left alone. Database writes run under
+``watchdog.suspended()``, so a slow database never gets a healthy driver
+killed.
+
+Deadlines are configured per site in seconds with ``SEARCH_DEADLINES``
+(e.g. ``"kabum=60,pichau=120"``), falling back to
+``SEARCH_DEADLINE_SECONDS``. Timeouts are counted per site, and also
+lower the health score of the killed driver's proxy (``proxy_pool``).
+"""
+import os
+import signal
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import memory_monitor
+import proxy_pool
+
+SEARCH_DEADLINE_SECONDS = float(os.getenv('SEARCH_DEADLINE_SECONDS', '90'))
+
+def parse_deadlines(value):
+    """Parse "site=seconds,site=seconds" into a dict"""
+    deadlines = {}
+    for entry in (value or "").split(","):
+        if "=" not in entry:
+            continue
+        site, seconds = (part.strip().lower() for part in entry.split("=", 1))
+        try:
+            if site and float(seconds) > 0:
+                deadlines[site] = float(seconds)
+        except ValueError:
+            continue
+    return deadlines
+
+SEARCH_DEADLINES = parse_deadlines(os.getenv('SEARCH_DEADLINES'))
+
+def deadline_for(website):
+    """Deadline in seconds for one search on a site"""
+    return SEARCH_DEADLINES.get(website, SEARCH_DEADLINE_SECONDS)
+
+def driver_pids(driver):
+    """chromedriver plus its Chrome processes (read it before quit(): orphans lose their parent)"""
+    return memory_monitor.process_tree_pids(memory_monitor.driver_pid(driver))
+
+def kill_pids(pids):
+    """SIGKILL the given processes, children first; returns how many were signalled"""
+    killed = 0
+    # Filhos primeiro, para o Chrome não ser re-parentado antes de morrer
+    for current in reversed(pids):
+        try:
+            os.kill(current, getattr(signal, "SIGKILL", signal.SIGTERM))
+            killed += 1
+        except OSError:
+            continue
+    return killed
+
+def kill_driver(driver):
+    """SIGKILL a driver's whole process tree; returns how many processes were signalled"""
+    return kill_pids(driver_pids(driver))
+
+class Deadline:
+    """A running search's deadline; ``expired`` is set once the watchdog fired"""
+
+    def __init__(self, driver, website, label, seconds):
+        self.driver = driver
+        self.website = website
+        self.label = label
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.expired = False
+
+    def extend(self, seconds=None):
+        """Restart the clock (e.g. after each search of a multi-search batch)"""
+        self.expires_at = time.monotonic() + (seconds or self.seconds)
+
+class SearchWatchdog:
+    """Single background thread enforcing every registered deadline"""
+
+    def __init__(self, poll=1.0):
+        self.poll = poll
+        self._lock = threading.Lock()
+        self._active = set()
+        self._thread = None
+        self._local = threading.local()
+        self.timeouts = Counter()       # acumulado desde o início
+        self._scan_timeouts = Counter()  # desde o último take_scan_timeouts()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="search-watchdog", daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def watch(self, driver, website, label, seconds=None):
+        """Run the body under a deadline; yields the Deadline"""
+        deadline = Deadline(driver, website, label, seconds or deadline_for(website))
+        with self._lock:
+            self._active.add(deadline)
+            self._ensure_thread()
+        previous, self._local.deadline = getattr(self._local, "deadline", None), deadline
+        try:
+            yield deadline
+        finally:
+            self._local.deadline = previous
+            with self._lock:
+                self._active.discard(deadline)
+
+    @contextmanager
+    def suspended(self):
+        """Pause this thread's deadline (e.g. while saving to the database); its clock restarts after"""
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is None:
+            yield
+            return
+        with self._lock:
+            self._active.discard(deadline)
+        try:
+            yield
+        finally:
+            deadline.extend()
+            with self._lock:
+                self._active.add(deadline)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll)
+            now = time.monotonic()
+            with self._lock:
+                expired = [d for d in self._active if not d.expired and d.expires_at <= now]
+                for deadline in expired:
+                    deadline.expired = True
+                    self.timeouts[deadline.website] += 1
+                    self._scan_timeouts[deadline.website] += 1
+
+            for deadline in expired:
+                print(f"⏰ {deadline.website.upper()}: '{deadline.label}' passou de {deadline.seconds:.0f}s, matando o driver")
+                proxy_pool.report_driver(deadline.driver, "timeout")
+                try:
+                    kill_driver(deadline.driver)
+                except Exception as e:
+                    print(f"⚠️ Erro ao matar driver travado: {e}")
+
+    def take_scan_timeouts(self):
+        """Per-site timeouts since the previous call (for the scan summary)"""
+        with self._lock:
+            counts = dict(self._scan_timeouts)
+            self._scan_timeouts.clear()
+        return counts
+
+watchdog = SearchWatchdog()
@@ -0,0 +1,108 @@
+"""Tab-multiplexed scraping: several searches in flight inside one Chrome instance.
+
+Chrome's fixed cost is the browser process, not the tab. ``run_multitab``
+opens ``tab_count`` tabs in a single driver, starts a navigation in each of
+them without blocking, then round-robins over the tabs and harvests each
+page as soon as it is ready, immediately reusing the tab for the next
+search. The tab count is configured per site with ``SCRAPER_TABS``
+(e.g. ``"kabum=3,terabyte=2"``); sites not listed use a single tab.
+"""
+import os
+import time
+
+TAB_READY_TIMEOUT = int(os.getenv('TAB_READY_TIMEOUT', '25'))
+
+# A página está pronta quando o payload estruturado ou os cards existem
+READY_CONDITIONS = {
+    "kabum": "!!document.getElementById('__NEXT_DATA__') || document.querySelectorAll('article.productCard, div.productCard').length > 0",
+    "terabyte": "document.querySelectorAll('.product-item').length > 0",
+    "pichau": "!!document.getElementById('__NEXT_DATA__') || document.querySelectorAll(\"[data-cy='list-product']\").length > 0",
+}
+
+# The flag lives on the old document only, so its absence proves the new page committed
+START_NAVIGATION_JS = "window.__scraperPending = true; window.location.href = arguments[0];"
+
+def parse_tab_counts(value):
+    """Parse "site=N,site=N" into a dict of tab counts"""
+    counts = {}
+    for entry in (value or "").split(","):
+        if "=" not in entry:
+            continue
+        site, count = (part.strip().lower() for part in entry.split("=", 1))
+        if site and count.isdigit() and int(count) > 0:
+            counts[site] = int(count)
+    return counts
+
+TAB_COUNTS = parse_tab_counts(os.getenv('SCRAPER_TABS'))
+
+def tabs_for(website):
+    """Number of tabs to use for a site"""
+    return TAB_COUNTS.get(website, 1)
+
+def _ready_script(website):
+    condition = READY_CONDITIONS.get(website, "true")
+    return (
+        "return window.__scraperPending !== true"
+        " && document.readyState !== 'loading'"
+        f" && ({condition});"
+    )
+
+def run_multitab(driver, website, jobs, harvest, stop_event, tab_count, ready_timeout=TAB_READY_TIMEOUT, poll=0.3):
+    """Run ``jobs`` (``(url, payload)`` pairs) across ``tab_count`` tabs of one driver.
+
+    Yields ``(payload, harvest(page_source, payload))`` in completion order.
+    A tab that is not ready after ``ready_timeout`` seconds is harvested with
+    whatever it has, so the parser's own fallbacks decide.
+    """
+    pending = list(jobs)
+    if not pending:
+        return
+
+    ready_js = _ready_script(website)
+    handles = [driver.current_window_handle]
+    while len(handles) < min(tab_count, len(pending)):
+        driver.switch_to.new_window('tab')
+        handles.append(driver.current_window_handle)
+
+    active = {}
+
+    def start(handle):
+        url, payload = pending.pop(0)
+        driver.switch_to.window(handle)
+        driver.execute_script(START_NAVIGATION_JS, url)
+        active[handle] = (payload, time.time())
+
+    for handle in handles:
+        if pending:
+            start(handle)
+
+    while active and not stop_event.is_set():
+        harvested = False
+
+        for handle in list(active):
+            payload, started_at = active[handle]
+            driver.switch_to.window(handle)
+
+            try:
+                ready = driver.execute_script(ready_js)
+            except Exception:
+                # Navegação em andamento no meio do script
+                ready = False
+
+            if not ready and time.time() - started_at < ready_timeout:
+                continue
+
+            page_source = driver.page_source
+            del active[handle]
+            harvested = True
+
+            if pending and not stop_event.is_set():
+                start(handle)
+
+            result = harvest(page_source, payload)
+            # O HTML não é mais necessário enquanto o chamador grava no banco
+            del page_source
+            yield payload, result
+
+        if not harvested:
+            time.sleep(poll)
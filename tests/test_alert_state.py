@@ -0,0 +1,65 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+
+import alert_state
+
+NOW = datetime(2026, 10, 1, 12)
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'alerts.db'}", connect_args={"timeout": 30})
+
+def rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(alert_state.alert_state.c.price_band, alert_state.alert_state.c.alert_count)
+        ).fetchall()
+
+def test_repeat_alert_updates_the_band_row(engine):
+    store = alert_state.AlertStateStore(engine)
+    store.record(1, 1000.0, NOW)
+    store.record(1, 1001.0, NOW + timedelta(hours=13))
+
+    assert rows(engine) == [(alert_state.price_band(1000.0), 2)]
+    assert not store.should_alert(1, 1000.0, NOW + timedelta(hours=14))
+
+def test_concurrent_records_of_one_band_do_not_raise(engine):
+    # Um store por "processo": nenhum vê o cache do outro
+    stores = [alert_state.AlertStateStore(engine) for _ in range(6)]
+    errors = []
+
+    def send(store):
+        try:
+            store.record(1, 1000.0, NOW)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=send, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert rows(engine) == [(alert_state.price_band(1000.0), len(stores))]
+
+def test_generic_path_retries_update_after_losing_the_insert_race(engine, monkeypatch):
+    monkeypatch.setattr(alert_state, "_insert_for", lambda dialect_name: None)
+    store = alert_state.AlertStateStore(engine)
+    other = alert_state.AlertStateStore(engine)
+
+    # O outro processo insere entre o nosso update (sem linhas) e o nosso insert
+    real_insert = alert_state.alert_state.insert
+
+    def racing_insert():
+        monkeypatch.setattr(alert_state.alert_state, "insert", real_insert)
+        other.record(1, 1000.0, NOW)
+        return real_insert()
+
+    monkeypatch.setattr(alert_state.alert_state, "insert", racing_insert)
+    store.record(1, 1000.0, NOW)
+
+    assert rows(engine) == [(alert_state.price_band(1000.0), 2)]
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+
+import pytest
+
+import fake_storefront
+import http_fetch
+import scraperall
+
+@pytest.fixture(scope="module")
+def storefront():
+    server = fake_storefront.start_server(products=20, churn=0)
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def http_terabyte(monkeypatch, storefront):
+    """Terabyte opted into HTTP and pointed at the local storefront; saves are captured"""
+    saved = []
+    monkeypatch.setattr(http_fetch, "FETCH_MODES", http_fetch.parse_fetch_modes("terabyte=http"))
+    monkeypatch.setattr(scraperall, "TERABYTE_BASE_URL", f"{storefront.base_url}/terabyte")
+    monkeypatch.setattr(scraperall, "save_products", lambda products, store, category: saved.extend(products) or len(products))
+    return saved
+
+@pytest.fixture
+def browser_calls(monkeypatch):
+    """Replaces the Chrome path with a stub that records the searches it gets"""
+    calls = []
+
+    @contextmanager
+    def fake_driver(website=None):
+        yield object()
+
+    def fake_scrape(driver, wait, query, wordlist, category):
+        calls.append(query)
+        return 1, 1
+
+    monkeypatch.setattr(scraperall, "managed_driver", fake_driver)
+    monkeypatch.setattr(scraperall, "scrape_terabyte", fake_scrape)
+    return calls
+
+def search(text="placa rtx 4060"):
+    return {"id": 1, "search_text": text, "keywords": [[text.split()[-1]]], "category": "gpu"}
+
+def test_every_site_defaults_to_browser():
+    modes = http_fetch.parse_fetch_modes(None)
+    assert set(modes.values()) == {"browser"}
+    assert http_fetch.parse_fetch_modes("kabum=http, terabyte=ftp")["kabum"] == "http"
+    assert http_fetch.parse_fetch_modes("kabum=http, terabyte=ftp")["terabyte"] == "browser"
+
+def test_fetch_reads_storefront_page(storefront):
+    page = http_fetch.HttpFetcher().fetch(f"{storefront.base_url}/terabyte/busca?str=rtx+4060")
+    assert page is not None and "product-item" in page
+
+def test_fetch_returns_none_for_missing_page(storefront):
+    assert http_fetch.HttpFetcher().fetch(f"{storefront.base_url}/terabyte/nada") is None
+
+def test_http_search_parses_products_without_chrome(http_terabyte, browser_calls):
+    found, saved = scraperall.process_search("terabyte", search())
+
+    assert found == 20 and saved == 20
+    assert all("4060" in product["name"] for product in http_terabyte)
+    assert browser_calls == []
+
+def test_unusable_http_page_falls_back_to_browser(monkeypatch, storefront, http_terabyte, browser_calls):
+    monkeypatch.setattr(scraperall, "TERABYTE_BASE_URL", f"{storefront.base_url}/fora-do-ar")
+
+    assert scraperall.process_search("terabyte", search()) == (1, 1)
+    assert browser_calls == ["placa rtx 4060"]
+    assert http_terabyte == []
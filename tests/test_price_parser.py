@@ -0,0 +1,61 @@
+import csv
+import random
+from pathlib import Path
+
+import pytest
+
+import price_parser
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+def storefront_texts():
+    """Price element texts as rendered on the Kabum, Terabyte and Pichau cards"""
+    with open(FIXTURES / "price_texts.tsv", encoding="utf-8", newline="") as f:
+        return [(row["site"], row["text"], float(row["expected"]) if row["expected"] else None)
+                for row in csv.DictReader(f, delimiter="\t")]
+
+def test_round_trip_every_storefront_format():
+    rng = random.Random(42)
+    samples = [(rng.randint(1000, 5_000_000), rng.randrange(6)) for _ in range(20000)]
+    texts = [price_parser._format_brl(cents, style) for cents, style in samples]
+
+    parsed = price_parser.parse_prices(texts)
+
+    for text, (cents, _), price in zip(texts, samples, parsed):
+        assert price == pytest.approx(cents / 100, abs=0.001), text
+
+def test_storefront_price_texts():
+    rows = storefront_texts()
+    assert {site for site, _, _ in rows} == {"kabum", "terabyte", "pichau"}
+
+    for site, text, expected in rows:
+        # Como os scrapers chamam: só a Pichau usa a heurística de centavos
+        price = price_parser.parse_price(text, cents_heuristic=site == "pichau")
+        assert price == (pytest.approx(expected) if expected is not None else None), (site, text)
+
+@pytest.mark.parametrize("text, expected", [
+    ("R$ 1.234,56", 1234.56),
+    ("R$1.234", 1234.0),
+    ("1234,5", 1234.5),
+    ("R$ 12,90 à vista", 12.9),
+    ("1234.56", 1234.56),
+    ("R$ 1.234.567,89", 1234567.89),
+    ("De R$ 1.999,90 Por R$ 1.499,90", 1499.9),
+    ("R$ 1.499,90 à vista ou R$ 1.699,90 em 10x", 1499.9),
+    ("R$ 1.699,90 ou 10x de R$ 169,99", 1699.9),
+])
+def test_parse_price(text, expected):
+    assert price_parser.parse_price(text) == pytest.approx(expected)
+
+@pytest.mark.parametrize("text", [None, "", "Indisponível", "Esgotado", "R$", "--",
+                                  "R$ 1.234,567", "1234.567", "R$ 12,3456"])
+def test_no_price_or_malformed_decimals(text):
+    assert price_parser.parse_price(text) is None
+
+def test_cents_heuristic():
+    assert price_parser.parse_price("123456", cents_heuristic=True) == pytest.approx(1234.56)
+    assert price_parser.parse_price("R$ 1.234,567", cents_heuristic=True) is None
+
+def test_benchmark_round_trips(capsys):
+    assert price_parser._benchmark(2000)
+    assert "2000 preços" in capsys.readouterr().out
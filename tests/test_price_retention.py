@@ -0,0 +1,79 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+import price_retention
+import scraperall
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prices.db'}")
+    scraperall.metadata.create_all(engine, tables=[scraperall.products, scraperall.prices])
+    monkeypatch.setattr(scraperall, "_engine", engine)
+    return engine
+
+def write_history(engine, product_id, days, rng):
+    """One price row every ~10 hours over the last `days` days, like the live scraper leaves"""
+    now = datetime.now(price_retention.brasilia).replace(tzinfo=None)
+    moment = now - timedelta(days=days)
+    price = rng.uniform(500, 5000)
+    rows = []
+    while moment < now - timedelta(hours=1):
+        if rng.random() < 0.4:
+            price = round(price * rng.uniform(0.85, 1.15), 2)
+        checks = rng.choice([None, 1, 1, 2, 5, 17])
+        rows.append({
+            "product_id": product_id,
+            "price": round(price, 2),
+            "collected_at": moment,
+            "price_changed_at": moment,
+            "last_checked_at": moment + timedelta(hours=rng.uniform(0, 8)),
+            "check_count": checks,
+        })
+        moment += timedelta(hours=rng.uniform(6, 14))
+    with engine.begin() as conn:
+        conn.execute(scraperall.products.insert().values(
+            id=product_id, name=f"produto {product_id}", website="kabum", category="gpu"
+        ))
+        conn.execute(scraperall.prices.insert(), rows)
+
+def row_count(engine, product_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(scraperall.prices).where(scraperall.prices.c.product_id == product_id)
+        ).scalar()
+
+def test_downsample_keeps_weighted_averages(engine):
+    rng = random.Random(44)
+    histories = {1: 400, 2: 90, 3: 20, 4: 2}
+    for product_id, days in histories.items():
+        write_history(engine, product_id, days, rng)
+
+    before = {product_id: scraperall.calculate_weighted_average(product_id) for product_id in histories}
+    counts_before = {product_id: row_count(engine, product_id) for product_id in histories}
+
+    _, removed = price_retention.downsample(engine, keep_days=30, daily_days=180, batch_products=2, pause=0)
+
+    assert removed > 0
+    assert row_count(engine, 1) < counts_before[1] / 3
+    # Histórico todo dentro de keep_days: nada muda
+    assert row_count(engine, 3) == counts_before[3]
+    for product_id, average in before.items():
+        assert scraperall.calculate_weighted_average(product_id) == pytest.approx(average, abs=0.01), product_id
+
+def test_merge_rows_is_check_weighted():
+    class Row:
+        def __init__(self, price, checks, at):
+            self.price, self.check_count = price, checks
+            self.collected_at = self.price_changed_at = at
+            self.last_checked_at = at + timedelta(hours=1)
+
+    start = datetime(2026, 1, 5, 12)
+    merged = price_retention.merge_rows([Row(100, 3, start), Row(200, None, start + timedelta(days=1))])
+
+    assert float(merged["price"]) == pytest.approx(125)
+    assert merged["check_count"] == 4
+    assert merged["collected_at"] == start
+    assert merged["last_checked_at"] == start + timedelta(days=1, hours=1)
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+import product_keys
+import scraperall
+
+LINK = "https://www.kabum.com.br/produto/123456/placa-de-video-rtx-4060"
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Pre-migration schema: products without site_sku"""
+    monkeypatch.setattr(product_keys, "_ready_engines", set())
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    legacy = MetaData()
+    Table(
+        "products", legacy,
+        Column("id", Integer, primary_key=True),
+        Column("name", String),
+        Column("website", String),
+        Column("category", String),
+        Column("product_link", String),
+    )
+    legacy.create_all(engine)
+    scraperall.metadata.create_all(engine, tables=[scraperall.prices])
+    return engine
+
+def add_product(engine, product_id, name, last_checked_at=None):
+    with engine.begin() as conn:
+        conn.execute(scraperall.products.insert().values(
+            id=product_id, name=name, website="kabum", category="gpu", product_link=LINK
+        ))
+        if last_checked_at is not None:
+            conn.execute(scraperall.prices.insert().values(
+                product_id=product_id, price=1999.9, collected_at=last_checked_at,
+                price_changed_at=last_checked_at, last_checked_at=last_checked_at,
+            ))
+
+def keyed(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(scraperall.products.c.id, scraperall.products.c.site_sku)).fetchall())
+
+def test_extract_site_sku():
+    assert product_keys.extract_site_sku("kabum", LINK) == "123456"
+    assert product_keys.extract_site_sku("kabum", "https://www.kabum.com.br/busca") is None
+    assert product_keys.extract_site_sku("pichau", "https://www.pichau.com.br/Placa-RTX-4060/") == "placa-rtx-4060"
+
+def test_backfill_keys_the_row_still_being_checked(engine):
+    # Retitulado: a linha antiga parou de receber preços, a nova segue ativa
+    add_product(engine, 1, "RTX 4060 nova", datetime(2026, 5, 1))
+    add_product(engine, 2, "RTX 4060 Nova 8GB", datetime(2026, 9, 30))
+    add_product(engine, 3, "RTX 4060 sem preço")
+
+    product_keys.ensure_schema(engine)
+
+    assert keyed(engine) == {1: None, 2: "123456", 3: None}
+
+def test_backfill_falls_back_to_the_newest_row(engine):
+    add_product(engine, 1, "RTX 4060 nova")
+    add_product(engine, 2, "RTX 4060 Nova 8GB")
+
+    product_keys.ensure_schema(engine)
+
+    assert keyed(engine) == {1: None, 2: "123456"}
+
+def test_ensure_schema_tolerates_a_concurrent_migration(engine, monkeypatch):
+    add_product(engine, 1, "RTX 4060")
+    real_inspect = product_keys.inspect
+    stale = real_inspect(engine).get_columns("products")
+    # O outro scraper adiciona a coluna depois da nossa inspeção
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE products ADD COLUMN site_sku VARCHAR")
+
+    inspections = iter([type("Stale", (), {"get_columns": lambda self, table: stale})()])
+    monkeypatch.setattr(product_keys, "inspect", lambda bind: next(inspections, None) or real_inspect(bind))
+
+    product_keys.ensure_schema(engine)
+
+    assert keyed(engine) == {1: "123456"}
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+import fake_storefront
+import http_fetch
+import proxy_pool
+
+A = "http://10.0.0.1:3128"
+B = "http://10.0.0.2:3128"
+
+def test_health_and_latency_are_ewmas():
+    pool = proxy_pool.ProxyPool([A])
+    alpha = proxy_pool.HEALTH_ALPHA
+
+    pool.report(A, "kabum", "ok", 2.0)
+    pool.report(A, "kabum", "ok", 1.0)
+    pool.report(A, "kabum", "timeout")
+    pool.report(A, "kabum", "error")
+
+    stats = pool._stats_for(A, "kabum")
+    assert stats.health == pytest.approx((1 - alpha) ** 2)
+    assert stats.latency == pytest.approx(2.0 + proxy_pool.LATENCY_ALPHA * (1.0 - 2.0))
+    assert dict(stats.outcomes) == {"ok": 2, "timeout": 1, "error": 1}
+
+def test_block_puts_proxy_in_doubling_cooldown_for_that_site_only(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(proxy_pool.time, "monotonic", lambda: now[0])
+    pool = proxy_pool.ProxyPool([A])
+    stats = pool._stats_for(A, "kabum")
+
+    pool.report(A, "kabum", "blocked")
+    assert stats.cooldown_until == now[0] + proxy_pool.BLOCK_COOLDOWN_SECONDS
+    assert stats.weight(now[0]) == 0.0
+    assert pool._stats_for(A, "terabyte").weight(now[0]) > 0
+
+    pool.report(A, "kabum", "blocked")
+    assert stats.cooldown_until == now[0] + 2 * proxy_pool.BLOCK_COOLDOWN_SECONDS
+
+    now[0] = stats.cooldown_until + 1
+    assert stats.weight(now[0]) > 0
+    pool.report(A, "kabum", "ok", 0.5)
+    pool.report(A, "kabum", "blocked")
+    # Um ok zera a sequência: o próximo bloqueio volta ao cooldown base
+    assert stats.cooldown_until == now[0] + proxy_pool.BLOCK_COOLDOWN_SECONDS
+
+def test_healthiest_proxy_takes_most_leases():
+    random.seed(7)
+    pool = proxy_pool.ProxyPool([A, B])
+    for _ in range(5):
+        pool.report(A, "kabum", "ok", 0.3)
+        pool.report(B, "kabum", "timeout")
+
+    picks = []
+    for _ in range(500):
+        lease = pool.acquire("kabum")
+        picks.append(lease.proxy)
+        lease.release()
+
+    assert picks.count(A) > 0.9 * len(picks)
+    # O ruim ainda é sorteado de vez em quando
+    assert picks.count(B) > 0
+
+def test_all_in_cooldown_picks_the_one_leaving_first():
+    pool = proxy_pool.ProxyPool([A, B])
+    pool.report(A, "kabum", "blocked")
+    pool.report(A, "kabum", "blocked")
+    pool.report(B, "kabum", "blocked")
+
+    assert pool.acquire("kabum").proxy == B
+
+def test_in_flight_leases_spread_load():
+    pool = proxy_pool.ProxyPool([A])
+    stats = pool._stats_for(A, "kabum")
+    idle = stats.weight(0)
+
+    lease = pool.acquire("kabum")
+    assert stats.in_flight == 1 and stats.weight(0) == pytest.approx(idle / 2)
+    lease.release()
+    lease.release()
+    assert stats.in_flight == 0
+
+def test_stand_in_proxies_route_around_a_blocking_proxy():
+    random.seed(3)
+    storefront = fake_storefront.start_server(products=20, churn=0)
+    blocking = fake_storefront.start_proxy(block_rate=1.0)
+    healthy = fake_storefront.start_proxy(block_rate=0.0)
+    try:
+        pool = proxy_pool.ProxyPool([blocking.url, healthy.url])
+        fetcher = http_fetch.HttpFetcher()
+        url = f"{storefront.base_url}/terabyte/busca?str=rtx+4060"
+
+        pages = []
+        for _ in range(10):
+            lease = pool.acquire("terabyte")
+            try:
+                pages.append(fetcher.fetch(url, lease))
+            finally:
+                lease.release()
+
+        assert blocking.blocked == 1
+        assert pool._stats_for(blocking.url, "terabyte").cooldown_until > 0
+        assert sum(page is not None for page in pages) == 10 - blocking.blocked
+        assert healthy.forwarded == 10 - blocking.blocked
+    finally:
+        for server in (storefront, blocking, healthy):
+            server.shutdown()
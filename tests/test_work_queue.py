@@ -0,0 +1,87 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+
+import work_queue
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"timeout": 30})
+    work_queue.ensure_schema(engine)
+    return engine
+
+def searches(count, website="kabum"):
+    return [{"id": config_id, "website": website} for config_id in range(1, count + 1)]
+
+def statuses(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(
+            select(work_queue.scan_work_items.c.search_config_id, work_queue.scan_work_items.c.status)
+        ).fetchall())
+
+def test_workers_claim_each_item_once(engine):
+    work_queue.enqueue_scan(engine, "1", searches(40))
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        while True:
+            item = work_queue.claim_work_item(engine, worker_id, ["kabum"])
+            if item is None:
+                return
+            with lock:
+                claimed.append(item["search_config_id"])
+            work_queue.complete_work_item(engine, item["id"], worker_id)
+
+    threads = [threading.Thread(target=worker, args=(f"w{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == list(range(1, 41))
+    assert set(statuses(engine).values()) == {"done"}
+
+def test_live_lease_is_not_claimable(engine):
+    work_queue.enqueue_scan(engine, "1", searches(1))
+    assert work_queue.claim_work_item(engine, "w1", ["kabum"]) is not None
+    assert work_queue.claim_work_item(engine, "w2", ["kabum"]) is None
+
+def test_expired_lease_is_reclaimed(engine):
+    work_queue.enqueue_scan(engine, "1", searches(1))
+    first = work_queue.claim_work_item(engine, "w1", ["kabum"], lease_seconds=-1)
+
+    second = work_queue.claim_work_item(engine, "w2", ["kabum"])
+    assert second["id"] == first["id"]
+    # O dono antigo perdeu o lease: heartbeat falha e o complete dele não vale
+    assert not work_queue.heartbeat(engine, first["id"], "w1")
+    work_queue.complete_work_item(engine, first["id"], "w1")
+    assert statuses(engine) == {1: "leased"}
+
+def test_item_fails_after_max_attempts(engine):
+    work_queue.enqueue_scan(engine, "1", searches(1))
+    for _ in range(work_queue.MAX_ATTEMPTS):
+        assert work_queue.claim_work_item(engine, "w1", ["kabum"], lease_seconds=-1) is not None
+
+    assert work_queue.claim_work_item(engine, "w1", ["kabum"]) is None
+    assert statuses(engine) == {1: "failed"}
+
+def test_claims_only_the_given_websites(engine):
+    work_queue.enqueue_scan(engine, "1", searches(1, website="terabyte"))
+    assert work_queue.claim_work_item(engine, "w1", ["kabum"]) is None
+    assert work_queue.claim_work_item(engine, "w1", ["terabyte"])["website"] == "terabyte"
+
+def test_claim_scan_id_joins_recent_scan_and_opens_the_next(engine):
+    assert work_queue.claim_scan_id(engine) == "1"
+    work_queue.enqueue_scan(engine, "1", searches(3))
+
+    now = work_queue.utcnow()
+    assert work_queue.claim_scan_id(engine, now + timedelta(seconds=30), join_seconds=180) == "1"
+    assert work_queue.claim_scan_id(engine, now + timedelta(seconds=200), join_seconds=180) == "2"
+
+def test_joining_worker_does_not_duplicate_items(engine):
+    assert work_queue.enqueue_scan(engine, "1", searches(3)) == 3
+    assert work_queue.enqueue_scan(engine, work_queue.claim_scan_id(engine), searches(5)) == 2
+    assert len(statuses(engine)) == 5
@@ -0,0 +1,280 @@
+"""Lease-based work queue so several scraper nodes can share one scan.
+
+Every due search config of a scan becomes a row in ``scan_work_items``.
+Workers claim rows with ``SELECT ... FOR UPDATE SKIP LOCKED``, extend the
+lease with heartbeats while the search runs and mark the row done at the end.
+A row whose lease expired (crashed or frozen worker) is claimable again, so
+N workers split a scan without fetching the same search twice.
+
+Works against Postgres and against SQLite as a local stand-in (SQLite ignores
+``FOR UPDATE``; the conditional lease update below keeps claims exclusive).
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import (
+    Table, Column, Integer, String, DateTime, MetaData, UniqueConstraint,
+    select, and_, or_, func,
+)
+
+LEASE_SECONDS = int(os.getenv('WORK_LEASE_SECONDS', '180'))
+HEARTBEAT_SECONDS = max(5, LEASE_SECONDS // 3)
+MAX_ATTEMPTS = int(os.getenv('WORK_MAX_ATTEMPTS', '3'))
+# Menor que o intervalo entre scans de um mesmo nó (>= 360s), que assim nunca reentra no próprio scan
+SCAN_JOIN_SECONDS = int(os.getenv('WORK_SCAN_JOIN_SECONDS', '180'))
+
+metadata = MetaData()
+
+scan_work_items = Table("scan_work_items", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("scan_id", String, nullable=False),
+    Column("search_config_id", Integer, nullable=False),
+    Column("website", String, nullable=False),
+    Column("status", String, nullable=False, default="pending"),
+    Column("lease_owner", String),
+    Column("lease_expires_at", DateTime),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("created_at", DateTime),
+    Column("completed_at", DateTime),
+    UniqueConstraint("scan_id", "search_config_id", name="scan_work_items_scan_config_key"),
+)
+
+def utcnow():
+    """Naive UTC timestamp, comparable on both Postgres and SQLite"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def default_worker_id():
+    """Worker identity used as lease owner"""
+    return os.getenv('SCRAPER_WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+
+def claim_scan_id(engine, now=None, join_seconds=SCAN_JOIN_SECONDS):
+    """Scan id for a scan starting now: join the latest scan if it is recent, else open the next one.
+
+    Workers that start within ``join_seconds`` of the latest scan's first
+    enqueue share its id. Otherwise the id is the latest one plus one, so
+    workers opening a scan at the same moment still agree on it.
+    """
+    now = now if now is not None else utcnow()
+    with engine.begin() as conn:
+        latest = conn.execute(
+            select(scan_work_items.c.scan_id, func.min(scan_work_items.c.created_at).label("created_at"))
+            .group_by(scan_work_items.c.scan_id)
+            .order_by(func.min(scan_work_items.c.created_at).desc())
+            .limit(1)
+        ).first()
+
+    if latest is None:
+        return "1"
+    if latest.created_at is not None and now - latest.created_at < timedelta(seconds=join_seconds):
+        return latest.scan_id
+    try:
+        return str(int(latest.scan_id) + 1)
+    except ValueError:
+        return "1"
+
+def ensure_schema(engine):
+    """Create the work queue table if it does not exist"""
+    metadata.create_all(engine, tables=[scan_work_items], checkfirst=True)
+
+def _insert_ignore(engine, table):
+    """INSERT ... ON CONFLICT DO NOTHING for the engine's dialect"""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Dialeto não suportado pela fila: {engine.dialect.name}")
+    return insert(table).on_conflict_do_nothing()
+
+def _claimable(now):
+    return or_(
+        scan_work_items.c.status == "pending",
+        and_(scan_work_items.c.status == "leased", scan_work_items.c.lease_expires_at < now),
+    )
+
+def enqueue_scan(engine, scan_id, searches):
+    """Create one work item per search config, skipping configs already in this scan or still open"""
+    now = utcnow()
+    with engine.begin() as conn:
+        open_ids = set(conn.execute(
+            select(scan_work_items.c.search_config_id).where(
+                or_(scan_work_items.c.status.in_(("pending", "leased")), scan_work_items.c.scan_id == scan_id)
+            )
+        ).scalars())
+
+        rows = [
+            {
+                "scan_id": scan_id,
+                "search_config_id": search["id"],
+                "website": search["website"],
+                "status": "pending",
+                "attempts": 0,
+                "created_at": now,
+            }
+            for search in searches
+            if search["id"] not in open_ids
+        ]
+        if rows:
+            conn.execute(_insert_ignore(engine, scan_work_items), rows)
+        return len(rows)
+
+def claim_work_item(engine, worker_id, websites, lease_seconds=LEASE_SECONDS):
+    """Lease the next pending (or expired) item for one of the given websites"""
+    while True:
+        now = utcnow()
+        with engine.begin() as conn:
+            query = select(
+                scan_work_items.c.id,
+                scan_work_items.c.scan_id,
+                scan_work_items.c.search_config_id,
+                scan_work_items.c.website,
+                scan_work_items.c.attempts,
+            ).where(
+                scan_work_items.c.website.in_(list(websites)),
+                _claimable(now),
+            ).order_by(
+                scan_work_items.c.id.asc()
+            ).limit(1).with_for_update(skip_locked=True)
+
+            item = conn.execute(query).first()
+            if item is None:
+                return None
+
+            if item.attempts >= MAX_ATTEMPTS:
+                conn.execute(
+                    scan_work_items.update()
+                    .where(scan_work_items.c.id == item.id)
+                    .values(status="failed", lease_owner=None, completed_at=now)
+                )
+                print(f"⚠️ Item {item.id} (config {item.search_config_id}) falhou {item.attempts}x, descartado")
+                continue
+
+            # Conditional update: if another worker got there first nothing changes
+            result = conn.execute(
+                scan_work_items.update()
+                .where(scan_work_items.c.id == item.id, _claimable(now))
+                .values(
+                    status="leased",
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    attempts=item.attempts + 1,
+                )
+            )
+            if result.rowcount == 1:
+                return dict(item._mapping)
+
+def heartbeat(engine, item_id, worker_id, lease_seconds=LEASE_SECONDS):
+    """Extend the lease; returns False when the lease was lost"""
+    with engine.begin() as conn:
+        result = conn.execute(
+            scan_work_items.update()
+            .where(
+                scan_work_items.c.id == item_id,
+                scan_work_items.c.lease_owner == worker_id,
+                scan_work_items.c.status == "leased",
+            )
+            .values(lease_expires_at=utcnow() + timedelta(seconds=lease_seconds))
+        )
+        return result.rowcount == 1
+
+def complete_work_item(engine, item_id, worker_id):
+    """Mark a leased item as done"""
+    with engine.begin() as conn:
+        conn.execute(
+            scan_work_items.update()
+            .where(scan_work_items.c.id == item_id, scan_work_items.c.lease_owner == worker_id)
+            .values(status="done", lease_owner=None, lease_expires_at=None, completed_at=utcnow())
+        )
+
+def release_work_item(engine, item_id, worker_id):
+    """Give a leased item back to the queue so another worker can retry it"""
+    with engine.begin() as conn:
+        conn.execute(
+            scan_work_items.update()
+            .where(scan_work_items.c.id == item_id, scan_work_items.c.lease_owner == worker_id)
+            .values(status="pending", lease_owner=None, lease_expires_at=None)
+        )
+
+class LeaseHeartbeat:
+    """Background thread that keeps a work item's lease alive while it runs"""
+
+    def __init__(self, engine, item_id, worker_id, interval=HEARTBEAT_SECONDS):
+        self.engine = engine
+        self.item_id = item_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not heartbeat(self.engine, self.item_id, self.worker_id):
+                    self.lost = True
+                    print(f"⚠️ Lease perdido para item {self.item_id}")
+                    return
+            except Exception as e:
+                print(f"⚠️ Erro no heartbeat do item {self.item_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        return False
+
+def run_scan(engine, worker_id, searches, handler, stop_event, delay=None):
+    """Enqueue this scan's searches and process claimed items until the queue is empty.
+
+    ``handler(website, search_config)`` returns ``(found, saved)``; ``delay()``
+    is called between items and returns True when the worker should stop.
+    """
+    searches_by_id = {search["id"]: search for search in searches}
+    websites = {search["website"] for search in searches}
+    total_searches = total_found = total_saved = 0
+
+    if not searches_by_id:
+        return total_searches, total_found, total_saved
+
+    scan_id = claim_scan_id(engine)
+    created = enqueue_scan(engine, scan_id, searches)
+    print(f"📥 Scan {scan_id}: {created} itens enfileirados por {worker_id}")
+
+    while not stop_event.is_set():
+        item = claim_work_item(engine, worker_id, websites)
+        if item is None:
+            break
+
+        search = searches_by_id.get(item["search_config_id"])
+        if search is None:
+            # Config desativada depois do enqueue
+            complete_work_item(engine, item["id"], worker_id)
+            continue
+
+        try:
+            with LeaseHeartbeat(engine, item["id"], worker_id):
+                found, saved = handler(item["website"], search)
+        except Exception as e:
+            print(f"❌ Erro no item {item['id']}: {e}")
+            release_work_item(engine, item["id"], worker_id)
+            continue
+
+        if stop_event.is_set():
+            # Busca interrompida no meio: devolve o item para outro worker
+            release_work_item(engine, item["id"], worker_id)
+            break
+
+        complete_work_item(engine, item["id"], worker_id)
+        total_searches += 1
+        total_found += found
+        total_saved += saved
+
+        if delay and delay():
+            break
+
+    return total_searches, total_found, total_saved